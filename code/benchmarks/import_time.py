@@ -0,0 +1,69 @@
+"""
+PURPOSE: Import-time benchmark of the finModel package. Each module is imported in a fresh interpreter after pandas and
+numpy, so the time reported is what finModel itself adds on top of them; the run fails if the core statements/DCF path
+goes over its budget or if a deferred dependency (plotly, pyarrow's parquet reader, jinja2, statsmodels) gets imported.
+
+    python code/benchmarks/import_time.py [--repeat 7] [--budget-ms 100]
+"""
+from typing import Dict, List, Tuple
+import argparse
+import statistics
+import subprocess
+import sys
+import json
+
+
+# Core path: statements -> forecast -> cash flow -> DCF
+CORE: Tuple[str,...] = ("finModel.statements.main", "finModel.analysis.dcf_valuation")
+
+OTHER: Tuple[str,...] = ("finModel.analysis.ratios", "finModel.analysis.batch", "finModel.analysis.monte_carlo",
+                         "finModel.analysis.scenario", "finModel.analysis.cost_of_capital", "finModel.analysis.solver",
+                         "finModel.analysis.graph", "finModel.analysis.pipeline", "finModel.analysis.store",
+                         "finModel.statements.ingest", "finModel.viz.generic", "finModel.viz.plots", "finModel.cli")
+
+DEFERRED: Tuple[str,...] = ("plotly", "pyarrow.parquet", "jinja2", "statsmodels")
+
+PROBE = '''
+import time, sys, json
+t0 = time.perf_counter()
+import pandas, numpy
+t1 = time.perf_counter()
+import {module}
+t2 = time.perf_counter()
+print(json.dumps({{"deps": t1 - t0, "own": t2 - t1, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+'''
+
+
+def measure(module: str, repeat: int) -> Dict[str,object]:
+    '''
+    Median import time of module (seconds) over fresh interpreters, with the deferred dependencies it pulled in
+    '''
+    runs: List[Dict[str,object]] = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable,"-c",PROBE.format(module=module,deferred=DEFERRED)],
+                             capture_output=True,text=True,check=True)
+        runs.append(json.loads(out.stdout))
+    return {"deps": statistics.median(r["deps"] for r in runs), "own": statistics.median(r["own"] for r in runs),
+            "loaded": sorted({m for r in runs for m in r["loaded"]})}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat",type=int,default=7,help="fresh interpreters per module")
+    parser.add_argument("--budget-ms",type=float,default=100.0,help="budget of each core module on top of pandas/numpy")
+    args = parser.parse_args()
+
+    failed: bool = False
+    print(f"{'module':40s} {'pandas+numpy':>14s} {'finModel':>10s}  deferred loaded")
+    for module in CORE + OTHER:
+        res = measure(module,args.repeat)
+        own: float = res["own"] * 1000
+        over: bool = module in CORE and own > args.budget_ms
+        failed |= over or bool(res["loaded"])
+        print(f"{module:40s} {res['deps']*1000:12.1f}ms {own:8.1f}ms  {', '.join(res['loaded']) or '-'}"
+              f"{'  OVER BUDGET' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,73 +1,108 @@
-from finModel.statements.income import Revenue, COGS, OperatingExpense, IncomeStatement
-from finModel.statements.balance import OtherLiab, FinLiab, Equity, BalanceSheet
-from typing import List
+"""
+PURPOSE: Read the income statement and balance sheet of a company from its source workbook. Parsed frames can be cached
+as Arrow (feather) files so that re-reading an unchanged workbook skips pandas.read_excel. Caching is off by default:
+pass cache_dir, or set the FINMODEL_CACHE_DIR environment variable, to write cache files to that directory.
+"""
+
+from finModel.statements.income import IncomeStatement
+from finModel.statements.balance import BalanceSheet
+from finModel.statements.ingest import income_from_frame, balance_from_frame
+from typing import List, Callable, Optional
 import pandas as pd
 import numpy as np
+import hashlib
+import os
+
 
+# Parsed statements are cached as Arrow (feather) files keyed on the workbook's content hash and the parser version;
+# None (the default unless FINMODEL_CACHE_DIR is set) reads the workbook every time and writes nothing
+CACHE_DIR: Optional[str] = os.environ.get("FINMODEL_CACHE_DIR")
+# Part of every cache key; bump it when a change to the parsing makes cached frames stale
+PARSER_VERSION = 1
 
-def source_income(file_loc:str,actual_dates:List[str]) -> IncomeStatement:
+
+def file_hash(file_loc:str) -> str:
     '''
-    This function will read the excel file, convert to a data-frame indexed on dates in datetime64 format
-    and a component in each column; which is then inputted into a statement class.
+    SHA-256 of the file content; a new version of the workbook gets a new hash and therefore new cache entries
+    '''
+    digest = hashlib.sha256()
+    with open(file_loc,"rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20),b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cached_frame(file_loc:str,key:str,parse:Callable[[],pd.DataFrame],cache_dir:Optional[str]=CACHE_DIR) -> pd.DataFrame:
+    '''
+    Return the date x component frame stored for this version of the file and of the parser, or parse it once and store
+    it. Frames are stored as uncompressed Arrow IPC, so a hit is read without decompression; it is not
+    memory-mapped, as converting to pandas copies the data anyway. Caching is skipped when cache_dir is None or pyarrow
+    is not installed.
+    :param file_loc: source workbook
+    :param key: what is extracted from the workbook (statement and labels)
+    :param parse: function that parses the workbook into a frame indexed on date
+    :param cache_dir: directory holding the cache; None disables caching
+    '''
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        feather = None
+    if cache_dir is None or feather is None:
+        return parse()
+
+    name: str = hashlib.sha256(f"{file_hash(file_loc)}|{PARSER_VERSION}|{key}".encode()).hexdigest()
+    path: str = os.path.join(cache_dir,f"{name}.arrow")
+    if os.path.exists(path):
+        return feather.read_table(path).to_pandas().set_index("date")
+
+    data: pd.DataFrame = parse()
+    os.makedirs(cache_dir,exist_ok=True)
+    tmp: str = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(data.reset_index(),tmp,compression="uncompressed")
+    os.replace(tmp,path)
+    return data
+
+
+def pivot_source(data:pd.DataFrame,actual_dates:List[str]) -> pd.DataFrame:
+    '''
+    Turn the component x date layout of the source sheets into a frame indexed on dates (datetime64) with a component
+    in each column.
     '''
-    data = pd.read_excel(file_loc,sheet_name='P&L source',skiprows=2,usecols='B,D:F')
     data.columns = ['component'] + actual_dates
     data = data.dropna()
-
     data = data.melt(id_vars='component',var_name='date')
     data['date'] = [np.datetime64(date) for date in data['date']]
     data = data.pivot(index='date',columns='component')['value'].reset_index()
-    data = data.set_index('date')
-
-    income: IncomeStatement = IncomeStatement(
-        revenue = Revenue(sales = data["Revenue from sales and services"],
-                          other_revenue = data["Other revenue"]),
-        cogs = COGS(raw_material = data["Raw materials"],
-                    direct_cost=data["Direct costs"]),
-        opex = OperatingExpense(cost_for_services = data["Cost for services"],
-                                lease_cost = data["Lease costs"],
-                                other = data["Other operating expenses"]),
-        d_and_a = data["D&A"],
-        int_expense = data["Financial income/expenses"],
-        extraordinary_income = data["Extraordinary income"],
-        tax = data["Taxes"]
-    )
-    return income
-
-
-def source_balance(file_loc:str,actual_dates:List[str]) -> BalanceSheet:
+    return data.set_index('date')
+
+
+def source_income(file_loc:str,actual_dates:List[str],cache_dir:Optional[str]=CACHE_DIR) -> IncomeStatement:
     '''
     This function will read the excel file, convert to a data-frame indexed on dates in datetime64 format
     and a component in each column; which is then inputted into a statement class.
     '''
-    data_a = pd.read_excel(file_loc,sheet_name='BS source',skiprows=2,usecols='B,D:F')
-    data_a.columns = ['component'] + actual_dates
+    data = cached_frame(file_loc,f"P&L source|{actual_dates}",
+                        lambda: pivot_source(pd.read_excel(file_loc,sheet_name='P&L source',skiprows=2,usecols='B,D:F'),
+                                             actual_dates),
+                        cache_dir)
+    return income_from_frame(data)
 
-    data_b = pd.read_excel(file_loc,sheet_name='BS source',skiprows=2,usecols='H,J:L')
-    data_b.columns = ['component'] + actual_dates
 
-    data = pd.concat([data_a,data_b],axis=0).dropna()
-    data = data.melt(id_vars='component',var_name='date')
-    data['date'] = [np.datetime64(date) for date in data['date']]
-    data = data.pivot(index='date',columns='component')['value'].reset_index()
-    data = data.set_index('date')
-
-    balance: BalanceSheet = BalanceSheet(
-        intangible_asset = data["Intangible assets"],
-        ppe = data["PP&E"],
-        financial_asset = data["Financial assets"],
-        financial_liability = FinLiab(bank_borrowing = data["Bank borrowings"],
-                                      other_financial_liability = data["Other Financial liabilities"]),
-        inventory = data["Inventory"],
-        trade_receivable = data["Trade receivables"],
-        other_asset = data["Other assets"],
-        other_liability = OtherLiab(other_liability = data["Other liabilities"],
-                                    deferred_taxes = data["Deferred taxes"],
-                                    provision_for_retirement_benefit = data["Provisions for retirement benefits"]),
-        trade_payable = data["Trade payable"],
-        shareholder_equity = Equity(share_capital = data["Share Capital"],
-                                    reserve = data["Reserves"],
-                                    retained_earning = data["Retained earnings"],
-                                    net_annual_profit = data["Profit/(loss) for the year"])
-    )    
-    return balance
+def parse_balance(file_loc:str,actual_dates:List[str]) -> pd.DataFrame:
+    '''
+    Parse the 'BS source' sheet in a single pass; assets sit in columns B,D:F and liabilities in H,J:L
+    '''
+    sheet = pd.read_excel(file_loc,sheet_name='BS source',skiprows=2,usecols='B,D:F,H,J:L')
+    data_a = sheet.iloc[:,:4].copy()
+    data_b = sheet.iloc[:,4:].copy()
+    data_a.columns = data_b.columns = ['component'] + actual_dates
+    return pivot_source(pd.concat([data_a,data_b],axis=0),actual_dates)
+
+
+def source_balance(file_loc:str,actual_dates:List[str],cache_dir:Optional[str]=CACHE_DIR) -> BalanceSheet:
+    '''
+    This function will read the excel file, convert to a data-frame indexed on dates in datetime64 format
+    and a component in each column; which is then inputted into a statement class.
+    '''
+    data = cached_frame(file_loc,f"BS source|{actual_dates}",lambda: parse_balance(file_loc,actual_dates),cache_dir)
+    return balance_from_frame(data)
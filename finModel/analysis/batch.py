@@ -0,0 +1,190 @@
+"""
+PURPOSE: Values a universe of companies (forecast -> cash flow -> DCF) in chunks spread over a pool of worker processes
+"""
+from finModel.statements.income import IncomeStatement
+from finModel.statements.balance import BalanceSheet
+from finModel.statements.main import FinancialStatement
+from finModel.analysis.dcf_valuation import DCFValuation
+from finModel.analysis.store import ResultStore, StoredResult, input_key
+from dataclasses import dataclass, field
+from itertools import islice
+from collections import deque
+from typing import List, Dict, Tuple, Iterable, Iterator, Union, Mapping, Optional, Deque
+import pandas as pd
+import numpy as np
+
+
+Company = Tuple[str, IncomeStatement, BalanceSheet]
+Chunk = Tuple[List[pd.DataFrame], List[Tuple[str,str]]]
+
+
+def run_company(comp: str, inc: IncomeStatement, bs: BalanceSheet, a_date: Optional[List[str]], f_date: List[str],
+                wacc: float, lt_growth: float) -> Tuple[FinancialStatement,pd.DataFrame]:
+    '''
+    Run the single-company model
+    :param a_date: actual dates; None takes every date of the statements
+    :return: forecasted statements and the DCF outputs in long format (company, metric and value columns)
+    '''
+    a_date = inc.dates() if a_date is None else a_date
+    fin: FinancialStatement = FinancialStatement(comp=comp,a_date=a_date,f_date=f_date,inc=inc,bs=bs)
+    out: pd.DataFrame = DCFValuation(wacc=wacc,lt_growth=lt_growth,fin=fin).to_pandas_df().reset_index()
+    out.columns = ["metric","value"]
+    out.insert(0,"company",comp)
+    return fin, out
+
+
+def value_company(comp: str, inc: IncomeStatement, bs: BalanceSheet, a_date: Optional[List[str]], f_date: List[str],
+                  wacc: float, lt_growth: float) -> pd.DataFrame:
+    '''
+    Run the single-company model and return the DCF outputs in long format
+    :param a_date: actual dates; None takes every date of the statements
+    :return: data-frame with company, metric and value columns
+    '''
+    return run_company(comp,inc,bs,a_date,f_date,wacc,lt_growth)[1]
+
+
+def _rate(value: Union[float,Mapping[str,float]], comp: str) -> float:
+    return value[comp] if isinstance(value,Mapping) else value
+
+
+def _value_chunk(chunk: List[Company], a_date: Optional[List[str]], f_date: List[str],
+                 wacc: Union[float,Mapping[str,float]], lt_growth: Union[float,Mapping[str,float]],
+                 keep: bool = False) -> Tuple[List[pd.DataFrame],List[Tuple[str,str]],List[FinancialStatement]]:
+    '''
+    Value a chunk of companies, collecting failures instead of raising; module level so it can run in a worker process.
+    A company whose enterprise value is not finite (e.g. WACC at or below long-term growth) counts as failed.
+    :param keep: also return the forecasted statements (to be stored)
+    '''
+    results: List[pd.DataFrame] = []
+    failures: List[Tuple[str,str]] = []
+    statements: List[FinancialStatement] = []
+    for comp, inc, bs in chunk:
+        try:
+            fin, out = run_company(comp,inc,bs,a_date,f_date,_rate(wacc,comp),_rate(lt_growth,comp))
+            ev: np.ndarray = out.loc[out["metric"] == "Enterprise value","value"].values
+            if not np.isfinite(ev).all():
+                raise ValueError(f"Enterprise value is not finite ({ev[0]})")
+            results.append(out)
+            if keep:
+                statements.append(fin)
+        except Exception as err:
+            failures.append((comp,f"{type(err).__name__}: {err}"))
+    return results, failures, statements
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    '''
+    Split an iterable into lists of at most size items without materialising it
+    '''
+    it: Iterator = iter(items)
+    chunk: List = list(islice(it,size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it,size))
+
+
+def _lookup(chunk: List[Company], store: ResultStore, a_date: Optional[List[str]], f_date: List[str],
+            wacc: Union[float,Mapping[str,float]], lt_growth: Union[float,Mapping[str,float]]
+            ) -> Tuple[List[Company],Dict[str,str],Dict[str,StoredResult]]:
+    '''
+    Split a chunk into the companies still to value and the stored results of the others
+    :return: companies to value, input key of every company that could be hashed, stored results by company
+    '''
+    keys: Dict[str,str] = {}
+    for comp, inc, bs in chunk:
+        try:
+            keys[comp] = input_key(comp,inc,bs,a_date,f_date,_rate(wacc,comp),_rate(lt_growth,comp))
+        except Exception:
+            # Left to the model, which reports the failure
+            pass
+    found: Dict[str,StoredResult] = store.get_many(keys.values())
+    stored: Dict[str,StoredResult] = {comp: found[key] for comp, key in keys.items() if key in found}
+    return [c for c in chunk if c[0] not in stored], keys, stored
+
+
+def value_chunks(companies: Iterable[Company], a_date: Optional[List[str]], f_date: List[str],
+                 wacc: Union[float,Mapping[str,float]], lt_growth: Union[float,Mapping[str,float]],
+                 workers: int = 1, chunk_size: int = 50, store: Optional[ResultStore] = None) -> Iterator[Chunk]:
+    '''
+    Value companies chunk by chunk and yield the (results, failures) of every chunk, in order, as soon as it is done.
+    At most two chunks per worker are in flight, so companies are only read from the iterable as the pool frees up.
+    :param companies: (company, income statement, balance sheet) of actuals for each company
+    :param a_date: actual dates; None takes every date of each company's statements
+    :param workers: number of worker processes; 1 runs in-process
+    :param chunk_size: companies per task sent to a worker
+    :param store: results of companies whose inputs are unchanged are read from it; the others are valued and stored
+    '''
+    def prepare(chunk: List[Company]) -> Tuple[List[Company],List[Company],Dict[str,str],Dict[str,StoredResult]]:
+        if store is None:
+            return chunk, chunk, {}, {}
+        return (chunk,) + _lookup(chunk,store,a_date,f_date,wacc,lt_growth)
+
+    def finish(chunk: List[Company], keys: Dict[str,str], stored: Dict[str,StoredResult], results: List[pd.DataFrame],
+               failures: List[Tuple[str,str]], statements: List[FinancialStatement]) -> Chunk:
+        if store is None:
+            return results, failures
+        store.put_many((keys[fin.company],fin.company,val,fin) for fin, val in zip(statements,results)
+                       if fin.company in keys)
+        # Stored and new results in the order of the companies
+        valued: Dict[str,pd.DataFrame] = {**{c: r.valuation for c,r in stored.items()},
+                                          **{fin.company: val for fin, val in zip(statements,results)}}
+        return [valued[c[0]] for c in chunk if c[0] in valued], failures
+
+    keep: bool = store is not None
+    tasks: Iterator = map(prepare,chunked(companies,chunk_size))
+    if workers <= 1:
+        for chunk, todo, keys, stored in tasks:
+            yield finish(chunk,keys,stored,*_value_chunk(todo,a_date,f_date,wacc,lt_growth,keep))
+        return
+    def collect(chunk, keys, stored, task) -> Chunk:
+        return finish(chunk,keys,stored,*(task.result() if task is not None else ([],[],[])))
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque = deque()
+        for chunk, todo, keys, stored in tasks:
+            # Chunks fully found in the store are not sent to the pool
+            task = pool.submit(_value_chunk,todo,a_date,f_date,wacc,lt_growth,keep) if todo else None
+            pending.append((chunk,keys,stored,task))
+            if len(pending) >= 2*workers:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+
+
+@dataclass
+class BatchValuation:
+    '''
+    Values many companies in one call. Work is shipped to worker processes in chunks of chunk_size companies; a company
+    that fails is recorded in failures and does not abort the batch. With a ResultStore, only companies whose inputs
+    changed since they were stored are valued.
+    '''
+    results: pd.DataFrame = field(init=False)
+    failures: pd.DataFrame = field(init=False)
+
+    def __init__(self, companies: Iterable[Company], a_date: Optional[List[str]], f_date: List[str],
+                 wacc: Union[float,Mapping[str,float]], lt_growth: Union[float,Mapping[str,float]],
+                 workers: int = 1, chunk_size: int = 50, store: Optional[ResultStore] = None):
+        '''
+        :param companies: (company, income statement, balance sheet) of actuals for each company
+        :param a_date: actual dates; None takes every date of each company's statements
+        :param f_date: dates to be forecasted
+        :param wacc: WACC for all companies or per company
+        :param lt_growth: long-term growth for all companies or per company
+        :param workers: number of worker processes; 1 runs in-process
+        :param chunk_size: companies per task sent to a worker
+        :param store: store of earlier results (see store.ResultStore)
+        '''
+        done: List[Chunk] = list(value_chunks(companies,a_date,f_date,wacc,lt_growth,workers,chunk_size,store))
+        frames: List[pd.DataFrame] = [f for res,_ in done for f in res]
+        self.results = pd.concat(frames,ignore_index=True) if frames else \
+            pd.DataFrame(columns=["company","metric","value"])
+        self.failures = pd.DataFrame([f for _,fail in done for f in fail],columns=["company","error"])
+
+    def to_pandas_df(self, wide: bool = False) -> pd.DataFrame:
+        '''
+        Consolidated results; long format (company, metric, value) by default or one row per company if wide
+        '''
+        if wide:
+            return self.results.pivot(index="company",columns="metric",values="value")
+        return self.results
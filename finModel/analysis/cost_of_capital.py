@@ -0,0 +1,133 @@
+"""
+PURPOSE: Batched cost of capital. Cost of debt, cost of equity (CAPM) and WACC are computed per period for a whole universe
+of issuers as (companies x periods) arrays, with beta, risk-free rate and market return taken from a local table.
+"""
+from finModel.statements.main import FinancialStatement
+from typing import List, Dict, Mapping, Union
+import pandas as pd
+import numpy as np
+import os
+
+
+MARKET_COLUMNS = ["company", "beta", "rf", "market_return"]
+
+Rate = Union[float, np.ndarray]
+
+
+def load_market_table(path: str) -> pd.DataFrame:
+    '''
+    Read the beta/risk-free table of a universe from CSV or Parquet
+    :param path: file with columns company, beta, rf and market_return, and optionally date for rates that vary over
+                 time (the latest row on or before each period is used)
+    :return: table indexed on company (and date)
+    '''
+    ext: str = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        data: pd.DataFrame = pd.read_csv(path)
+    elif ext in (".parquet",".pq"):
+        data: pd.DataFrame = pd.read_parquet(path)
+    else:
+        raise ValueError(f"Unsupported market table format: {ext}")
+    missing: List[str] = [c for c in MARKET_COLUMNS if c not in data.columns]
+    if missing:
+        raise KeyError(f"Market table is missing columns: {missing}")
+    if "date" in data.columns:
+        data["date"] = pd.to_datetime(data["date"])
+        return data.set_index(["company","date"])[MARKET_COLUMNS[1:]].sort_index()
+    return data.set_index("company")[MARKET_COLUMNS[1:]]
+
+
+def cost_of_equity(rf: Rate, beta: Rate, market_return: Rate) -> np.ndarray:
+    '''
+    CAPM cost of equity, broadcast over any shape of inputs
+    '''
+    rf = np.asarray(rf,dtype=float)
+    return rf + np.asarray(beta,dtype=float) * (np.asarray(market_return,dtype=float) - rf)
+
+
+def cost_of_debt(int_expense: Rate, fin_liab: Rate) -> np.ndarray:
+    '''
+    Cost of debt as interest expenses over financial liabilities. Expenses are negative in the statements, so the rate is
+    returned as a positive number; periods without financial liabilities give NaN.
+    '''
+    fin_liab = np.asarray(fin_liab,dtype=float)
+    with np.errstate(divide="ignore",invalid="ignore"):
+        return np.where(fin_liab != 0,-np.asarray(int_expense,dtype=float) / fin_liab,np.nan)
+
+
+def wacc(D: Rate, E: Rate, t: Rate, kd: Rate, ke: Rate) -> np.ndarray:
+    '''
+    Weighted average cost of capital, broadcast over any shape of inputs
+    :param D: financial liabilities
+    :param E: equity
+    :param t: tax-rate as a positive fraction
+    :param kd: cost of debt
+    :param ke: cost of equity
+    '''
+    D = np.asarray(D,dtype=float)
+    E = np.asarray(E,dtype=float)
+    V: np.ndarray = D + E
+    return (D/V)*(1-np.asarray(t,dtype=float))*np.asarray(kd,dtype=float) + (E/V)*np.asarray(ke,dtype=float)
+
+
+def capital_structure(statements: Mapping[str,FinancialStatement], dates: Union[List[str],pd.DatetimeIndex]
+                      ) -> Dict[str,np.ndarray]:
+    '''
+    Stack the capital structure inputs of many companies on common dates
+    :param statements: financial statements keyed by company
+    :param dates: periods to take (e.g. the forecast dates)
+    :return: (companies x periods) arrays of interest expenses, financial liabilities (D), book equity (E) and the
+             tax-rate as a positive fraction (t)
+    '''
+    dates = pd.DatetimeIndex(dates)
+
+    def stack(get) -> np.ndarray:
+        return np.vstack([get(fs).reindex(dates).values for fs in statements.values()]).astype(float)
+
+    return {
+        "int_expense": stack(lambda fs: fs.income.int_expense),
+        "D": stack(lambda fs: fs.balance.financial_liability.total),
+        "E": stack(lambda fs: fs.balance.shareholder_equity.total_equity),
+        "t": -stack(lambda fs: fs.income.tax_rate),
+    }
+
+
+def market_inputs(table: pd.DataFrame, companies: List[str], dates: pd.DatetimeIndex) -> Dict[str,np.ndarray]:
+    '''
+    Align the beta/risk-free table (see load_market_table()) to (companies x periods) arrays
+    '''
+    missing: List[str] = [c for c in companies if c not in table.index.get_level_values("company")]
+    if missing:
+        raise KeyError(f"No market data for companies: {missing}")
+    if table.index.nlevels == 1:
+        rows: pd.DataFrame = table.loc[companies]
+        return {c: np.broadcast_to(rows[c].values[:,np.newaxis],(len(companies),len(dates))) for c in rows.columns}
+    # Carry the latest observation of each company forward onto the periods
+    when: pd.DatetimeIndex = table.index.get_level_values("date").unique().union(dates)
+    return {c: table[c].unstack("company").reindex(index=when,columns=companies).ffill().reindex(dates).values.T
+            for c in table.columns}
+
+
+def universe_wacc(statements: Mapping[str,FinancialStatement], table: pd.DataFrame,
+                  dates: Union[List[str],pd.DatetimeIndex] = None,
+                  as_array: bool = False) -> Union[pd.DataFrame,Dict[str,np.ndarray]]:
+    '''
+    Cost of debt, cost of equity and WACC of every company and period in one batched pass
+    :param statements: financial statements keyed by company
+    :param table: beta/risk-free table (see load_market_table())
+    :param dates: periods to compute; defaults to the forecast dates of the first statement
+    :param as_array: return (companies x periods) arrays keyed by metric instead of a long data-frame
+    '''
+    companies: List[str] = list(statements)
+    if dates is None:
+        dates = next(iter(statements.values())).forecast_dates
+    dates = pd.DatetimeIndex(dates)
+    cap: Dict[str,np.ndarray] = capital_structure(statements,dates)
+    mkt: Dict[str,np.ndarray] = market_inputs(table,companies,dates)
+    kd: np.ndarray = cost_of_debt(cap["int_expense"],cap["D"])
+    ke: np.ndarray = cost_of_equity(mkt["rf"],mkt["beta"],mkt["market_return"])
+    out: Dict[str,np.ndarray] = {"kd": kd, "ke": ke, "wacc": wacc(cap["D"],cap["E"],cap["t"],kd,ke)}
+    if as_array:
+        return out
+    index: pd.MultiIndex = pd.MultiIndex.from_product([companies,dates],names=["company","date"])
+    return pd.DataFrame({k: v.ravel() for k,v in out.items()},index=index)
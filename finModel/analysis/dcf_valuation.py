@@ -2,8 +2,12 @@
 PURPOSE: This module performs the direct cashflows valuation and holds associated analysis
 """
 from finModel.statements.main import FinancialStatement
+from finModel.analysis.solver import Solution, implied_wacc, implied_growth, enterprise_target
+from finModel.analysis.sensitivity import rate_greeks, driver_greeks
+from finModel.statements.projection import driver_stats, anchors
+from finModel.analysis.cost_of_capital import cost_of_debt
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Union
 import pandas as pd
 import numpy as np
 
@@ -23,13 +27,13 @@ def calc_cost_of_equity(rf:float,beta:float,market_risk:float) -> float:
 def calc_cost_of_debt(fs: FinancialStatement) -> pd.Series:
     '''
     Calculates cost of debt as the ratio of interest expenses (from income statement)
-    to financial liabilities (from balance sheet).
+    to financial liabilities (from balance sheet), as a positive rate (see cost_of_capital.cost_of_debt).
     :param fs: Financial statements
     :return: cost of debt for each period
     '''
-    int_exp: pd.Series = FinancialStatement.income.int_expense
-    fin_liab: pd.Series = FinancialStatement.balance.financial_liability.total
-    kd: pd.Series = int_exp/fin_liab
+    int_exp: pd.Series = fs.income.int_expense
+    fin_liab: pd.Series = fs.balance.financial_liability.total
+    kd: pd.Series = pd.Series(cost_of_debt(int_exp,fin_liab),index=int_exp.index)
     return kd
 
 
@@ -45,11 +49,88 @@ def calc_wacc(D:float,E:float,t:float,kd:float,ke:float) -> float:
     wacc: float = (D/(D+E))*(1-t)*kd + (E/(D+E))*ke
     return wacc
 
+
+def discount_factors(wacc: Union[float,np.ndarray], n: int) -> np.ndarray:
+    '''
+    Discount factors 1/(1+wacc)^t for t = 1..n; any leading shape of wacc is kept and periods are added as last axis
+    :param wacc: discount rate(s)
+    :param n: number of forecast periods
+    :return: discount factors of shape wacc.shape + (n,)
+    '''
+    rate: np.ndarray = np.asarray(wacc,dtype=float)[...,np.newaxis]
+    return np.power(1+rate,-np.arange(1,n+1))
+
+
+def cumulative_discount_factors(wacc: np.ndarray) -> np.ndarray:
+    '''
+    Discount factors for a rate that varies by period: prod_{s<=t} 1/(1+wacc_s), in one cumulative product
+    :param wacc: discount rates of shape (..., n), one per forecast period
+    :return: discount factors of the same shape
+    '''
+    return 1/np.cumprod(1+np.asarray(wacc,dtype=float),axis=-1)
+
+
+def dcf_grid(ufcf: np.ndarray, wacc: np.ndarray, lt_growth: np.ndarray) -> Dict[str,np.ndarray]:
+    '''
+    Value a single stream of forecasted cashflows for every (wacc, long-term growth) pair in one broadcasted pass
+    :param ufcf: unlevered free cashflows of the forecast periods
+    :param wacc: WACC values (rows of the grid)
+    :param lt_growth: long-term growth values (columns of the grid)
+    :return: dense arrays of shape (len(wacc), len(lt_growth)) keyed by metric
+    '''
+    ufcf = np.asarray(ufcf,dtype=float)
+    w: np.ndarray = np.asarray(wacc,dtype=float)
+    g: np.ndarray = np.asarray(lt_growth,dtype=float)
+    discount: np.ndarray = discount_factors(w,len(ufcf))
+    pv_ufcf: np.ndarray = np.broadcast_to((discount @ ufcf)[:,np.newaxis],(len(w),len(g)))
+    cont_val: np.ndarray = ufcf[-1] * (1+g[np.newaxis,:]) / (w[:,np.newaxis]-g[np.newaxis,:])
+    pv_cont_val: np.ndarray = cont_val * discount[:,-1:]
+    ent_val: np.ndarray = pv_ufcf + pv_cont_val
+    return {
+        "PV of Cash flows": pv_ufcf,
+        "Continuing value": cont_val,
+        "PV of Continuing value": pv_cont_val,
+        "Enterprise Value": ent_val,
+        "CFs in Forecast period": pv_ufcf/ent_val,
+        "Continuing Value": pv_cont_val/ent_val,
+    }
+
+
+def value_cashflows(ufcf: np.ndarray, wacc: Union[float,np.ndarray], lt_growth: Union[float,np.ndarray],
+                    fin_liab: Union[float,np.ndarray], cash: Union[float,np.ndarray]) -> Dict[str,np.ndarray]:
+    '''
+    Batched form of DCFValuation: values cashflows carrying any leading shape (paths, scenarios, companies)
+    :param ufcf: unlevered free cashflows of shape (..., n)
+    :param wacc: WACC, broadcastable against ufcf[..., 0]
+    :param lt_growth: long-term growth, broadcastable against ufcf[..., 0]
+    :param fin_liab: financial liabilities at the last actual date
+    :param cash: cash at the last actual date
+    :return: valuation metrics of shape ufcf.shape[:-1]
+    '''
+    ufcf = np.asarray(ufcf,dtype=float)
+    w: np.ndarray = np.asarray(wacc,dtype=float)
+    g: np.ndarray = np.asarray(lt_growth,dtype=float)
+    discount: np.ndarray = discount_factors(w,ufcf.shape[-1])
+    pv_ufcf: np.ndarray = np.sum(ufcf*discount,axis=-1)
+    cont_val: np.ndarray = ufcf[...,-1] * (1+g) / (w-g)
+    pv_cont_val: np.ndarray = cont_val * discount[...,-1]
+    ent_val: np.ndarray = pv_ufcf + pv_cont_val
+    return {"pv_ufcf": pv_ufcf, "cont_val": cont_val, "pv_cont_val": pv_cont_val, "ent_val": ent_val,
+            "equity": ent_val - np.asarray(fin_liab) + np.asarray(cash)}
+
+
 @dataclass
 class DCFValuation:
+    '''
+    Values the forecasted unlevered free cashflows. WACC can be a single rate or one rate per forecast period (e.g. from
+    cost_of_capital.universe_wacc()); with a per-period rate the cashflows are discounted cumulatively and the rate of
+    the last period is used for the continuing value (wacc holds that rate and wacc_path the whole path).
+    '''
     wacc: float
     g: float
     statement: FinancialStatement
+    wacc_path: np.ndarray = field(init=False)
+    discount: np.ndarray = field(init=False)
     pv_ufcf: float = field(init=False)
     pv_ufcf_shr: float = field(init=False)
     cont_val: float = field(init=False)
@@ -60,12 +141,27 @@ class DCFValuation:
     cash: float = field(init=False)
     equity: float = field(init=False)
 
-    def __init__(self,wacc:float,lt_growth:float,fin:FinancialStatement):
-        self.wacc = wacc
+    def __init__(self,wacc:Union[float,List[float],np.ndarray,pd.Series],lt_growth:float,fin:FinancialStatement):
         self.g = lt_growth
         self.statement = fin
         ufcf: pd.Series = fin.cash.ufcf[fin.forecast_dates]
-        discount: np.ndarray = np.array([1/np.power(1+wacc,idx) for idx in np.arange(1,len(fin.forecast_dates)+1)])
+        if np.ndim(wacc) == 0:
+            self.wacc = wacc
+            self.wacc_path = np.full(len(fin.forecast_dates),wacc,dtype=float)
+            discount: np.ndarray = discount_factors(wacc,len(fin.forecast_dates))
+        else:
+            path = wacc
+            if isinstance(wacc,pd.Series):
+                path = wacc.set_axis(pd.to_datetime(wacc.index)).reindex(fin.forecast_dates)
+                if path.isna().any():
+                    raise ValueError(f"WACC missing for forecast periods: {list(path.index[path.isna()].date)}")
+            self.wacc_path = np.asarray(path,dtype=float)
+            if self.wacc_path.shape != (len(fin.forecast_dates),):
+                raise ValueError(f"Expected one WACC per forecast period ({len(fin.forecast_dates)}), "
+                                 f"got shape {self.wacc_path.shape}")
+            self.wacc = self.wacc_path[-1]
+            discount: np.ndarray = cumulative_discount_factors(self.wacc_path)
+        self.discount = discount
         self.pv_ufcf = np.multiply(ufcf,discount).sum()
         self.cont_val = ufcf[-1] * (1+self.g) / (self.wacc-self.g)
         self.pv_cont_val = self.cont_val * discount[-1]
@@ -97,27 +193,72 @@ class DCFValuation:
 
         return out.set_index("metric")
 
-    def simulate_enterprise_val(self, wacc: List[float] = None, lt_growth: List[float] = None) -> pd.DataFrame:
+    def implied_wacc(self, ev: float = None, equity: float = None, **kwargs) -> Solution:
+        '''
+        Flat WACC at which the forecasted cashflows are worth the given enterprise value (or equity value), keeping the
+        long-term growth (see solver.implied_wacc() for the options)
+        '''
+        ufcf: np.ndarray = self.statement.cash.ufcf[self.statement.forecast_dates].values
+        return implied_wacc(ufcf,enterprise_target(ev,equity,-self.tot_fin_liab,self.cash),self.g,**kwargs)
+
+    def implied_growth(self, ev: float = None, equity: float = None) -> Solution:
+        '''
+        Long-term growth at which the forecasted cashflows are worth the given enterprise value (or equity value),
+        keeping the WACC
+        '''
+        ufcf: np.ndarray = self.statement.cash.ufcf[self.statement.forecast_dates].values
+        return implied_growth(ufcf,enterprise_target(ev,equity,-self.tot_fin_liab,self.cash),self.wacc,self.discount)
+
+    def sensitivities(self, drivers: bool = True) -> pd.DataFrame:
+        '''
+        First-order sensitivities of enterprise (and equity) value: analytic dEV/dWACC (parallel shift of the WACC path)
+        and dEV/dg, and dEV/d(driver) for the drivers of the avg. growth methodology at their historical point
+        estimates (see sensitivity.driver_greeks())
+        :param drivers: include the driver sensitivities
+        '''
+        fin: FinancialStatement = self.statement
+        ufcf: np.ndarray = fin.cash.ufcf[fin.forecast_dates].values
+        res_dict: Dict[str,float] = {k: float(v) for k,v in rate_greeks(ufcf,self.wacc_path,self.g,
+                                                                        per_period=True).items()}
+        if drivers:
+            a_inc, a_bs = fin.income.select(fin.actual_dates), fin.balance.select(fin.actual_dates)
+            greeks: Dict[str,np.ndarray] = driver_greeks(anchors(a_inc,a_bs),driver_stats(a_inc,a_bs).drivers,
+                                                         len(fin.forecast_dates),self.wacc_path,self.g,
+                                                         per_period=True)
+            res_dict.update({f"dEV/d{k}": float(v) for k,v in greeks.items()})
+        out: pd.DataFrame = pd.DataFrame({
+            "metric": [k for k,v in res_dict.items()],
+            "": [v for k,v in res_dict.items()]
+        })
+
+        return out.set_index("metric")
+
+    def simulate_enterprise_val(self, wacc: List[float] = None, lt_growth: List[float] = None,
+                                as_array: bool = False) -> Union[pd.DataFrame,Dict[str,np.ndarray]]:
         '''
-        Generate enterprise values for each various WACC and long-term growth rates
+        Generate enterprise values for each various WACC and long-term growth rates. The whole grid is valued in one
+        broadcasted pass over the forecasted cashflows (see dcf_grid()).
+        :param wacc: WACC values to simulate
+        :param lt_growth: long-term growth values to simulate
+        :param as_array: return dense (wacc x growth) arrays keyed by metric instead of a long data-frame
         '''
         if wacc is None:
             wacc: List[float] = [self.wacc + v for v in [-0.01,0,0.01,0.02]]
         if lt_growth is None:
             lt_growth: List[float] = [self.g + v for v in [-0.01,0,0.01,0.02]]
 
-        result_set = []
-        for w in wacc:
-            for g in lt_growth:
-                d: DCFValuation = DCFValuation(wacc=w,lt_growth=g,fin=self.statement)
-                result_set.append(d)
+        ufcf: np.ndarray = self.statement.cash.ufcf[self.statement.forecast_dates].values
+        grid: Dict[str,np.ndarray] = dcf_grid(ufcf,np.asarray(wacc,dtype=float),np.asarray(lt_growth,dtype=float))
+        if as_array:
+            return grid
 
+        w, g = np.meshgrid(np.asarray(wacc,dtype=float),np.asarray(lt_growth,dtype=float),indexing="ij")
         simulated: pd.DataFrame = pd.DataFrame({
-            "WACC": [dcf.wacc for dcf in result_set],
-            "Long-term growth": [dcf.g for dcf in result_set],
-            "Enterprise Value": [dcf.ent_val for dcf in result_set],
-            "CFs in Forecast period": [dcf.pv_ufcf_shr for dcf in result_set],
-            "Continuing Value": [dcf.pv_cont_val_shr for dcf in result_set],
+            "WACC": w.ravel(),
+            "Long-term growth": g.ravel(),
+            "Enterprise Value": grid["Enterprise Value"].ravel(),
+            "CFs in Forecast period": grid["CFs in Forecast period"].ravel(),
+            "Continuing Value": grid["Continuing Value"].ravel(),
         })
 
-        return simulated
\ No newline at end of file
+        return simulated
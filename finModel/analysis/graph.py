@@ -0,0 +1,99 @@
+"""
+PURPOSE: Dependency-tracked form of the forecast -> cash flow -> DCF chain for what-if analysis. Nodes are evaluated
+lazily and memoised; changing an input only drops the nodes downstream of it.
+"""
+from finModel.statements.income import IncomeStatement
+from finModel.statements.balance import BalanceSheet
+from finModel.statements.projection import NODES, DRIVERS, chain_inputs, driver_stats, anchors
+from finModel.analysis.dcf_valuation import discount_factors
+from collections import defaultdict
+from typing import List, Dict, Set, Tuple, Callable, Any
+import numpy as np
+
+
+VALUATION_NODES: Dict[str,Tuple[Tuple[str,...],Callable]] = {
+    "discount": (("wacc","t"), lambda w,t: discount_factors(w,len(t))),
+    "pv_ufcf": (("ufcf","discount"), lambda u,d: np.sum(u*d,axis=-1)),
+    "cont_val": (("ufcf","wacc","g"), lambda u,w,g: u[...,-1] * (1+g) / (w-g)),
+    "pv_cont_val": (("cont_val","discount"), lambda c,d: c * d[...,-1]),
+    "ent_val": (("pv_ufcf","pv_cont_val"), lambda p,c: p + c),
+    "equity": (("ent_val","last_financial_liability","last_cash"), lambda e,l,c: e - l[...,0] + c[...,0]),
+}
+MODEL_NODES: Dict[str,Tuple[Tuple[str,...],Callable]] = {**NODES, **VALUATION_NODES}
+
+
+class ModelGraph:
+    '''
+    Line item -> subtotal -> cash flow -> valuation graph built from the formulas of the avg. growth methodology.
+
+        graph = ModelGraph.from_statements(inc, bs, f_date, wacc=0.1, lt_growth=0.02)
+        graph["equity"]            # evaluates the whole chain once
+        graph.set(tax_rate=-0.25)  # drops tax, operating tax, NOPAT ... equity; sales, working capital etc. are kept
+        graph["equity"]            # recomputes only the dropped nodes
+    '''
+
+    def __init__(self, inputs: Dict[str,Any], nodes: Dict[str,Tuple[Tuple[str,...],Callable]] = MODEL_NODES):
+        '''
+        :param inputs: values of every input referenced by the nodes (see chain_inputs())
+        :param nodes: formulas as (inputs, function) per node
+        '''
+        self.nodes = nodes
+        self._inputs: Dict[str,Any] = dict(inputs)
+        self._cache: Dict[str,Any] = {}
+        self._children: Dict[str,Set[str]] = defaultdict(set)
+        for name,(deps,_) in nodes.items():
+            for d in deps:
+                self._children[d].add(name)
+
+    @classmethod
+    def from_statements(cls, inc: IncomeStatement, bs: BalanceSheet, f_date: List[str], wacc: float,
+                        lt_growth: float) -> "ModelGraph":
+        '''
+        Build the graph from actuals, with drivers at their historical point estimates
+        '''
+        inputs: Dict[str,Any] = chain_inputs(anchors(inc,bs),driver_stats(inc,bs).drivers,len(f_date))
+        inputs.update({"wacc": wacc, "g": lt_growth})
+        return cls(inputs)
+
+    def downstream(self, name: str) -> Set[str]:
+        '''
+        All nodes that (directly or indirectly) depend on name
+        '''
+        found: Set[str] = set()
+        stack: List[str] = [name]
+        while stack:
+            for child in self._children[stack.pop()]:
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        return found
+
+    def set(self, **changes: Any) -> Set[str]:
+        '''
+        Change inputs and drop the memoised values downstream of them
+        :param changes: new input values; drivers and last_* anchors are given without the period axis
+        :return: nodes that were invalidated
+        '''
+        dropped: Set[str] = set()
+        for name,val in changes.items():
+            if name not in self._inputs:
+                raise KeyError(f"{name} is not an input of the model graph")
+            self._inputs[name] = np.asarray(val)[...,np.newaxis] if name in DRIVERS or name.startswith("last_") else val
+            dropped |= self.downstream(name)
+        for name in dropped:
+            self._cache.pop(name,None)
+        return dropped
+
+    def get(self, name: str) -> Any:
+        '''
+        Value of an input or node, evaluating (and memoising) whatever upstream nodes are missing
+        '''
+        if name in self._inputs:
+            return self._inputs[name]
+        if name not in self._cache:
+            deps, fn = self.nodes[name]
+            self._cache[name] = fn(*[self.get(d) for d in deps])
+        return self._cache[name]
+
+    def __getitem__(self, name: str) -> Any:
+        return self.get(name)
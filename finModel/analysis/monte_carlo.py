@@ -0,0 +1,118 @@
+"""
+PURPOSE: Stochastic valuation; samples the avg. growth forecast drivers from distributions fitted to the actuals and runs
+every path through the batched projection and DCF chain.
+"""
+from finModel.statements.income import IncomeStatement
+from finModel.statements.balance import BalanceSheet
+from finModel.statements.projection import DRIVERS, DriverStats, driver_stats, anchors, project
+from finModel.analysis.dcf_valuation import value_cashflows
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, Sequence
+import pandas as pd
+import numpy as np
+
+
+def fit_drivers(inc: IncomeStatement, bs: BalanceSheet) -> pd.DataFrame:
+    '''
+    Fit a normal distribution to the historical observations of each driver
+    :param inc: income statement (actuals)
+    :param bs: balance sheet (actuals)
+    :return: data-frame indexed on driver with the mean (point estimate) and standard deviation
+    '''
+    stats: DriverStats = driver_stats(inc,bs)
+    # A single observation carries no dispersion; such drivers are kept at their point estimate
+    std: Dict[str,float] = {d: float(np.nanstd(stats.history[d],ddof=1)) if np.sum(~np.isnan(stats.history[d])) > 1
+                            else 0.0 for d in DRIVERS}
+    return pd.DataFrame({"mean": stats.drivers, "std": std}).loc[list(DRIVERS)]
+
+
+# Paths are drawn in blocks of this many, each from its own child seed, whatever the chunks they are valued in
+PATH_BLOCK = 10_000
+
+
+def _draw(dist: pd.DataFrame, start: int, stop: int, entropy: int) -> Dict[str,np.ndarray]:
+    '''
+    Driver samples of paths start to stop; path i is always drawn from block i // PATH_BLOCK of the seed
+    '''
+    blocks: List[np.ndarray] = []
+    for b in range(start // PATH_BLOCK,-(-stop // PATH_BLOCK)):
+        rng: np.random.Generator = np.random.default_rng(np.random.SeedSequence(entropy,spawn_key=(b,)))
+        blocks.append(rng.standard_normal((len(DRIVERS),PATH_BLOCK)))
+    z: np.ndarray = np.concatenate(blocks,axis=-1)[:,start % PATH_BLOCK:start % PATH_BLOCK + stop - start]
+    return {d: dist.loc[d,"mean"] + dist.loc[d,"std"]*z[i] for i,d in enumerate(DRIVERS)}
+
+
+def _simulate_paths(anchor: Dict[str,float], dist: pd.DataFrame, start: int, stop: int, n_periods: int, wacc: float,
+                    lt_growth: float, entropy: int) -> Tuple[np.ndarray,np.ndarray]:
+    '''
+    Sample paths start to stop and value them; module level so that it can be shipped to worker processes
+    '''
+    drivers: Dict[str,np.ndarray] = _draw(dist,start,stop,entropy)
+    ufcf: np.ndarray = project(anchor,drivers,n_periods)["ufcf"]
+    res: Dict[str,np.ndarray] = value_cashflows(ufcf,wacc,lt_growth,anchor["financial_liability"],anchor["cash"])
+    return res["ent_val"], res["equity"]
+
+
+@dataclass
+class MonteCarloValuation:
+    '''
+    Distribution of enterprise and equity values over n_paths sampled sets of forecast drivers. The drivers of every
+    path are drawn from a fixed block of the seed (see PATH_BLOCK), so results only depend on the seed and n_paths, not
+    on the number of workers or the chunk size.
+    '''
+    wacc: float
+    g: float
+    n_paths: int
+    seed: Optional[int]
+    drivers: pd.DataFrame = field(init=False)
+    ent_val: np.ndarray = field(init=False)
+    equity: np.ndarray = field(init=False)
+
+    def __init__(self, wacc: float, lt_growth: float, inc: IncomeStatement, bs: BalanceSheet, f_date: List[str],
+                 n_paths: int = 100_000, seed: Optional[int] = None, vol_scale: float = 1.0, workers: int = 1,
+                 chunk_size: int = 50_000):
+        '''
+        :param wacc: weighted average cost of capital
+        :param lt_growth: long-term growth of the continuing value
+        :param inc: income statement (actuals)
+        :param bs: balance sheet (actuals)
+        :param f_date: dates to be forecasted
+        :param n_paths: number of simulated paths
+        :param seed: seed of the random generator; None draws fresh entropy
+        :param vol_scale: multiplier applied to the fitted standard deviations
+        :param workers: number of worker processes; 1 runs in-process
+        :param chunk_size: paths simulated per task
+        '''
+        self.wacc = wacc
+        self.g = lt_growth
+        self.n_paths = n_paths
+        self.seed = seed
+        self.drivers = fit_drivers(inc,bs)
+        dist: pd.DataFrame = self.drivers.assign(std=self.drivers["std"]*vol_scale)
+        anchor: Dict[str,float] = anchors(inc,bs)
+
+        entropy: int = np.random.SeedSequence(seed).entropy
+        args = [(anchor,dist,start,min(start+chunk_size,n_paths),len(f_date),wacc,lt_growth,entropy)
+                for start in range(0,n_paths,chunk_size)]
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunks = list(pool.map(_simulate_paths,*zip(*args)))
+        else:
+            chunks = [_simulate_paths(*a) for a in args]
+        self.ent_val = np.concatenate([c[0] for c in chunks])
+        self.equity = np.concatenate([c[1] for c in chunks])
+
+    def quantiles(self, q: Sequence[float] = (0.05,0.25,0.5,0.75,0.95)) -> pd.DataFrame:
+        '''
+        Quantiles of the simulated enterprise and equity values
+        '''
+        return pd.DataFrame({"Enterprise value": np.nanquantile(self.ent_val,q),
+                             "Equity value": np.nanquantile(self.equity,q)},
+                            index=pd.Index(q,name="quantile"))
+
+    def to_pandas_df(self) -> pd.DataFrame:
+        '''
+        Simulated values, one row per path
+        '''
+        return pd.DataFrame({"Enterprise value": self.ent_val, "Equity value": self.equity})
@@ -0,0 +1,185 @@
+"""
+PURPOSE: Streaming valuation of a universe. Stages are generators (ingest -> forecast & cash flow -> DCF -> ratios -> sink)
+connected by bounded queues, and results are appended to disk as companies finish, so memory does not grow with the
+size of the universe.
+"""
+from finModel.statements.income import IncomeStatement
+from finModel.statements.balance import BalanceSheet
+from finModel.statements.main import FinancialStatement
+from finModel.analysis.dcf_valuation import DCFValuation
+from finModel.analysis.ratios import FinRatio
+from dataclasses import dataclass, field
+from threading import Thread, Event
+from queue import Queue, Full
+from typing import List, Tuple, Iterable, Iterator, Optional, Any
+import pandas as pd
+import os
+
+
+RESULT_COLUMNS = ["company", "section", "metric", "period", "value"]
+_DONE = object()
+
+
+def buffered(items: Iterable, maxsize: int = 8, timeout: float = 0.1) -> Iterator:
+    '''
+    Run an upstream generator in a background thread, handing items over through a queue of at most maxsize items.
+    Exceptions raised upstream are re-raised in the consumer. When the consumer stops early (an exception, or the
+    generator is closed), the producer notices within timeout seconds, closes the upstream generator and exits.
+    '''
+    q: Queue = Queue(maxsize=maxsize)
+    stop: Event = Event()
+    upstream: Iterator = iter(items)
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item,timeout=timeout)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in upstream:
+                if not put(item):
+                    break
+        except BaseException as err:
+            put(err)
+        finally:
+            # Closing a chained buffered() stage stops its own producer in turn
+            close = getattr(upstream,"close",None)
+            if close is not None:
+                close()
+        put(_DONE)
+
+    Thread(target=produce,daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item,BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class CsvSink:
+    '''
+    Appends result frames to a CSV file; the header is written with the first batch
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self._header = not os.path.exists(path)
+
+    def write(self, data: pd.DataFrame) -> None:
+        data.to_csv(self.path,mode="a",header=self._header,index=False)
+        self._header = False
+
+    def close(self) -> None:
+        pass
+
+
+class ParquetSink:
+    '''
+    Appends result frames as row groups of a single Parquet file
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+
+    def write(self, data: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(data,preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path,table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _records(dcf: DCFValuation, ratio: FinRatio) -> pd.DataFrame:
+    '''
+    Flatten the valuation and ratio outputs of a company into long rows
+    '''
+    val: pd.DataFrame = dcf.to_pandas_df().reset_index()
+    val.columns = ["metric","value"]
+    val = val.assign(section="dcf",period=pd.NaT)
+    frames: List[pd.DataFrame] = [val]
+    for section, data, cols in [("ebitda",ratio.ebitda_rev_ratio,["Revenues","EBITDA","EBITDA%"]),
+                                ("working_capital",ratio.working_capital,["DSO","DIO","DPO","Working capital"])]:
+        frames.append(data[["period"]+cols].melt(id_vars="period",var_name="metric").assign(section=section))
+    out: pd.DataFrame = pd.concat(frames,ignore_index=True)
+    out["company"] = dcf.statement.company
+    return out[RESULT_COLUMNS]
+
+
+@dataclass
+class StreamingValuation:
+    '''
+    Values companies one at a time as they stream in and appends the results to a sink. Each stage hands over to the
+    next through a queue of at most queue_size items; failures are recorded per company and do not stop the stream.
+    '''
+    written: int = field(init=False)
+    failures: List[Tuple[str,str,str]] = field(init=False)
+
+    def __init__(self, companies: Iterable[Tuple[str,IncomeStatement,BalanceSheet]], a_date: List[str],
+                 f_date: List[str], wacc: float, lt_growth: float, sink: Any, queue_size: int = 8,
+                 flush_every: int = 100):
+        '''
+        :param companies: (company, income statement, balance sheet) of actuals, e.g. ingest.iter_companies()
+        :param a_date: actual dates
+        :param f_date: dates to be forecasted
+        :param wacc: weighted average cost of capital
+        :param lt_growth: long-term growth
+        :param sink: object with write(pd.DataFrame) and close(), e.g. CsvSink or ParquetSink
+        :param queue_size: maximum number of items waiting between two stages
+        :param flush_every: companies collected before a write to the sink
+        '''
+        self.written = 0
+        self.failures = []
+        statements = buffered(self._forecast(companies,a_date,f_date),queue_size)
+        valuations = buffered(self._value(statements,wacc,lt_growth),queue_size)
+        records = buffered(self._ratios(valuations),queue_size)
+        batch: List[pd.DataFrame] = []
+        try:
+            for rec in records:
+                batch.append(rec)
+                if len(batch) >= flush_every:
+                    self._flush(sink,batch)
+            self._flush(sink,batch)
+        finally:
+            records.close()
+            sink.close()
+
+    def _flush(self, sink: Any, batch: List[pd.DataFrame]) -> None:
+        if batch:
+            sink.write(pd.concat(batch,ignore_index=True))
+            self.written += len(batch)
+            batch.clear()
+
+    def _forecast(self, companies, a_date, f_date) -> Iterator[FinancialStatement]:
+        for comp, inc, bs in companies:
+            try:
+                yield FinancialStatement(comp=comp,a_date=a_date,f_date=f_date,inc=inc,bs=bs)
+            except Exception as err:
+                self.failures.append((comp,"forecast",f"{type(err).__name__}: {err}"))
+
+    def _value(self, statements: Iterator[FinancialStatement], wacc, lt_growth) -> Iterator[DCFValuation]:
+        for fin in statements:
+            try:
+                yield DCFValuation(wacc=wacc,lt_growth=lt_growth,fin=fin)
+            except Exception as err:
+                self.failures.append((fin.company,"dcf",f"{type(err).__name__}: {err}"))
+
+    def _ratios(self, valuations: Iterator[DCFValuation]) -> Iterator[pd.DataFrame]:
+        for dcf in valuations:
+            try:
+                yield _records(dcf,FinRatio(dcf))
+            except Exception as err:
+                self.failures.append((dcf.statement.company,"ratios",f"{type(err).__name__}: {err}"))
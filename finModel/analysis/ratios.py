@@ -3,13 +3,49 @@ PURPOSE: Houses the ratios and datasets we would be using for plotting purposes
 '''
 
 from finModel.statements.main import FinancialStatement
+from finModel.statements.balance import BalanceSheet
 from finModel.analysis.dcf_valuation import DCFValuation
 from finModel.utils.transform import days_outstanding
 from dataclasses import dataclass, field
+from functools import reduce
+from collections import OrderedDict
+from typing import Callable, Dict, List, Mapping, Tuple
 import pandas as pd
 import numpy as np
 
 
+RATIO_COLUMNS = ["company", "section", "metric", "period", "type", "value"]
+
+# Statement line items the screening ratios are computed from
+RATIO_INPUTS: Dict[str,Callable[[FinancialStatement],pd.Series]] = {
+    "sales": lambda fin: fin.income.revenue.sales,
+    "tot_revenue": lambda fin: fin.income.revenue.tot_revenue,
+    "ebitda": lambda fin: fin.income.ebitda,
+    "ebit": lambda fin: fin.income.ebit,
+    "int_expense": lambda fin: fin.income.int_expense,
+    "net_income": lambda fin: fin.income.net_income,
+    "nopat": lambda fin: fin.cash.nopat,
+    "capex_movement": lambda fin: fin.cash.capex_movement,
+    "ufcf": lambda fin: fin.cash.ufcf,
+    "cash": lambda fin: fin.balance.cash,
+    "financial_liability": lambda fin: fin.balance.financial_liability.total,
+    "equity": lambda fin: fin.balance.shareholder_equity.total_equity,
+    "total_asset": lambda fin: fin.balance.total_asset,
+}
+
+
+def _label_periods(combined: pd.DataFrame, year_as_str: bool = True) -> pd.DataFrame:
+    '''
+    Add the period, year and year-quarter labels of a date-indexed frame using the DatetimeIndex accessors
+    '''
+    dates: pd.DatetimeIndex = pd.DatetimeIndex(combined.index)
+    year: pd.Index = dates.year.astype(str)
+    combined["period"] = combined.index
+    combined["year"] = year if year_as_str else dates.year
+    combined["year-q"] = year + "Q" + dates.quarter.astype(str)
+    return combined
+
+
 @dataclass
 class FinRatio:
     '''
@@ -39,26 +75,21 @@ class FinRatio:
         ratio: pd.Series = (ebitda/revenue)
         combined: pd.DataFrame = pd.concat([revenue,ebitda,ratio],axis=1)
         combined.columns = ["Revenues","EBITDA","EBITDA%"]
-        combined["period"] = combined.index
-        combined["year"] = [date.year for date in combined.period]
-        combined["year-q"] = [f"{date.year}Q{date.quarter}" for date in combined.period]
-        combined["type"] = ["Actual" if date in fin.actual_dates else "Forecast" for date in combined["period"].values]
+        combined = _label_periods(combined,year_as_str=False)
+        combined["type"] = np.where(combined.index.isin(fin.actual_dates),"Actual","Forecast")
 
         return combined.reset_index().sort_values("period")
 
     @staticmethod
     def get_ufcf_trend(dcf: DCFValuation) -> pd.DataFrame:
         '''
-        Extract unlevered cashflow forecasts and discount using WACC
+        Extract unlevered cashflow forecasts and discount them with the factors of the valuation
         '''
         ufcf: pd.Series = dcf.statement.cash.ufcf[dcf.statement.forecast_dates]
-        discount: np.ndarray = np.array([1/np.power(1+dcf.wacc,idx) for idx in np.arange(1,len(dcf.statement.forecast_dates)+1)])
-        pv_ufcf: pd.Series = pd.Series(np.multiply(ufcf,discount),index=dcf.statement.forecast_dates)
+        pv_ufcf: pd.Series = pd.Series(np.multiply(ufcf,dcf.discount),index=dcf.statement.forecast_dates)
         combined: pd.DataFrame = pd.concat([ufcf,pv_ufcf],axis=1)
         combined.columns = ["UFCF","PV of UFCF"]
-        combined["period"] = combined.index
-        combined["year"] = [str(date.year) for date in combined.period]
-        combined["year-q"] = [f"{date.year}Q{date.quarter}" for date in combined.period]
+        combined = _label_periods(combined)
 
         return combined.reset_index().sort_values("period")
 
@@ -73,9 +104,7 @@ class FinRatio:
         delta_opex: pd.Series = dcf.statement.income.opex.opex.diff()
         combined: pd.DataFrame = pd.concat([delta_ebitda,delta_rev,delta_cogs,delta_opex],axis=1).dropna()
         combined.columns = ["Delta EBITDA","Delta revenues","Delta COGS","Delta OPEX"]
-        combined["period"] = combined.index
-        combined["year"] = [str(date.year) for date in combined.period]
-        combined["year-q"] = [f"{date.year}Q{date.quarter}" for date in combined.period]
+        combined = _label_periods(combined)
 
         return combined
 
@@ -84,16 +113,175 @@ class FinRatio:
         '''
         Get DSO, DIO and DPO and the working capital
         '''
-        dso: np.ndarray = days_outstanding(dcf.statement.balance.trade_receivable,dcf.statement.income.revenue.sales)
-        dio: np.ndarray = -days_outstanding(dcf.statement.balance.inventory,dcf.statement.income.cogs.cogs)
-        dpo: np.ndarray = -days_outstanding(dcf.statement.balance.trade_payable,dcf.statement.income.cogs.cogs)
-        combined: pd.DataFrame = pd.DataFrame({"DSO":dso,"DIO":dio,"DPO":dpo},index=dcf.statement.income.revenue.sales.index)
+        sales: pd.Series = dcf.statement.income.revenue.sales
+        cogs: np.ndarray = dcf.statement.income.cogs.cogs.values
+        bs: BalanceSheet = dcf.statement.balance
+        # Receivables over sales, inventory and payables over COGS in a single call
+        days: np.ndarray = days_outstanding(
+            np.vstack([bs.trade_receivable.values,bs.inventory.values,bs.trade_payable.values]),
+            np.vstack([sales.values,cogs,cogs]))
+        combined: pd.DataFrame = pd.DataFrame({"DSO":days[0],"DIO":-days[1],"DPO":-days[2]},index=sales.index)
         combined: pd.DataFrame = pd.concat([combined,pd.Series(dcf.statement.balance.trade_receivable,name="Trade receivables"),
                                             pd.Series(dcf.statement.balance.inventory,name="Inventory"),
                                             -pd.Series(dcf.statement.balance.trade_payable,name="Trade payables")], axis=1)
         combined["Working capital"] = combined["Trade receivables"] + combined["Inventory"] + combined["Trade payables"]
-        combined["period"] = combined.index
-        combined["year"] = [str(date.year) for date in combined.period]
-        combined["year-q"] = [f"{date.year}Q{date.quarter}" for date in combined.period]
+        combined = _label_periods(combined)
 #        combined = combined.melt(id_vars="year",value_vars=["DSO","DIO","DPO"],var_name="metric",value_name="days")
-        return combined
\ No newline at end of file
+        return combined
+
+
+def ratio_table(dcfs: Mapping[str,DCFValuation]) -> pd.DataFrame:
+    '''
+    Ratio datasets of a batch of companies as one long frame with RATIO_COLUMNS. The line items of all companies are
+    stacked into (companies x periods) arrays over the union of their dates, so every ratio is computed once per batch.
+    :param dcfs: valuations keyed by company
+    '''
+    companies: List[str] = list(dcfs)
+    statements: List[FinancialStatement] = [dcf.statement for dcf in dcfs.values()]
+    dates: pd.DatetimeIndex = reduce(pd.DatetimeIndex.union,[fin.income.dates() for fin in statements])
+
+    def stack(get: Callable[[FinancialStatement],pd.Series]) -> np.ndarray:
+        return np.vstack([get(fin).reindex(dates).values for fin in statements]).astype(float)
+
+    def delta(values: np.ndarray) -> np.ndarray:
+        return np.diff(values,axis=-1,prepend=np.nan)
+
+    sales: np.ndarray = stack(lambda fin: fin.income.revenue.sales)
+    ebitda: np.ndarray = stack(lambda fin: fin.income.ebitda)
+    cogs: np.ndarray = stack(lambda fin: fin.income.cogs.cogs)
+    receivable: np.ndarray = stack(lambda fin: fin.balance.trade_receivable)
+    inventory: np.ndarray = stack(lambda fin: fin.balance.inventory)
+    payable: np.ndarray = stack(lambda fin: fin.balance.trade_payable)
+    ufcf: np.ndarray = stack(lambda fin: fin.cash.ufcf)
+    actual: np.ndarray = np.vstack([dates.isin(fin.actual_dates) for fin in statements])
+    # Discount factors are taken from each valuation and placed on its forecast periods
+    discount: np.ndarray = np.full(ufcf.shape,np.nan)
+    for i,dcf in enumerate(dcfs.values()):
+        discount[i,dates.get_indexer(dcf.statement.forecast_dates)] = dcf.discount
+    days: np.ndarray = days_outstanding(np.stack([receivable,inventory,payable]),np.stack([sales,cogs,cogs]))
+
+    metrics: Dict[Tuple[str,str],np.ndarray] = {
+        ("ebitda","Revenues"): sales,
+        ("ebitda","EBITDA"): ebitda,
+        ("ebitda","EBITDA%"): ebitda/sales,
+        ("ufcf","UFCF"): np.where(np.isnan(discount),np.nan,ufcf),
+        ("ufcf","PV of UFCF"): ufcf*discount,
+        ("ebitda_components","Delta EBITDA"): delta(ebitda),
+        ("ebitda_components","Delta revenues"): delta(stack(lambda fin: fin.income.revenue.tot_revenue)),
+        ("ebitda_components","Delta COGS"): delta(cogs),
+        ("ebitda_components","Delta OPEX"): delta(stack(lambda fin: fin.income.opex.opex)),
+        ("working_capital","DSO"): days[0],
+        ("working_capital","DIO"): -days[1],
+        ("working_capital","DPO"): -days[2],
+        ("working_capital","Trade receivables"): receivable,
+        ("working_capital","Inventory"): inventory,
+        ("working_capital","Trade payables"): -payable,
+        ("working_capital","Working capital"): receivable + inventory - payable,
+    }
+    n_cells: int = len(companies) * len(dates)
+    out: pd.DataFrame = pd.DataFrame({
+        "company": np.tile(np.repeat(companies,len(dates)),len(metrics)),
+        "section": np.repeat([section for section,_ in metrics],n_cells),
+        "metric": np.repeat([metric for _,metric in metrics],n_cells),
+        "period": np.tile(dates.values,len(companies)*len(metrics)),
+        "type": np.tile(np.where(actual,"Actual","Forecast").ravel(),len(metrics)),
+        "value": np.stack(list(metrics.values())).ravel(),
+    })
+    return out.dropna(subset=["value"]).reset_index(drop=True)
+
+
+def screening_ratios(x: Dict[str,np.ndarray]) -> Dict[str,np.ndarray]:
+    '''
+    Screening ratios from the RATIO_INPUTS arrays (any shape, element-wise per period). Expenses are negative in the
+    statements, so interest and capex are flipped to positive amounts; balances are end-of-period values.
+    '''
+    net_debt: np.ndarray = x["financial_liability"] - x["cash"]
+    with np.errstate(divide="ignore",invalid="ignore"):
+        return {
+            "ROIC": x["nopat"] / (x["equity"] + net_debt),
+            "ROE": x["net_income"] / x["equity"],
+            "Net debt/EBITDA": net_debt / x["ebitda"],
+            "Interest cover": x["ebit"] / -x["int_expense"],
+            "Capex intensity": -x["capex_movement"] / x["sales"],
+            "Cash conversion": x["ufcf"] / x["ebitda"],
+            "Asset turnover": x["tot_revenue"] / x["total_asset"],
+        }
+
+
+# Names of the screening ratios, in the order screening_ratios() returns them
+RATIOS: Tuple[str,...] = tuple(screening_ratios({name: np.ones(1) for name in RATIO_INPUTS}))
+
+
+def statement_version(fin: FinancialStatement) -> Tuple[Tuple[int,...],Tuple[int,...]]:
+    '''
+    Version of a company's statements (see Timeline.version()); changes whenever actuals or forecasts are written. The
+    cash flow statement is derived from the other two and is rebuilt with them.
+    '''
+    return fin.income.version(), fin.balance.version()
+
+
+class RatioLibrary:
+    '''
+    Screening ratios (see screening_ratios()) of many companies. The ratios of all companies that are not cached are
+    computed together in one columnar pass over their periods; results are cached per company and period and
+    recomputed when the company's statements are written to (detected by statement_version(), which reads no line
+    items). At most maxsize companies are kept, least recently used first out.
+    '''
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        # company -> (statement version, dates, actual mask, ratios x periods)
+        self._cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compute(self, statements: Mapping[str,FinancialStatement]) -> pd.DataFrame:
+        '''
+        Ratios of every company and period
+        :param statements: financial statements keyed by company
+        :return: frame indexed on (company, period) with a type (Actual/Forecast) column and one column per ratio
+        '''
+        found: Dict[str,Tuple[tuple,pd.DatetimeIndex,np.ndarray,np.ndarray]] = {}
+        stale: List[Tuple[str,tuple,pd.DatetimeIndex,np.ndarray,np.ndarray]] = []
+        for comp, fin in statements.items():
+            key: tuple = statement_version(fin)
+            cached = self._cache.get(comp)
+            if cached is not None and cached[0] == key:
+                self.hits += 1
+                self._cache.move_to_end(comp)
+                found[comp] = cached
+            else:
+                self.misses += 1
+                dates: pd.DatetimeIndex = fin.income.dates()
+                # Line items of a statement share its timeline, so the arrays are stacked as they are
+                values: np.ndarray = np.vstack([get(fin).values for get in RATIO_INPUTS.values()])
+                stale.append((comp,key,dates,dates.isin(fin.actual_dates),values))
+
+        if stale:
+            # Ratios are element-wise, so the periods of all companies are laid end to end and computed at once
+            flat: np.ndarray = np.concatenate([values for *_, values in stale],axis=1).astype(float)
+            ratios: np.ndarray = np.stack(list(screening_ratios(dict(zip(RATIO_INPUTS,flat))).values()))
+            ends: np.ndarray = np.cumsum([len(dates) for _,_,dates,_,_ in stale])[:-1]
+            for (comp,key,dates,actual,_), part in zip(stale,np.split(ratios,ends,axis=1)):
+                found[comp] = self._cache[comp] = (key,dates,actual,part)
+                self._cache.move_to_end(comp)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        parts: List[Tuple[str,pd.DatetimeIndex,np.ndarray,np.ndarray]] = [found[comp] for comp in statements]
+        index: pd.MultiIndex = pd.MultiIndex.from_arrays(
+            [np.repeat(list(statements),[len(dates) for _,dates,_,_ in parts]),
+             np.concatenate([dates.values for _,dates,_,_ in parts])],names=["company","period"])
+        out: pd.DataFrame = pd.DataFrame(np.concatenate([part for *_, part in parts],axis=1).T,index=index,
+                                         columns=list(RATIOS))
+        out.insert(0,"type",np.where(np.concatenate([actual for _,_,actual,_ in parts]),"Actual","Forecast"))
+        return out
+
+    def invalidate(self, company: str = None) -> None:
+        '''
+        Drop the cached ratios of a company, or of all companies
+        '''
+        if company is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(company,None)
@@ -0,0 +1,71 @@
+"""
+PURPOSE: Evaluates many named assumption sets (scenarios) in one batched pass through the forecast -> cash flow -> DCF
+chain; scenarios are an extra leading axis of the driver arrays.
+"""
+from finModel.statements.income import IncomeStatement
+from finModel.statements.balance import BalanceSheet
+from finModel.statements.projection import DRIVERS, driver_stats, anchors, project
+from finModel.analysis.dcf_valuation import value_cashflows
+from dataclasses import dataclass, field
+from typing import List, Dict
+import pandas as pd
+import numpy as np
+
+
+@dataclass
+class ScenarioAnalysis:
+    '''
+    Values every row of a scenario table. Columns are driver overrides, named as in projection.DRIVERS (growth,
+    cogs_shr, opex_shr, d_and_a_shr, tax_rate, ppe_shr, other_asset_shr, other_liability_shr, dio, dso, dpo) plus wacc
+    and g; a missing column or a NaN cell keeps the base assumption (historical point estimate, base WACC and g).
+    '''
+    scenarios: pd.DataFrame
+    wacc: float
+    g: float
+    base: Dict[str,float] = field(init=False)
+    results: pd.DataFrame = field(init=False)
+
+    def __init__(self, scenarios: pd.DataFrame, inc: IncomeStatement, bs: BalanceSheet, f_date: List[str],
+                 wacc: float, lt_growth: float):
+        '''
+        :param scenarios: one row per scenario (indexed on its name), one column per overridden driver
+        :param inc: income statement (actuals)
+        :param bs: balance sheet (actuals)
+        :param f_date: dates to be forecasted
+        :param wacc: base WACC
+        :param lt_growth: base long-term growth
+        '''
+        unknown: List[str] = [c for c in scenarios.columns if c not in DRIVERS + ("wacc","g")]
+        if unknown:
+            raise KeyError(f"Unknown scenario drivers: {unknown}")
+        self.scenarios = scenarios
+        self.wacc = wacc
+        self.g = lt_growth
+        self.base = {**driver_stats(inc,bs).drivers, "wacc": wacc, "g": lt_growth}
+
+        # One array per driver with the scenarios on the leading axis
+        values: Dict[str,np.ndarray] = {
+            k: scenarios[k].fillna(v).values.astype(float) if k in scenarios else np.full(len(scenarios),v)
+            for k,v in self.base.items()}
+        anchor: Dict[str,float] = anchors(inc,bs)
+        fcst: Dict[str,np.ndarray] = project(anchor,{k: values[k] for k in DRIVERS},len(f_date))
+        val: Dict[str,np.ndarray] = value_cashflows(fcst["ufcf"],values["wacc"],values["g"],
+                                                    anchor["financial_liability"],anchor["cash"])
+
+        self.results = pd.DataFrame({
+            "WACC": values["wacc"],
+            "long-term growth": values["g"],
+            "Revenues (final year)": fcst["sales"][...,-1],
+            "EBITDA (final year)": fcst["ebitda"][...,-1],
+            "UFCF (final year)": fcst["ufcf"][...,-1],
+            "PV of Cash flows": val["pv_ufcf"],
+            "PV of Continuing value": val["pv_cont_val"],
+            "Enterprise value": val["ent_val"],
+            "Equity value": val["equity"],
+        },index=scenarios.index)
+
+    def to_pandas_df(self) -> pd.DataFrame:
+        '''
+        Scenario x metric results
+        '''
+        return self.results
@@ -0,0 +1,76 @@
+"""
+PURPOSE: Sensitivities ("Greeks") of enterprise value to WACC, long-term growth and the forecast drivers. Rate
+sensitivities are analytic; driver sensitivities are taken by complex-step differentiation through the projection chain,
+with every driver perturbed at once along an extra array axis. Anchors (last actual values) are held fixed, so the
+sensitivities of equity value are the same as those of enterprise value.
+"""
+from finModel.statements.projection import DRIVERS, project
+from typing import Dict, Union
+import numpy as np
+
+
+Rate = Union[float, np.ndarray]
+
+
+def rate_greeks(ufcf: np.ndarray, wacc: Rate, lt_growth: Rate, per_period: bool = False) -> Dict[str,np.ndarray]:
+    '''
+    Analytic dEV/dWACC and dEV/dg of the DCF valuation
+    :param ufcf: unlevered free cashflows of shape (..., n)
+    :param wacc: WACC broadcastable against ufcf[..., 0], or per period against ufcf if per_period (dEV/dWACC is then
+                 the sensitivity to a parallel shift of the path)
+    :param lt_growth: long-term growth, broadcastable against ufcf[..., 0]
+    :param per_period: wacc carries a trailing period axis
+    :return: arrays of shape ufcf.shape[:-1] keyed by sensitivity
+    '''
+    ufcf = np.asarray(ufcf,dtype=float)
+    n: int = ufcf.shape[-1]
+    path: np.ndarray = np.asarray(wacc,dtype=float)
+    if not per_period:
+        path = np.broadcast_to(path[...,np.newaxis],path.shape+(n,))
+    g: np.ndarray = np.asarray(lt_growth,dtype=float)
+    w: np.ndarray = path[...,-1]
+    discount: np.ndarray = 1/np.cumprod(1+path,axis=-1)
+    # d discount_t / d shift = -discount_t * sum_{s<=t} 1/(1+wacc_s)
+    d_discount: np.ndarray = -discount * np.cumsum(1/(1+path),axis=-1)
+    multiple: np.ndarray = (1+g) / (w-g)
+    return {
+        "dEV/dWACC": np.sum(ufcf*d_discount,axis=-1) + ufcf[...,-1] * (multiple*d_discount[...,-1] -
+                                                                       discount[...,-1]*(1+g)/(w-g)**2),
+        "dEV/dg": ufcf[...,-1] * discount[...,-1] * (1+w)/(w-g)**2,
+    }
+
+
+def driver_greeks(anchor: Dict[str,np.ndarray], drivers: Dict[str,np.ndarray], n: int, wacc: Rate,
+                  lt_growth: Rate, f: int = 360, h: float = 1e-20, per_period: bool = False) -> Dict[str,np.ndarray]:
+    '''
+    dEV/d(driver) for every forecast driver of the avg. growth methodology, in one complex-step pass through
+    projection.project(); the cost is that of projecting len(DRIVERS) scenarios.
+    :param anchor: last actual values (see projection.anchors()); arrays carry a company axis for batches
+    :param drivers: driver values (see projection.DRIVERS), broadcastable against the anchors
+    :param n: number of forecast periods
+    :param wacc: WACC, broadcastable against the anchors, or per period with a trailing axis of length n if per_period
+                 (the cashflows are then discounted cumulatively and the last rate is used for the continuing value)
+    :param lt_growth: long-term growth, broadcastable against the anchors
+    :param f: days in the period
+    :param h: complex step
+    :param per_period: wacc carries a trailing period axis
+    :return: arrays of the batch shape keyed by driver
+    '''
+    k: int = len(DRIVERS)
+    step: np.ndarray = np.eye(k) * 1j * h
+    perturbed: Dict[str,np.ndarray] = {}
+    for i,name in enumerate(DRIVERS):
+        val: np.ndarray = np.asarray(drivers[name],dtype=float)
+        perturbed[name] = val[np.newaxis,...] + step[i].reshape((k,)+(1,)*val.ndim)
+    ufcf: np.ndarray = project(anchor,perturbed,n,f)["ufcf"]
+    d_ufcf: np.ndarray = ufcf.imag / h
+
+    path: np.ndarray = np.asarray(wacc,dtype=float)
+    if not per_period:
+        path = np.broadcast_to(path[...,np.newaxis],path.shape+(n,))
+    g: np.ndarray = np.asarray(lt_growth,dtype=float)
+    w: np.ndarray = path[...,-1]
+    discount: np.ndarray = 1/np.cumprod(1+path,axis=-1)
+    # EV is linear in the cashflows: sum_t discount_t * ufcf_t + discount_n * ufcf_n * (1+g)/(wacc-g)
+    d_ev: np.ndarray = np.sum(d_ufcf*discount,axis=-1) + d_ufcf[...,-1] * discount[...,-1] * (1+g)/(w-g)
+    return {name: d_ev[i] for i,name in enumerate(DRIVERS)}
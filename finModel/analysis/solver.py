@@ -0,0 +1,136 @@
+"""
+PURPOSE: Inverts the DCF valuation: the WACC or long-term growth that reproduces a given (market) enterprise value, solved
+for many companies at once as arrays.
+"""
+from dataclasses import dataclass
+from typing import Tuple, Union, Optional
+import pandas as pd
+import numpy as np
+
+
+Rate = Union[float, np.ndarray]
+
+
+@dataclass
+class Solution:
+    '''
+    Solved rates with convergence diagnostics; every field has the batch shape of the inputs
+    '''
+    value: np.ndarray
+    residual: np.ndarray
+    converged: np.ndarray
+    iterations: np.ndarray
+
+    def to_pandas_df(self, index: Optional[pd.Index] = None) -> pd.DataFrame:
+        return pd.DataFrame({"value": np.ravel(self.value), "residual": np.ravel(self.residual),
+                             "converged": np.ravel(self.converged), "iterations": np.ravel(self.iterations)},
+                            index=index)
+
+
+def ev_and_slope(ufcf: np.ndarray, wacc: Rate, lt_growth: Rate) -> Tuple[np.ndarray,np.ndarray]:
+    '''
+    Enterprise value (PV of cashflows + PV of continuing value) and its derivative with respect to WACC
+    :param ufcf: unlevered free cashflows of shape (..., n)
+    :param wacc: WACC, broadcastable against ufcf[..., 0]
+    :param lt_growth: long-term growth, broadcastable against ufcf[..., 0]
+    '''
+    w: np.ndarray = np.asarray(wacc,dtype=float)
+    g: np.ndarray = np.asarray(lt_growth,dtype=float)
+    n: int = ufcf.shape[-1]
+    t: np.ndarray = np.arange(1,n+1)
+    discount: np.ndarray = np.power(1+w[...,np.newaxis],-t)
+    cont_val: np.ndarray = ufcf[...,-1] * (1+g) / (w-g)
+    ev: np.ndarray = np.sum(ufcf*discount,axis=-1) + cont_val * discount[...,-1]
+    slope: np.ndarray = -np.sum(t*ufcf*discount,axis=-1)/(1+w) - cont_val * discount[...,-1] * (1/(w-g) + n/(1+w))
+    return ev, slope
+
+
+def implied_wacc(ufcf: np.ndarray, ev: Rate, lt_growth: Rate, hi: float = 1.0, tol: float = 1e-10,
+                 max_iter: int = 100) -> Solution:
+    '''
+    WACC at which the DCF enterprise value equals ev, for every company of the batch together. Newton steps are taken on
+    the closed-form valuation and fall back to bisection whenever they leave the bracket (g, hi], so every company
+    whose bracket holds a root converges.
+    :param ufcf: unlevered free cashflows of shape (..., n)
+    :param ev: target enterprise values, broadcastable against ufcf[..., 0]
+    :param lt_growth: long-term growth, broadcastable against ufcf[..., 0]
+    :param hi: upper end of the WACC bracket
+    :param tol: tolerance on the residual relative to ev
+    :param max_iter: maximum number of iterations
+    :return: solution; companies without a sign change on the bracket are reported as not converged with NaN value
+    '''
+    ufcf = np.asarray(ufcf,dtype=float)
+    shape: Tuple[int,...] = np.broadcast_shapes(ufcf.shape[:-1],np.shape(ev),np.shape(lt_growth))
+    ufcf = np.broadcast_to(ufcf,shape+ufcf.shape[-1:])
+    target: np.ndarray = np.broadcast_to(np.asarray(ev,dtype=float),shape)
+    g: np.ndarray = np.broadcast_to(np.asarray(lt_growth,dtype=float),shape)
+    scale: np.ndarray = np.maximum(np.abs(target),1.0)
+
+    # EV tends to +/- infinity as WACC approaches g from above; the sign of the last cashflow gives that limit
+    lo: np.ndarray = g + 1e-9 * np.maximum(np.abs(g),1.0)
+    up: np.ndarray = np.full(shape,hi,dtype=float)
+    f_lo: np.ndarray = ev_and_slope(ufcf,lo,g)[0] - target
+    f_hi: np.ndarray = ev_and_slope(ufcf,up,g)[0] - target
+    bracketed: np.ndarray = np.sign(f_lo) * np.sign(f_hi) <= 0
+    x: np.ndarray = np.where(bracketed,(lo+up)/2,np.nan)
+    rising: np.ndarray = f_hi > f_lo
+
+    iterations: np.ndarray = np.zeros(shape,dtype=int)
+    converged: np.ndarray = np.zeros(shape,dtype=bool)
+    resid: np.ndarray = np.full(shape,np.nan)
+    active: np.ndarray = bracketed.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        val, slope = ev_and_slope(ufcf,x,g)
+        resid = np.where(active,val - target,resid)
+        done: np.ndarray = active & (np.abs(resid) <= tol*scale)
+        converged |= done
+        active &= ~done
+        # Shrink the bracket on the side of the current point, then try a Newton step inside it
+        above: np.ndarray = (resid > 0) == rising
+        up = np.where(active & above,x,up)
+        lo = np.where(active & ~above,x,lo)
+        with np.errstate(divide="ignore",invalid="ignore"):
+            step: np.ndarray = x - resid/slope
+        inside: np.ndarray = np.isfinite(step) & (step > lo) & (step < up)
+        x = np.where(active,np.where(inside,step,(lo+up)/2),x)
+        iterations += active
+    return Solution(value=np.where(converged,x,np.nan),residual=resid,converged=converged,iterations=iterations)
+
+
+def implied_growth(ufcf: np.ndarray, ev: Rate, wacc: Rate, discount: Optional[np.ndarray] = None) -> Solution:
+    '''
+    Long-term growth at which the DCF enterprise value equals ev. The continuing value is linear in (1+g)/(wacc-g), so
+    the growth is solved in closed form for the whole batch.
+    :param ufcf: unlevered free cashflows of shape (..., n)
+    :param ev: target enterprise values, broadcastable against ufcf[..., 0]
+    :param wacc: WACC used for the continuing value, broadcastable against ufcf[..., 0]
+    :param discount: discount factors of shape (..., n) if they do not follow from a flat wacc (per-period WACC)
+    :return: solution; companies whose target cannot be reached with g < wacc are reported as not converged
+    '''
+    ufcf = np.asarray(ufcf,dtype=float)
+    w: np.ndarray = np.asarray(wacc,dtype=float)
+    target: np.ndarray = np.asarray(ev,dtype=float)
+    if discount is None:
+        discount = np.power(1+w[...,np.newaxis],-np.arange(1,ufcf.shape[-1]+1))
+    with np.errstate(divide="ignore",invalid="ignore"):
+        ratio: np.ndarray = (target - np.sum(ufcf*discount,axis=-1)) / (ufcf[...,-1]*discount[...,-1])
+        g: np.ndarray = (ratio*w - 1) / (1+ratio)
+        cont_val: np.ndarray = ufcf[...,-1] * (1+g) / (w-g)
+    resid: np.ndarray = np.sum(ufcf*discount,axis=-1) + cont_val*discount[...,-1] - target
+    converged: np.ndarray = np.isfinite(g) & (g < w)
+    return Solution(value=np.where(converged,g,np.nan),residual=resid,converged=converged,
+                    iterations=np.zeros(np.shape(g),dtype=int))
+
+
+def enterprise_target(ev: Optional[Rate] = None, equity: Optional[Rate] = None, fin_liab: Rate = 0.0,
+                      cash: Rate = 0.0) -> np.ndarray:
+    '''
+    Enterprise value to solve for, given either the enterprise value or the equity (market capitalisation)
+    '''
+    if (ev is None) == (equity is None):
+        raise ValueError("Provide exactly one of ev or equity")
+    if ev is not None:
+        return np.asarray(ev,dtype=float)
+    return np.asarray(equity,dtype=float) + np.asarray(fin_liab,dtype=float) - np.asarray(cash,dtype=float)
@@ -0,0 +1,179 @@
+"""
+PURPOSE: Persisted model results for incremental runs. The forecasted FinancialStatement and the DCF outputs of a
+company are kept in a local SQLite file under a hash of everything they depend on (company, actuals, dates, WACC,
+long-term growth), so a later run only recomputes the companies whose inputs changed. Old entries are evicted by age
+and least recent use.
+"""
+from finModel.statements.main import FinancialStatement
+from finModel.statements.strategy import history
+from dataclasses import dataclass
+from typing import List, Dict, Tuple, Iterable, Optional, Union
+import pandas as pd
+import numpy as np
+import hashlib
+import pickle
+import sqlite3
+import time
+import zlib
+
+
+# Part of every key; bump it when a model change makes stored results stale
+STORE_VERSION = 2
+
+Dates = Optional[Union[List[str],np.ndarray,pd.DatetimeIndex]]
+
+
+def _dates_bytes(dates: Dates) -> bytes:
+    return b"none" if dates is None else pd.DatetimeIndex(pd.to_datetime(dates)).asi8.tobytes()
+
+
+def input_key(comp: str, inc, bs, a_date: Dates, f_date: Dates, wacc: float, lt_growth: float) -> str:
+    '''
+    Content hash of the inputs of a company's valuation
+    :param comp: company; part of the key as the stored outputs are labelled with it
+    :param inc: income statement (actuals), full or compact
+    :param bs: balance sheet (actuals), full or compact
+    :param a_date: actual dates (None: the dates of the statements)
+    :param f_date: dates to be forecasted
+    :param wacc: weighted average cost of capital
+    :param lt_growth: long-term growth
+    '''
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(comp.encode() + b"\0")
+    digest.update(np.ascontiguousarray(history(inc,bs),dtype=float).tobytes())
+    digest.update(inc.dates().asi8.tobytes())
+    digest.update(bs.dates().asi8.tobytes())
+    digest.update(_dates_bytes(a_date))
+    digest.update(_dates_bytes(f_date))
+    digest.update(np.array([STORE_VERSION,wacc,lt_growth],dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+@dataclass
+class StoredResult:
+    '''
+    Model outputs of a company: valuation in long format (company, metric, value) and, when requested, the forecasted
+    statements
+    '''
+    valuation: pd.DataFrame
+    statement: Optional[FinancialStatement] = None
+
+
+class ResultStore:
+    '''
+    SQLite file of model results keyed by input_key(). Reads refresh the last-used time of an entry; on every write
+    entries older than max_age seconds are dropped, then the least recently used ones beyond max_entries.
+
+        with ResultStore("results.db", max_entries=50_000, max_age=30*86400) as store:
+            BatchValuation(companies, a_date, f_date, wacc, lt_growth, store=store)
+    '''
+
+    # SQLite caps the number of parameters of a statement
+    _BATCH = 500
+
+    def __init__(self, path: str, max_entries: Optional[int] = None, max_age: Optional[float] = None):
+        '''
+        :param path: SQLite file (created if missing); ':memory:' keeps the store in the current process only
+        :param max_entries: entries kept at most
+        :param max_age: seconds after which an entry is stale
+        '''
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._con = sqlite3.connect(path)
+        self._con.executescript('''
+            CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, company TEXT, created REAL, accessed REAL,
+                                                valuation BLOB, statement BLOB);
+            CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+            CREATE INDEX IF NOT EXISTS results_created ON results (created);
+        ''')
+
+    def __len__(self) -> int:
+        return self._con.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._con.close()
+
+    def get_many(self, keys: Iterable[str], statements: bool = False) -> Dict[str,StoredResult]:
+        '''
+        Stored results of the keys found (missing and stale keys are left out)
+        :param keys: input keys (see input_key())
+        :param statements: also load the forecasted statements (slower; the valuation alone is enough for reporting)
+        '''
+        keys = list(dict.fromkeys(keys))
+        oldest: float = time.time() - self.max_age if self.max_age is not None else -np.inf
+        cols: str = "key, valuation, statement" if statements else "key, valuation, NULL"
+        found: Dict[str,StoredResult] = {}
+        for i in range(0,len(keys),self._BATCH):
+            part: List[str] = keys[i:i+self._BATCH]
+            rows = self._con.execute(f"SELECT {cols} FROM results WHERE created >= ? AND key IN "
+                                     f"({', '.join('?'*len(part))})",[oldest,*part]).fetchall()
+            for key, val, stmt in rows:
+                found[key] = StoredResult(valuation=pickle.loads(val),
+                                          statement=pickle.loads(zlib.decompress(stmt)) if stmt is not None else None)
+        if found:
+            now: float = time.time()
+            self._con.executemany("UPDATE results SET accessed = ? WHERE key = ?",[(now,k) for k in found])
+            self._con.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str, statements: bool = True) -> Optional[StoredResult]:
+        return self.get_many([key],statements).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str,str,pd.DataFrame,Optional[FinancialStatement]]]) -> None:
+        '''
+        Store results, replacing those of the same keys, then evict
+        :param items: (key, company, valuation, statement or None)
+        '''
+        now: float = time.time()
+        rows = [(key,comp,now,now,pickle.dumps(val,protocol=pickle.HIGHEST_PROTOCOL),
+                 zlib.compress(pickle.dumps(stmt,protocol=pickle.HIGHEST_PROTOCOL)) if stmt is not None else None)
+                for key, comp, val, stmt in items]
+        self._con.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",rows)
+        self._con.commit()
+        self.evict()
+
+    def put(self, key: str, company: str, valuation: pd.DataFrame,
+            statement: Optional[FinancialStatement] = None) -> None:
+        self.put_many([(key,company,valuation,statement)])
+
+    def evict(self, max_entries: Optional[int] = None, max_age: Optional[float] = None) -> int:
+        '''
+        Drop stale entries, then the least recently used beyond the size limit
+        :param max_entries: entries kept at most (defaults to the store's setting)
+        :param max_age: seconds after which an entry is stale (defaults to the store's setting)
+        :return: number of entries dropped
+        '''
+        max_entries = self.max_entries if max_entries is None else max_entries
+        max_age = self.max_age if max_age is None else max_age
+        dropped: int = 0
+        if max_age is not None:
+            dropped += self._con.execute("DELETE FROM results WHERE created < ?",[time.time() - max_age]).rowcount
+        if max_entries is not None:
+            dropped += self._con.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed "
+                                         "DESC LIMIT -1 OFFSET ?)",[max_entries]).rowcount
+        self._con.commit()
+        return dropped
+
+    def value(self, comp: str, inc, bs, a_date: Dates, f_date: Dates, wacc: float, lt_growth: float) -> StoredResult:
+        '''
+        Results of a single company: read from the store when its inputs are unchanged, computed and stored otherwise
+        '''
+        from finModel.analysis.batch import run_company
+        key: str = input_key(comp,inc,bs,a_date,f_date,wacc,lt_growth)
+        stored: Optional[StoredResult] = self.get(key)
+        if stored is None:
+            fin, val = run_company(comp,inc,bs,a_date,f_date,wacc,lt_growth)
+            self.put(key,comp,val,fin)
+            stored = StoredResult(valuation=val,statement=fin)
+        return stored
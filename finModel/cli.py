@@ -0,0 +1,175 @@
+"""
+PURPOSE: `finmodel` command-line runner. Values every company of a long-format source (forecast -> cash flow -> DCF)
+with a pool of worker processes and writes the results as Parquet parts, one per chunk of companies, so that an
+interrupted run can be resumed where it stopped.
+
+    finmodel statements.parquet out/ --config valuation.json --workers 8
+    finmodel statements/ out/ --wacc 0.08 --lt-growth 0.02 --forecast-dates 2019-12-31,2020-12-31 --resume
+
+The config is a JSON object with wacc and lt_growth (a number, or an object of numbers keyed by company),
+forecast_dates and optionally actual_dates (defaults to the dates of each company's statements); options given on the
+command line take precedence. The output directory holds config.json (the settings of the run), results/ (a Parquet
+dataset of company, metric and value rows; read it with pandas.read_parquet(out/results)) and failures.parquet.
+With --store, results are also kept in a SQLite store across runs (see analysis.store) and only companies whose inputs
+changed since the last run are recomputed.
+"""
+from finModel.statements.ingest import iter_companies, Statements
+from finModel.analysis.batch import value_chunks
+from finModel.analysis.store import ResultStore
+from typing import List, Dict, Set, Iterator, Optional, Any
+import pandas as pd
+import argparse
+import glob
+import json
+import sys
+import re
+import os
+
+
+SOURCE_EXTENSIONS = (".csv", ".parquet", ".pq", ".db", ".sqlite", ".sqlite3")
+SETTINGS = ("wacc", "lt_growth", "forecast_dates", "actual_dates")
+PART = re.compile(r"^part-(\d+)\.parquet$")
+
+
+def source_files(source: str) -> List[str]:
+    '''
+    Long-format files to read: the source itself, or the supported files of a directory in name order. The rows of a
+    company must all be in one file.
+    '''
+    if not os.path.isdir(source):
+        return [source]
+    return sorted(p for p in glob.glob(os.path.join(source,"*")) if os.path.splitext(p)[1].lower() in SOURCE_EXTENSIONS)
+
+
+def load_settings(args: argparse.Namespace) -> Dict[str,Any]:
+    '''
+    Valuation settings of the run: the config file overridden by the command-line options
+    '''
+    settings: Dict[str,Any] = {}
+    if args.config:
+        with open(args.config) as f:
+            settings = json.load(f)
+        unknown: List[str] = [k for k in settings if k not in SETTINGS]
+        if unknown:
+            raise ValueError(f"Unknown config keys: {unknown}")
+    for key in SETTINGS:
+        value = getattr(args,key)
+        if value is not None:
+            settings[key] = value
+    settings.setdefault("actual_dates",None)
+    missing: List[str] = [k for k in SETTINGS if k not in settings]
+    if missing:
+        raise ValueError(f"Missing valuation settings: {missing}")
+    return settings
+
+
+def completed(results_dir: str) -> Set[str]:
+    '''
+    Companies already written to the results of an earlier run
+    '''
+    return {c for p in glob.glob(os.path.join(results_dir,"part-*.parquet"))
+            for c in pd.read_parquet(p,columns=["company"])["company"].unique()}
+
+
+def next_part(results_dir: str) -> int:
+    '''
+    Number of the next results part: parts of earlier runs are kept and numbering continues after the highest of them
+    '''
+    numbers: List[int] = [int(m.group(1)) for m in map(PART.match,os.listdir(results_dir)) if m]
+    return 1 + max(numbers,default=-1)
+
+
+def _write_part(data: pd.DataFrame, path: str) -> None:
+    # Written under a temporary name first, so that a part on disk is always complete
+    data.to_parquet(path + ".tmp",index=False)
+    os.replace(path + ".tmp",path)
+
+
+def _dates(value: str) -> List[str]:
+    return [d.strip() for d in value.split(",") if d.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="finmodel",description="Batch DCF valuation of long-format statements")
+    parser.add_argument("source",help="long-format file (.csv, .parquet, SQLite) or a directory of such files")
+    parser.add_argument("out_dir",help="output directory")
+    parser.add_argument("--config",help="JSON file with wacc, lt_growth, forecast_dates and optionally actual_dates")
+    parser.add_argument("--wacc",type=float,help="WACC for every company")
+    parser.add_argument("--lt-growth",dest="lt_growth",type=float,help="long-term growth for every company")
+    parser.add_argument("--forecast-dates",dest="forecast_dates",type=_dates,help="comma separated dates to forecast")
+    parser.add_argument("--actual-dates",dest="actual_dates",type=_dates,help="comma separated actual dates")
+    parser.add_argument("--workers",type=int,default=1,help="worker processes (default: 1, in-process)")
+    parser.add_argument("--chunk-size",dest="chunk_size",type=int,default=50,
+                        help="companies per task and per checkpoint (default: 50)")
+    parser.add_argument("--table",default="statements",help="table to read from SQLite sources")
+    parser.add_argument("--resume",action="store_true",help="skip the companies already valued in out_dir")
+    parser.add_argument("--store",help="SQLite result store; companies whose inputs are unchanged are read from it")
+    parser.add_argument("--store-max-entries",dest="store_max_entries",type=int,
+                        help="entries kept in the store, least recently used dropped first")
+    parser.add_argument("--store-max-age",dest="store_max_age",type=float,help="days after which stored results expire")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    '''
+    Entry point of the finmodel console script
+    :return: exit status; 1 if any company failed, 2 on invalid arguments
+    '''
+    parser: argparse.ArgumentParser = build_parser()
+    args: argparse.Namespace = parser.parse_args(argv)
+    try:
+        settings: Dict[str,Any] = load_settings(args)
+    except (OSError,ValueError) as err:
+        parser.error(str(err))
+
+    results_dir: str = os.path.join(args.out_dir,"results")
+    config_path: str = os.path.join(args.out_dir,"config.json")
+    done: Set[str] = set()
+    if os.path.exists(config_path):
+        if not args.resume:
+            parser.error(f"{args.out_dir} holds an earlier run; pass --resume or choose another output directory")
+        with open(config_path) as f:
+            if json.load(f) != settings:
+                parser.error(f"Valuation settings differ from those of the run in {args.out_dir}")
+        done = completed(results_dir)
+    os.makedirs(results_dir,exist_ok=True)
+    with open(config_path,"w") as f:
+        json.dump(settings,f,indent=2)
+
+    def companies() -> Iterator[Statements]:
+        for path in source_files(args.source):
+            for company in iter_companies(path,table=args.table):
+                if company[0] not in done:
+                    yield company
+
+    store: Optional[ResultStore] = None
+    if args.store:
+        store = ResultStore(args.store,max_entries=args.store_max_entries,
+                            max_age=args.store_max_age*86400 if args.store_max_age is not None else None)
+    part: int = next_part(results_dir)
+    failures_path: str = os.path.join(args.out_dir,"failures.parquet")
+    valued: int = 0
+    failures: List = []
+    # Failed companies are retried on resume, so the failures of this run replace those of earlier runs; the file is
+    # rewritten after every chunk with failures, so that an interrupted run keeps them
+    _write_part(pd.DataFrame(failures,columns=["company","error"]),failures_path)
+    try:
+        for results, failed in value_chunks(companies(),settings["actual_dates"],settings["forecast_dates"],
+                                            settings["wacc"],settings["lt_growth"],args.workers,args.chunk_size,store):
+            if results:
+                _write_part(pd.concat(results,ignore_index=True),os.path.join(results_dir,f"part-{part:05d}.parquet"))
+                part += 1
+                valued += len(results)
+            if failed:
+                failures.extend(failed)
+                _write_part(pd.DataFrame(failures,columns=["company","error"]),failures_path)
+    finally:
+        if store is not None:
+            store.close()
+    reused: str = f", {store.hits} unchanged and read from the store" if store is not None else ""
+    print(f"valued {valued} companies ({len(done)} from earlier runs{reused}), {len(failures)} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 from finModel.statements.income import IncomeStatement
 from finModel.statements.balance import BalanceSheet
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+from functools import cached_property
 from typing import List
 import pandas as pd
 
@@ -21,55 +22,102 @@ class OtherInvestmentMovement:
 
 @dataclass
 class CashFlowStatement:
-    ebit: pd.Series
-    op_tax_rate: pd.Series
-    d_and_a: pd.Series
-    inventory_movement: pd.Series
-    trade_receivable_movement: pd.Series
-    trade_payable_movement: pd.Series
-    extraordinary_item: pd.Series
-    interest_expense: pd.Series
-    delta_fin_liability: pd.Series
-    ppe_movement: pd.Series
-    nopat: pd.Series
-    operating_tax: pd.Series
-    gross_cf: pd.Series
-    investment_in_working_capital: pd.Series
-    other_investment: pd.Series
-    investment_in_other_asset_and_liability: pd.Series
-    capex_movement: pd.Series
-    ufcf: pd.Series
-    delta_taxes_vs_optax: pd.Series
-    delta_equity_inc_dividend: pd.Series
-    net_cashflow: pd.Series
-
-    def __init__(self, inc:IncomeStatement, bs:BalanceSheet):
-        self.ebit = inc.ebit
-        self.op_tax_rate = inc.tax_rate
-        self.operating_tax = self.op_tax_rate * self.ebit
-        self.nopat = self.ebit + self.operating_tax
-        self.d_and_a = -inc.d_and_a
-        self.gross_cf = self.nopat + self.d_and_a
-        self.inventory_movement = -bs.inventory.diff()
-        self.trade_receivable_movement = -bs.trade_receivable.diff()
-        self.trade_payable_movement = bs.trade_payable.diff()
-        self.investment_in_working_capital = self.inventory_movement + self.trade_payable_movement + \
-                                             self.trade_receivable_movement
-        self.investment_in_other_asset_and_liability = OtherInvestmentMovement(bs).other_asset + \
-                                                       OtherInvestmentMovement(bs).other_liability
-        self.other_investment = OtherInvestmentMovement(bs).intangible_asset + \
-                                OtherInvestmentMovement(bs).financial_asset
-        self.ppe_movement = -bs.ppe.diff()
-        self.capex_movement = self.ppe_movement - self.d_and_a
-        self.extraordinary_item = inc.extraordinary_income
-        self.ufcf = self.gross_cf + self.investment_in_working_capital + self.investment_in_other_asset_and_liability + \
-                    self.capex_movement + self.other_investment + self.extraordinary_item
-        self.interest_expense = inc.int_expense
-        self.delta_taxes_vs_optax = inc.tax - self.operating_tax
-        self.delta_fin_liability = bs.financial_liability.total.diff()
-        self.delta_equity_inc_dividend = bs.shareholder_equity.total_equity.diff() - inc.net_income
-        self.net_cashflow = self.ufcf + self.interest_expense + self.delta_taxes_vs_optax + self.delta_fin_liability + \
-                            self.delta_equity_inc_dividend
+    '''
+    Cash flows derived from the income statement and balance sheet; every line is computed on first access and memoised,
+    so consumers that only need e.g. ufcf do not pay for the rest
+    '''
+    inc: IncomeStatement
+    bs: BalanceSheet
+
+    @cached_property
+    def other_movement(self) -> OtherInvestmentMovement:
+        return OtherInvestmentMovement(self.bs)
+
+    @cached_property
+    def ebit(self) -> pd.Series:
+        return self.inc.ebit
+
+    @cached_property
+    def op_tax_rate(self) -> pd.Series:
+        return self.inc.tax_rate
+
+    @cached_property
+    def operating_tax(self) -> pd.Series:
+        return self.op_tax_rate * self.ebit
+
+    @cached_property
+    def nopat(self) -> pd.Series:
+        return self.ebit + self.operating_tax
+
+    @cached_property
+    def d_and_a(self) -> pd.Series:
+        return -self.inc.d_and_a
+
+    @cached_property
+    def gross_cf(self) -> pd.Series:
+        return self.nopat + self.d_and_a
+
+    @cached_property
+    def inventory_movement(self) -> pd.Series:
+        return -self.bs.inventory.diff()
+
+    @cached_property
+    def trade_receivable_movement(self) -> pd.Series:
+        return -self.bs.trade_receivable.diff()
+
+    @cached_property
+    def trade_payable_movement(self) -> pd.Series:
+        return self.bs.trade_payable.diff()
+
+    @cached_property
+    def investment_in_working_capital(self) -> pd.Series:
+        return self.inventory_movement + self.trade_payable_movement + self.trade_receivable_movement
+
+    @cached_property
+    def investment_in_other_asset_and_liability(self) -> pd.Series:
+        return self.other_movement.other_asset + self.other_movement.other_liability
+
+    @cached_property
+    def other_investment(self) -> pd.Series:
+        return self.other_movement.intangible_asset + self.other_movement.financial_asset
+
+    @cached_property
+    def ppe_movement(self) -> pd.Series:
+        return -self.bs.ppe.diff()
+
+    @cached_property
+    def capex_movement(self) -> pd.Series:
+        return self.ppe_movement - self.d_and_a
+
+    @cached_property
+    def extraordinary_item(self) -> pd.Series:
+        return self.inc.extraordinary_income
+
+    @cached_property
+    def ufcf(self) -> pd.Series:
+        return self.gross_cf + self.investment_in_working_capital + self.investment_in_other_asset_and_liability + \
+               self.capex_movement + self.other_investment + self.extraordinary_item
+
+    @cached_property
+    def interest_expense(self) -> pd.Series:
+        return self.inc.int_expense
+
+    @cached_property
+    def delta_taxes_vs_optax(self) -> pd.Series:
+        return self.inc.tax - self.operating_tax
+
+    @cached_property
+    def delta_fin_liability(self) -> pd.Series:
+        return self.bs.financial_liability.total.diff()
+
+    @cached_property
+    def delta_equity_inc_dividend(self) -> pd.Series:
+        return self.bs.shareholder_equity.total_equity.diff() - self.inc.net_income
+
+    @cached_property
+    def net_cashflow(self) -> pd.Series:
+        return self.ufcf + self.interest_expense + self.delta_taxes_vs_optax + self.delta_fin_liability + \
+               self.delta_equity_inc_dividend
 
     def to_pandas_df(self) -> pd.DataFrame:
         series_list: List[pd.Series] = [pd.Series(self.ebit,name="EBIT"),
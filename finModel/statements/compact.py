@@ -0,0 +1,206 @@
+"""
+PURPOSE: Compact, array-backed alternative to the IncomeStatement and BalanceSheet dataclasses. Each statement is held as
+one 2-D float64 block (line items x periods) over a shared date index; subtotals are a single matrix product over the
+input rows. Attribute access (e.g. inc.revenue.sales, bs.other_liability.total) and to_pandas_df() return views of the
+block rather than copies.
+"""
+
+from finModel.statements.income import IncomeStatement, Revenue, COGS, OperatingExpense
+from finModel.statements.balance import BalanceSheet, FinLiab, OtherLiab, Equity
+from typing import List, Dict, Tuple, Union
+import pandas as pd
+import numpy as np
+
+
+def _compile_subtotals(inputs: Tuple[str,...], totals: List[Tuple[str,Dict[str,float]]]) -> np.ndarray:
+    '''
+    Expand subtotals that may reference earlier subtotals into a (subtotals x inputs) coefficient matrix
+    :param inputs: input rows
+    :param totals: (row, {component: coefficient}) in order of evaluation
+    :return: coefficient matrix
+    '''
+    expanded: Dict[str,np.ndarray] = {name: np.eye(len(inputs))[i] for i,name in enumerate(inputs)}
+    for name,parts in totals:
+        expanded[name] = sum(coef * expanded[part] for part,coef in parts.items())
+    return np.array([expanded[name] for name,_ in totals])
+
+
+def _layout(cls):
+    '''
+    Class decorator resolving the row positions and the subtotal matrix of a compact statement
+    '''
+    cls._pos = {name: i for i,name in enumerate(cls.ROWS)}
+    cls._input_idx = np.array([cls._pos[name] for name in cls.INPUTS])
+    cls._total_idx = np.array([cls._pos[name] for name,_ in cls.TOTALS])
+    cls._subtotal = _compile_subtotals(cls.INPUTS,cls.TOTALS)
+    return cls
+
+
+class _RowGroup:
+    '''
+    Exposes a subset of rows as attributes, standing in for the nested dataclasses (Revenue, FinLiab, ...)
+    '''
+    def __init__(self, block: "_CompactStatement", rows: Dict[str,str]):
+        self._block = block
+        self._rows = rows
+
+    def __getattr__(self, name: str) -> pd.Series:
+        if name.startswith("_") or name not in self._rows:
+            raise AttributeError(name)
+        return self._block.row(self._rows[name])
+
+
+class _CompactStatement:
+    '''
+    Stores a statement as values[row, period]. ROWS lists the storage order and its first len(LABELS) rows are the ones
+    reported by to_pandas_df(), so that the report is a slice (and a view) of the block.
+    '''
+    ROWS: Tuple[str,...] = ()
+    LABELS: Tuple[str,...] = ()
+    INPUTS: Tuple[str,...] = ()
+    TOTALS: List[Tuple[str,Dict[str,float]]] = []
+    GROUPS: Dict[str,Dict[str,str]] = {}
+
+    def __init__(self, inputs: np.ndarray, dates: Union[pd.DatetimeIndex,np.ndarray,List[str]]):
+        '''
+        :param inputs: input line items of shape (len(INPUTS), periods), ordered as INPUTS
+        :param dates: period end dates
+        '''
+        self._dates = pd.DatetimeIndex(dates,name="date")
+        self.values = np.empty((len(self.ROWS),len(self._dates)),dtype=np.float64)
+        self.values[self._input_idx] = inputs
+        self.compute()
+
+    def compute(self, cols: Union[slice,np.ndarray] = slice(None)) -> None:
+        '''
+        (Re-)compute the subtotals of the given periods
+        '''
+        self.values[self._total_idx,cols] = self._subtotal @ self.values[self._input_idx,cols]
+
+    def dates(self) -> pd.DatetimeIndex:
+        return self._dates
+
+    def row(self, name: str) -> pd.Series:
+        return pd.Series(self.values[self._pos[name]],index=self._dates,name=name,copy=False)
+
+    def __getattr__(self, name: str) -> Union[pd.Series,_RowGroup]:
+        if name in self.GROUPS:
+            return _RowGroup(self,self.GROUPS[name])
+        if name in self._pos:
+            return self.row(name)
+        raise AttributeError(name)
+
+    def to_pandas_df(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values[:len(self.LABELS)].T,index=self._dates,columns=list(self.LABELS),copy=False)
+
+    @classmethod
+    def _stack_inputs(cls, statement) -> Tuple[np.ndarray,pd.DatetimeIndex]:
+        '''
+        Collect the input line items of a dataclass statement, aligned on the dates of its first input
+        '''
+        members: Dict[str,Tuple[str,str]] = {row: (grp,attr) for grp,rows in cls.GROUPS.items() for attr,row in rows.items()}
+        series: List[pd.Series] = [getattr(getattr(statement,members[name][0]),members[name][1]) if name in members
+                                   else getattr(statement,name) for name in cls.INPUTS]
+        dates: pd.DatetimeIndex = pd.DatetimeIndex(series[0].index)
+        return np.vstack([s.reindex(dates).values for s in series]), dates
+
+
+@_layout
+class CompactIncomeStatement(_CompactStatement):
+    ROWS = ("sales","other_revenue","tot_revenue","cogs","gross_margin","opex","ebitda","d_and_a","ebit","int_expense",
+            "extraordinary_income","ebt","tax_rate","tax","net_income",
+            "raw_material","direct_cost","cost_for_services","lease_cost","other_opex")
+    LABELS = ("Revenues","Other revenues","Total revenues","Cost of goods sold","Gross margin","Operating expenses",
+              "EBITDA","D&A","EBIT","Interest expense","Extraordinary income","EBT","Tax rate","Taxes","Net income")
+    INPUTS = ("sales","other_revenue","raw_material","direct_cost","cost_for_services","lease_cost","other_opex",
+              "d_and_a","int_expense","extraordinary_income","tax")
+    TOTALS = [("tot_revenue",{"sales":1,"other_revenue":1}),
+              ("cogs",{"raw_material":1,"direct_cost":1}),
+              ("opex",{"cost_for_services":1,"lease_cost":1,"other_opex":1}),
+              ("gross_margin",{"tot_revenue":1,"cogs":1}),
+              ("ebitda",{"gross_margin":1,"opex":1}),
+              ("ebit",{"ebitda":1,"d_and_a":1}),
+              ("ebt",{"ebit":1,"int_expense":1,"extraordinary_income":1}),
+              ("net_income",{"ebt":1,"tax":1})]
+    GROUPS = {"revenue": {"sales":"sales","other_revenue":"other_revenue","tot_revenue":"tot_revenue"},
+              "cogs": {"raw_material":"raw_material","direct_cost":"direct_cost","cogs":"cogs"},
+              "opex": {"cost_for_services":"cost_for_services","lease_cost":"lease_cost","other":"other_opex",
+                       "opex":"opex"}}
+
+    def compute(self, cols: Union[slice,np.ndarray] = slice(None)) -> None:
+        super().compute(cols)
+        with np.errstate(divide="ignore",invalid="ignore"):
+            self.values[self._pos["tax_rate"],cols] = self.values[self._pos["tax"],cols] / \
+                                                      self.values[self._pos["ebt"],cols]
+
+    @classmethod
+    def from_statement(cls, inc: IncomeStatement) -> "CompactIncomeStatement":
+        return cls(*cls._stack_inputs(inc))
+
+    def to_statement(self) -> IncomeStatement:
+        return IncomeStatement(
+            revenue=Revenue(sales=self.revenue.sales,other_revenue=self.revenue.other_revenue),
+            cogs=COGS(raw_material=self.cogs.raw_material,direct_cost=self.cogs.direct_cost),
+            opex=OperatingExpense(cost_for_services=self.opex.cost_for_services,lease_cost=self.opex.lease_cost,
+                                  other=self.opex.other),
+            d_and_a=self.d_and_a,
+            int_expense=self.int_expense,
+            extraordinary_income=self.extraordinary_income,
+            tax=self.tax)
+
+
+@_layout
+class CompactBalanceSheet(_CompactStatement):
+    ROWS = ("intangible_asset","ppe","financial_asset","inventory","trade_receivable","other_asset","cash",
+            "total_asset","trade_payable","other_liability_total","financial_liability_total","total_equity",
+            "total_liability_and_equity",
+            "bank_borrowing","other_financial_liability","other_liability","deferred_taxes",
+            "provision_for_retirement_benefit","share_capital","reserve","retained_earning","net_annual_profit")
+    LABELS = ("Intangible assets","PP&E","Financial assets","Inventory","Trade receivable","Other assets",
+              "Cash and equivalents","Total Assets","Trade payable","Other liabilities","Financial liabilities",
+              "Shareholder's equity","Total Liabilities & Equities")
+    INPUTS = ("intangible_asset","ppe","financial_asset","inventory","trade_receivable","other_asset","trade_payable",
+              "bank_borrowing","other_financial_liability","other_liability","deferred_taxes",
+              "provision_for_retirement_benefit","share_capital","reserve","retained_earning","net_annual_profit")
+    TOTALS = [("financial_liability_total",{"bank_borrowing":1,"other_financial_liability":1}),
+              ("other_liability_total",{"other_liability":1,"deferred_taxes":1,"provision_for_retirement_benefit":1}),
+              ("total_equity",{"share_capital":1,"reserve":1,"retained_earning":1,"net_annual_profit":1}),
+              ("total_liability_and_equity",{"trade_payable":1,"other_liability_total":1,
+                                             "financial_liability_total":1,"total_equity":1}),
+              ("cash",{"total_liability_and_equity":1,"intangible_asset":-1,"ppe":-1,"financial_asset":-1,
+                       "inventory":-1,"trade_receivable":-1,"other_asset":-1}),
+              ("total_asset",{"intangible_asset":1,"ppe":1,"financial_asset":1,"inventory":1,"trade_receivable":1,
+                              "other_asset":1,"cash":1})]
+    GROUPS = {"financial_liability": {"bank_borrowing":"bank_borrowing",
+                                      "other_financial_liability":"other_financial_liability",
+                                      "total":"financial_liability_total"},
+              "other_liability": {"other_liability":"other_liability","deferred_taxes":"deferred_taxes",
+                                  "provision_for_retirement_benefit":"provision_for_retirement_benefit",
+                                  "total":"other_liability_total"},
+              "shareholder_equity": {"share_capital":"share_capital","reserve":"reserve",
+                                     "retained_earning":"retained_earning","net_annual_profit":"net_annual_profit",
+                                     "total_equity":"total_equity"}}
+
+    @classmethod
+    def from_statement(cls, bs: BalanceSheet) -> "CompactBalanceSheet":
+        return cls(*cls._stack_inputs(bs))
+
+    def to_statement(self) -> BalanceSheet:
+        return BalanceSheet(
+            intangible_asset=self.intangible_asset,
+            ppe=self.ppe,
+            financial_asset=self.financial_asset,
+            financial_liability=FinLiab(bank_borrowing=self.financial_liability.bank_borrowing,
+                                        other_financial_liability=self.financial_liability.other_financial_liability),
+            inventory=self.inventory,
+            trade_receivable=self.trade_receivable,
+            trade_payable=self.trade_payable,
+            other_asset=self.other_asset,
+            other_liability=OtherLiab(other_liability=self.other_liability.other_liability,
+                                      deferred_taxes=self.other_liability.deferred_taxes,
+                                      provision_for_retirement_benefit=
+                                      self.other_liability.provision_for_retirement_benefit),
+            shareholder_equity=Equity(share_capital=self.shareholder_equity.share_capital,
+                                      reserve=self.shareholder_equity.reserve,
+                                      retained_earning=self.shareholder_equity.retained_earning,
+                                      net_annual_profit=self.shareholder_equity.net_annual_profit))
@@ -2,22 +2,24 @@
 PURPOSE: Houses all the methodologies that are used to perform forecasts of the various financial statements.
 """
 
-from finModel.utils.transform import const_growth, days_outstanding, const_pandas_series
-from finModel.utils.transform import add_movement, mean_g, const_share
+from finModel.utils.transform import const_growth, const_pandas_series
+from finModel.utils.transform import add_movement, const_share, linear_trend
 from finModel.statements.income import IncomeStatement, Revenue, OperatingExpense, COGS
 from finModel.statements.balance import BalanceSheet, FinLiab, OtherLiab, Equity
-from typing import List
+from finModel.statements.projection import DriverStats, driver_stats
+from typing import List, Dict, Optional
 import pandas as pd
 import numpy as np
 
 
-def is_forecast_avg_growth(inc:IncomeStatement, f_date:np.ndarray) -> IncomeStatement:
+def is_forecast_avg_growth(inc:IncomeStatement, f_date:np.ndarray, trend:Optional[str]=None,
+                           stats:Optional[DriverStats]=None) -> IncomeStatement:
     '''
     Performs the forecast for each date using historical period-on-period historical growth and % shares of revenue.
 
     The rules are defined as follows:
 
-        1. Revenue (sales and services) = avg. historical growth to continue
+        1. Revenue (sales and services) = avg. historical growth to continue (or a fitted trend, see trend)
         2. Revenue (other) = set to previous value
         3. COGS = avg % of revenues
         4. Opex = avg % of revenues
@@ -28,28 +30,34 @@ def is_forecast_avg_growth(inc:IncomeStatement, f_date:np.ndarray) -> IncomeStat
 
     :param inc: income statement (actuals)
     :param f_date: dates to be forecasted
+    :param trend: project sales with a least-squares trend instead ('linear', 'log' or 'damped'; see linear_trend())
+    :param stats: historical averages of the actuals (see projection.driver_stats()); looked up when not given
     :return: income statement (forecasted)
     '''
+    avg: Dict[str,float] = (stats or driver_stats(inc)).point
     # Forecast the revenues first; as they will be used to compute % shares when initialising the forecast instance
-    f_revenue: pd.Series = const_growth(inc.revenue.sales, mean_g(inc.revenue.sales), f_date)
+    if trend is None:
+        f_revenue: pd.Series = const_growth(inc.revenue.sales, avg["growth"], f_date)
+    else:
+        f_revenue: pd.Series = linear_trend(inc.revenue.sales, f_date, method=trend)
     # Initialise the forecasted instance
     forecasted = IncomeStatement(
         revenue=Revenue(sales=f_revenue, other_revenue=const_growth(inc.revenue.other_revenue, 0.0, f_date)),
         cogs=COGS(
             raw_material=const_pandas_series(inc.cogs.cogs.name,f_date),
-            direct_cost=const_share(f_revenue, np.nanmean(inc.cogs.cogs / inc.revenue.sales), f_date)),
+            direct_cost=const_share(f_revenue, avg["cogs_shr"], f_date)),
         opex=OperatingExpense(
-            cost_for_services=const_share(f_revenue, np.nanmean(inc.opex.opex / inc.revenue.sales), f_date),
+            cost_for_services=const_share(f_revenue, avg["opex_shr"], f_date),
             lease_cost=const_pandas_series(inc.opex.lease_cost.name,f_date),
             other=const_pandas_series(inc.opex.other,f_date)),
-        d_and_a=const_share(f_revenue, np.nanmean(inc.d_and_a / inc.revenue.sales), f_date),
+        d_and_a=const_share(f_revenue, avg["d_and_a_shr"], f_date),
         int_expense=const_growth(inc.int_expense,0.0,f_date),
         extraordinary_income=const_share(f_revenue,np.array(0.0),f_date),
         tax=const_pandas_series(inc.tax.name,f_date))
     # By default, IncomeStatement computes tax-rate from tax and EBT; for now there is no provision for inputting
     # tax-rates in this class. Temporary hack is to manually override tax-rate, tax and net-income (being a function of
     # tax). Need to think of a better approach in future.
-    forecasted.tax_rate = const_pandas_series(inc.tax_rate.name,f_date,np.nanmean(inc.tax/inc.ebt))
+    forecasted.tax_rate = const_pandas_series(inc.tax_rate.name,f_date,avg["tax_rate"])
     forecasted.tax = forecasted.tax_rate * forecasted.ebt
     forecasted.net_income = forecasted.ebt + forecasted.tax
 
@@ -57,7 +65,7 @@ def is_forecast_avg_growth(inc:IncomeStatement, f_date:np.ndarray) -> IncomeStat
 
 
 def bs_forecast_avg_growth(bs: BalanceSheet, a_inc: IncomeStatement, f_inc: IncomeStatement,
-                           f_date: np.ndarray) -> "BalanceSheet":
+                           f_date: np.ndarray, stats: Optional[DriverStats] = None) -> "BalanceSheet":
     '''
     Forecast for the dates provided using historical growths as % of revenues.
 
@@ -75,30 +83,31 @@ def bs_forecast_avg_growth(bs: BalanceSheet, a_inc: IncomeStatement, f_inc: Inco
     :param a_inc: income statement (actuals)
     :param f_inc: income statement with forecasts
     :param f_date: dates to forecast on
+    :param stats: historical averages of the actuals (see projection.driver_stats()); looked up when not given
     :return: balance sheet with forecasts
     '''
+    avg: Dict[str,float] = (stats or driver_stats(a_inc,bs)).point
     f_bs = BalanceSheet(
         intangible_asset=const_growth(bs.intangible_asset,0.0,f_date),
-        ppe=const_share(f_inc.revenue.sales, np.nanmean(bs.ppe / a_inc.revenue.sales), f_date),
+        ppe=const_share(f_inc.revenue.sales, avg["ppe_shr"], f_date),
         financial_asset=const_growth(bs.financial_asset,0.0,f_date),
         financial_liability=FinLiab(
             bank_borrowing=const_growth(bs.financial_liability.bank_borrowing,0.0,f_date),
             other_financial_liability=const_growth(bs.financial_liability.other_financial_liability,0.0,f_date)),
         inventory=(const_share(
-            f_inc.cogs.cogs,np.mean(days_outstanding(bs.inventory,a_inc.cogs.cogs,360)),f_date))/360,
+            f_inc.cogs.cogs,avg["dio"],f_date))/360,
         trade_receivable=(const_share(
-            f_inc.revenue.sales,np.mean(days_outstanding(bs.trade_receivable, a_inc.revenue.sales, 360)),f_date)) / 360,
-        other_asset=const_share(f_inc.revenue.sales, np.nanmean(bs.other_asset / a_inc.revenue.sales), f_date),
+            f_inc.revenue.sales,avg["dso"],f_date)) / 360,
+        other_asset=const_share(f_inc.revenue.sales, avg["other_asset_shr"], f_date),
         other_liability=OtherLiab(
             other_liability=const_share(
-                f_inc.revenue.sales,np.nanmean(bs.other_liability.other_liability / a_inc.revenue.sales),f_date),
+                f_inc.revenue.sales,avg["other_liability_item_shr"],f_date),
             provision_for_retirement_benefit=const_share(
-                f_inc.revenue.sales,np.nanmean(bs.other_liability.provision_for_retirement_benefit / a_inc.revenue.sales),
-                f_date),
+                f_inc.revenue.sales,avg["retirement_benefit_shr"],f_date),
             deferred_taxes=const_share(
-                f_inc.revenue.sales,np.nanmean(bs.other_liability.deferred_taxes / a_inc.revenue.sales),f_date)),
+                f_inc.revenue.sales,avg["deferred_taxes_shr"],f_date)),
         trade_payable=(const_share(
-            f_inc.cogs.cogs,np.mean(days_outstanding(bs.trade_payable,a_inc.cogs.cogs,360)),f_date))/360,
+            f_inc.cogs.cogs,avg["dpo"],f_date))/360,
         shareholder_equity=Equity(
             share_capital=const_pandas_series(bs.shareholder_equity.share_capital.name,f_date),
             reserve=const_pandas_series(bs.shareholder_equity.reserve.name,f_date),
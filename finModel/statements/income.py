@@ -1,62 +1,51 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+from functools import cached_property
+from finModel.statements.timeline import Timeline
 from typing import List
 import pandas as pd
 
 @dataclass
-class Revenue:
+class Revenue(Timeline):
     '''
     Stores the revenue from sales and other sources and calculates the total revenue
     '''
     sales: pd.Series
     other_revenue: pd.Series
-    tot_revenue: pd.Series = field(init=False)
 
-    def __post_init__(self):
-        self.tot_revenue = self.sales + self.other_revenue
-
-    def attach(self,other:"Revenue") -> "Revenue":
-        return Revenue(sales=pd.concat([self.sales, other.sales]).sort_index(),
-                       other_revenue=pd.concat([self.other_revenue,other.other_revenue]).sort_index())
+    @cached_property
+    def tot_revenue(self) -> pd.Series:
+        return self.sales + self.other_revenue
 
 
 @dataclass
-class COGS:
+class COGS(Timeline):
     '''
     Cost of goods sold includes raw materials cost and direct costs
     '''
     raw_material: pd.Series
     direct_cost: pd.Series
-    cogs: pd.Series = field(init=False)
-
-    def __post_init__(self):
-        self.cogs = self.raw_material + self.direct_cost
 
-    def attach(self,other:"COGS") -> "COGS":
-        return COGS(raw_material=pd.concat([self.raw_material,other.raw_material]).sort_index(),
-                    direct_cost=pd.concat([self.direct_cost,other.direct_cost]).sort_index())
+    @cached_property
+    def cogs(self) -> pd.Series:
+        return self.raw_material + self.direct_cost
 
 
 @dataclass
-class OperatingExpense:
+class OperatingExpense(Timeline):
     '''
     Operating expenses include cost for services, lease costs and other operating expenses
     '''
     cost_for_services: pd.Series
     lease_cost: pd.Series
     other: pd.Series
-    opex: pd.Series = field(init=False)
-
-    def __post_init__(self):
-        self.opex = self.cost_for_services + self.lease_cost + self.other
 
-    def attach(self,other:"OperatingExpense") -> "OperatingExpense":
-        return OperatingExpense(cost_for_services=pd.concat([self.cost_for_services,other.cost_for_services]).sort_index(),
-                                lease_cost=pd.concat([self.lease_cost,other.lease_cost]).sort_index(),
-                                other=pd.concat([self.other,other.other]).sort_index())
+    @cached_property
+    def opex(self) -> pd.Series:
+        return self.cost_for_services + self.lease_cost + self.other
 
 
 @dataclass
-class IncomeStatement:
+class IncomeStatement(Timeline):
     '''
     Inputs/calculates all the reported components of an Income statement and stores as a pandas DataFrame
     '''
@@ -67,20 +56,31 @@ class IncomeStatement:
     int_expense: pd.Series
     extraordinary_income: pd.Series
     tax: pd.Series
-    gross_margin: pd.Series = field(init=False)
-    ebitda: pd.Series = field(init=False)
-    ebit: pd.Series = field(init=False)
-    ebt: pd.Series = field(init=False)
-    tax_rate: pd.Series = field(init=False)
-    net_income: pd.Series = field(init=False)
-
-    def __post_init__(self):
-        self.gross_margin = self.revenue.tot_revenue + self.cogs.cogs
-        self.ebitda = self.gross_margin + self.opex.opex
-        self.ebit = self.ebitda + self.d_and_a
-        self.ebt = self.ebit + self.int_expense + self.extraordinary_income
-        self.tax_rate = self.tax/self.ebt
-        self.net_income = self.ebt + self.tax
+
+    # Subtotals are computed on first access and memoised; assigning one (e.g. tax_rate) overrides it
+    @cached_property
+    def gross_margin(self) -> pd.Series:
+        return self.revenue.tot_revenue + self.cogs.cogs
+
+    @cached_property
+    def ebitda(self) -> pd.Series:
+        return self.gross_margin + self.opex.opex
+
+    @cached_property
+    def ebit(self) -> pd.Series:
+        return self.ebitda + self.d_and_a
+
+    @cached_property
+    def ebt(self) -> pd.Series:
+        return self.ebit + self.int_expense + self.extraordinary_income
+
+    @cached_property
+    def tax_rate(self) -> pd.Series:
+        return self.tax/self.ebt
+
+    @cached_property
+    def net_income(self) -> pd.Series:
+        return self.ebt + self.tax
 
     def to_pandas_df(self) -> pd.DataFrame:
         series_list: List[pd.Series] = [pd.Series(self.revenue.sales, name="Revenues"),
@@ -99,14 +99,3 @@ class IncomeStatement:
                                         pd.Series(self.tax,name="Taxes"),
                                         pd.Series(self.net_income,name="Net income")]
         return pd.concat(series_list,axis=1)
-
-    def attach(self,other:"IncomeStatement") -> "IncomeStatement":
-        return IncomeStatement(
-            revenue=self.revenue.attach(other.revenue),
-            cogs=self.cogs.attach(other.cogs),
-            opex=self.opex.attach(other.opex),
-            d_and_a=pd.concat([self.d_and_a,other.d_and_a]).sort_index(),
-            int_expense=pd.concat([self.int_expense,other.int_expense]).sort_index(),
-            extraordinary_income=pd.concat([self.extraordinary_income,other.extraordinary_income]).sort_index(),
-            tax=pd.concat([self.tax,other.tax]).sort_index()
-        )
\ No newline at end of file
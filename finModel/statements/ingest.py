@@ -0,0 +1,174 @@
+"""
+PURPOSE: Ingestion of statements from long-format data (company, date, statement, component, value) held in CSV, Parquet
+or SQLite. Sources are streamed in chunks and statements are yielded one company at a time.
+"""
+
+from finModel.statements.income import Revenue, COGS, OperatingExpense, IncomeStatement
+from finModel.statements.balance import OtherLiab, FinLiab, Equity, BalanceSheet
+from finModel.statements.compact import CompactIncomeStatement, CompactBalanceSheet
+from typing import Dict, Iterator, Tuple, Optional, Union
+import pandas as pd
+import numpy as np
+import sqlite3
+import os
+
+
+# Component labels of the source data and the line item (compact statement row) each of them feeds
+INCOME_COMPONENTS: Dict[str,str] = {
+    "Revenue from sales and services": "sales",
+    "Other revenue": "other_revenue",
+    "Raw materials": "raw_material",
+    "Direct costs": "direct_cost",
+    "Cost for services": "cost_for_services",
+    "Lease costs": "lease_cost",
+    "Other operating expenses": "other_opex",
+    "D&A": "d_and_a",
+    "Financial income/expenses": "int_expense",
+    "Extraordinary income": "extraordinary_income",
+    "Taxes": "tax",
+}
+BALANCE_COMPONENTS: Dict[str,str] = {
+    "Intangible assets": "intangible_asset",
+    "PP&E": "ppe",
+    "Financial assets": "financial_asset",
+    "Inventory": "inventory",
+    "Trade receivables": "trade_receivable",
+    "Other assets": "other_asset",
+    "Trade payable": "trade_payable",
+    "Bank borrowings": "bank_borrowing",
+    "Other Financial liabilities": "other_financial_liability",
+    "Other liabilities": "other_liability",
+    "Deferred taxes": "deferred_taxes",
+    "Provisions for retirement benefits": "provision_for_retirement_benefit",
+    "Share Capital": "share_capital",
+    "Reserves": "reserve",
+    "Retained earnings": "retained_earning",
+    "Profit/(loss) for the year": "net_annual_profit",
+}
+COLUMNS = ["company", "date", "statement", "component", "value"]
+
+Statements = Tuple[str, Union[IncomeStatement,CompactIncomeStatement], Union[BalanceSheet,CompactBalanceSheet]]
+
+
+def _rows(data: pd.DataFrame, components: Dict[str,str]) -> pd.DataFrame:
+    '''
+    Relabel a date x component frame to line items; components that are not reported come through as NaN
+    '''
+    return data.reindex(columns=list(components)).rename(columns=components)
+
+
+def income_from_frame(data: pd.DataFrame) -> IncomeStatement:
+    '''
+    Build an income statement from a frame indexed on dates with a source component in each column
+    '''
+    d: pd.DataFrame = _rows(data,INCOME_COMPONENTS)
+    return IncomeStatement(
+        revenue=Revenue(sales=d["sales"],other_revenue=d["other_revenue"]),
+        cogs=COGS(raw_material=d["raw_material"],direct_cost=d["direct_cost"]),
+        opex=OperatingExpense(cost_for_services=d["cost_for_services"],lease_cost=d["lease_cost"],
+                              other=d["other_opex"]),
+        d_and_a=d["d_and_a"],
+        int_expense=d["int_expense"],
+        extraordinary_income=d["extraordinary_income"],
+        tax=d["tax"])
+
+
+def balance_from_frame(data: pd.DataFrame) -> BalanceSheet:
+    '''
+    Build a balance sheet from a frame indexed on dates with a source component in each column
+    '''
+    d: pd.DataFrame = _rows(data,BALANCE_COMPONENTS)
+    return BalanceSheet(
+        intangible_asset=d["intangible_asset"],
+        ppe=d["ppe"],
+        financial_asset=d["financial_asset"],
+        financial_liability=FinLiab(bank_borrowing=d["bank_borrowing"],
+                                    other_financial_liability=d["other_financial_liability"]),
+        inventory=d["inventory"],
+        trade_receivable=d["trade_receivable"],
+        other_asset=d["other_asset"],
+        other_liability=OtherLiab(other_liability=d["other_liability"],
+                                  deferred_taxes=d["deferred_taxes"],
+                                  provision_for_retirement_benefit=d["provision_for_retirement_benefit"]),
+        trade_payable=d["trade_payable"],
+        shareholder_equity=Equity(share_capital=d["share_capital"],
+                                  reserve=d["reserve"],
+                                  retained_earning=d["retained_earning"],
+                                  net_annual_profit=d["net_annual_profit"]))
+
+
+def read_long_chunks(source: str, chunksize: int = 100_000, table: str = "statements") -> Iterator[pd.DataFrame]:
+    '''
+    Stream a long-format source in chunks of rows; the format is taken from the file extension
+    :param source: .csv, .parquet or SQLite (.db/.sqlite/.sqlite3) file
+    :param chunksize: rows per chunk
+    :param table: table to read from when the source is SQLite
+    '''
+    ext: str = os.path.splitext(source)[1].lower()
+    if ext == ".csv":
+        yield from pd.read_csv(source,usecols=COLUMNS,chunksize=chunksize)
+    elif ext in (".parquet",".pq"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize,columns=COLUMNS):
+            yield batch.to_pandas()
+    elif ext in (".db",".sqlite",".sqlite3"):
+        with sqlite3.connect(source) as con:
+            yield from pd.read_sql_query(f"SELECT {', '.join(COLUMNS)} FROM {table} ORDER BY company",con,
+                                         chunksize=chunksize)
+    else:
+        raise ValueError(f"Unsupported source format: {ext}")
+
+
+def _statements(comp: str, rows: pd.DataFrame, compact: bool) -> Statements:
+    '''
+    Pivot the long rows of one company into its income statement and balance sheet
+    '''
+    rows = rows.assign(date=pd.to_datetime(rows["date"]))
+    wide: Dict[str,pd.DataFrame] = {
+        stmt: grp.pivot_table(index="date",columns="component",values="value",aggfunc="last").rename_axis(None,axis=1)
+        for stmt, grp in rows.groupby("statement")}
+    inc: pd.DataFrame = wide.get("income",pd.DataFrame(index=pd.DatetimeIndex([],name="date")))
+    bs: pd.DataFrame = wide.get("balance",pd.DataFrame(index=pd.DatetimeIndex([],name="date")))
+    if compact:
+        return (comp,
+                CompactIncomeStatement(_rows(inc,INCOME_COMPONENTS)[list(CompactIncomeStatement.INPUTS)].values.T,
+                                       inc.index),
+                CompactBalanceSheet(_rows(bs,BALANCE_COMPONENTS)[list(CompactBalanceSheet.INPUTS)].values.T,bs.index))
+    return comp, income_from_frame(inc), balance_from_frame(bs)
+
+
+def iter_companies(source: str, chunksize: int = 100_000, table: str = "statements",
+                   compact: bool = False) -> Iterator[Statements]:
+    '''
+    Lazily yield (company, income statement, balance sheet) from a long-format source. Only the current chunk and the
+    rows of the company being assembled are held in memory, so the rows of a company must be contiguous (sorted or
+    grouped by company; SQLite sources are ordered on read). Rows that are not contiguous raise a ValueError when the
+    company reappears within the same chunk or right after the company that follows it; as only the previous company
+    is remembered across chunks, a company reappearing further down the source is not detected.
+    :param source: .csv, .parquet or SQLite file with columns company, date, statement ('income'/'balance'),
+                   component (labels as in INCOME_COMPONENTS/BALANCE_COMPONENTS) and value
+    :param chunksize: rows read per chunk
+    :param table: table to read from when the source is SQLite
+    :param compact: yield CompactIncomeStatement/CompactBalanceSheet instead of the dataclasses; FinancialStatement and
+                    the batch and streaming valuations take either
+    '''
+    previous: Optional[str] = None
+    pending: pd.DataFrame = pd.DataFrame(columns=COLUMNS)
+    for chunk in read_long_chunks(source,chunksize,table):
+        chunk = pd.concat([pending,chunk],ignore_index=True) if len(pending) else chunk
+        if not len(chunk):
+            continue
+        # Runs of rows of the same company; a company with more than one run is not contiguous
+        company: np.ndarray = chunk["company"].values
+        starts: np.ndarray = np.r_[0,np.flatnonzero(company[1:] != company[:-1]) + 1,len(company)]
+        runs: pd.Index = pd.Index(company[starts[:-1]])
+        split: pd.Index = runs[runs.duplicated() | (runs == previous)]
+        if len(split):
+            raise ValueError(f"Rows of company {split[0]} are not contiguous in {source}")
+        # The last company of a chunk may continue in the next one
+        for i, comp in enumerate(runs[:-1]):
+            yield _statements(comp,chunk.iloc[starts[i]:starts[i+1]],compact)
+            previous = comp
+        pending = chunk.iloc[starts[-2]:]
+    if len(pending):
+        yield _statements(pending["company"].iloc[0],pending,compact)
@@ -2,11 +2,22 @@ from finModel.statements.forecast import is_forecast_avg_growth, bs_forecast_avg
 from finModel.statements.income import IncomeStatement
 from finModel.statements.balance import BalanceSheet
 from finModel.statements.cashflow import CashFlowStatement
+from finModel.statements.compact import CompactIncomeStatement, CompactBalanceSheet
+from finModel.statements.strategy import ForecastPlan
+from finModel.statements.projection import DriverStats, driver_stats
 from dataclasses import dataclass, field
-from typing import List, Union
+from typing import List, Union, Optional
 import pandas as pd
 import numpy as np
 
+
+def _timeline(statement):
+    '''
+    Expand a compact statement into its dataclass, which holds the actual + forecast timeline
+    '''
+    return statement.to_statement() if isinstance(statement,(CompactIncomeStatement,CompactBalanceSheet)) else statement
+
+
 @dataclass
 class FinancialStatement:
     company: str
@@ -15,13 +26,67 @@ class FinancialStatement:
     income: IncomeStatement = field(init=False)
     balance: BalanceSheet = field(init=False)
     cash: CashFlowStatement = field(init=False)
+    trend: Optional[str] = None
+    plan: Optional[ForecastPlan] = None
 
-    def __init__(self, comp:str, a_date:List[str], f_date:List[str], inc:IncomeStatement, bs:BalanceSheet):
+    def __init__(self, comp:str, a_date:List[str], f_date:List[str], inc:Union[IncomeStatement,CompactIncomeStatement],
+                 bs:Union[BalanceSheet,CompactBalanceSheet], trend:Optional[str]=None, plan:Optional[ForecastPlan]=None):
+        if trend is not None and plan is not None:
+            raise ValueError("Pass either trend or plan, not both; for a sales trend within a plan use Trend(...)")
         self.company = comp
+        self.trend = trend
+        self.plan = plan
         self.actual_dates = pd.to_datetime(a_date).values
         self.forecast_dates = pd.to_datetime(f_date).values
-        f_inc = is_forecast_avg_growth(inc,f_date)
-        f_bs = bs_forecast_avg_growth(bs,inc,f_inc,f_date)
-        self.income = inc.attach(f_inc)
-        self.balance = bs.attach(f_bs)
-        self.cash = CashFlowStatement(self.income,self.balance)
\ No newline at end of file
+        # Allocate the full actual + forecast timeline once; the forecasts are written into it in place
+        self.income = _timeline(inc).extend(self.forecast_dates)
+        self.balance = _timeline(bs).extend(self.forecast_dates)
+        self.forecast()
+
+    def forecast(self) -> None:
+        '''
+        (Re-)forecast the forecast dates from the actual dates and rebuild the cash flow statement
+        '''
+        a_inc: IncomeStatement = self.income.select(self.actual_dates)
+        a_bs: BalanceSheet = self.balance.select(self.actual_dates)
+        if self.plan is not None:
+            f_inc, f_bs = self.plan.forecast(a_inc,a_bs,self.forecast_dates)
+        else:
+            stats: DriverStats = driver_stats(a_inc,a_bs)
+            f_inc = is_forecast_avg_growth(a_inc,self.forecast_dates,self.trend,stats)
+            f_bs = bs_forecast_avg_growth(a_bs,a_inc,f_inc,self.forecast_dates,stats)
+        self.income.write(f_inc)
+        self.balance.write(f_bs)
+        self.cash = CashFlowStatement(self.income,self.balance)
+
+    def update_actuals(self, inc:Union[IncomeStatement,CompactIncomeStatement], bs:Union[BalanceSheet,CompactBalanceSheet],
+                       f_date:Optional[List[str]]=None) -> None:
+        '''
+        Roll the model forward with newly reported actuals. Only dates after the last actual are forecast; forecast
+        periods that now fall before it without actuals of their own are dropped from the timeline. Periods already on
+        the timeline are overwritten in place; the timeline is only re-allocated when dates are added or dropped.
+        :param inc: income statement of the new actual periods, full or compact
+        :param bs: balance sheet of the new actual periods, full or compact
+        :param f_date: dates to forecast from now on, all after the new actuals; defaults to the current forecast
+                       dates after the last actual
+        '''
+        inc, bs = _timeline(inc), _timeline(bs)
+        actual_dates: np.ndarray = np.union1d(self.actual_dates,inc.dates().values)
+        last: np.datetime64 = actual_dates.max()
+        if f_date is None:
+            forecast_dates: np.ndarray = self.forecast_dates[self.forecast_dates > last]
+        else:
+            forecast_dates = pd.to_datetime(f_date).values
+            if (forecast_dates <= last).any():
+                raise ValueError("Forecast dates must all come after the last actual date")
+        if not len(forecast_dates):
+            raise ValueError(f"No forecast dates left after the last actual ({pd.Timestamp(last).date()}); pass f_date")
+        timeline: np.ndarray = np.union1d(actual_dates,forecast_dates)
+        if not np.array_equal(timeline,self.income.dates().values):
+            self.income = self.income.extend(timeline).select(timeline)
+            self.balance = self.balance.extend(timeline).select(timeline)
+        self.income.write(inc)
+        self.balance.write(bs)
+        self.actual_dates = actual_dates
+        self.forecast_dates = forecast_dates
+        self.forecast()
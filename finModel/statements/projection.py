@@ -0,0 +1,239 @@
+"""
+PURPOSE: Array form of the avg. growth forecast -> cash flow chain. Every driver and anchor may carry any leading
+shape (paths, scenarios, companies); periods always sit on the last axis. The formulas mirror is_forecast_avg_growth(),
+bs_forecast_avg_growth() and CashFlowStatement so that point estimates reproduce the object path. The historical driver
+statistics both paths start from are computed once per set of actuals (driver_stats()).
+"""
+
+from finModel.statements.income import IncomeStatement
+from finModel.statements.balance import BalanceSheet
+from dataclasses import dataclass
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Tuple, Callable, Optional
+import pandas as pd
+import numpy as np
+
+
+# Drivers of the avg. growth methodology and the anchors (last actual values) the projection starts from
+DRIVERS = ("growth", "cogs_shr", "opex_shr", "d_and_a_shr", "tax_rate", "ppe_shr", "other_asset_shr",
+           "other_liability_shr", "dio", "dso", "dpo")
+ANCHORS = ("sales", "other_revenue", "int_expense", "financial_liability", "ppe", "inventory", "trade_receivable",
+           "trade_payable", "other_asset", "other_liability", "cash")
+
+
+# Ratios averaged over the actuals by the avg. growth forecast, as (driver, needs the balance sheet, numerator,
+# denominator); days outstanding are scaled by the days in the period. The three other liability items are also kept
+# apart (as bs_forecast_avg_growth() forecasts them) next to the other_liability_shr driver of the projection, whose
+# point estimate is the sum of their means (see OTHER_LIABILITY_ITEMS).
+RATIOS: Tuple[Tuple[str,bool,Callable,Callable],...] = (
+    ("cogs_shr", False, lambda inc,bs: inc.cogs.cogs, lambda inc,bs: inc.revenue.sales),
+    ("opex_shr", False, lambda inc,bs: inc.opex.opex, lambda inc,bs: inc.revenue.sales),
+    ("d_and_a_shr", False, lambda inc,bs: inc.d_and_a, lambda inc,bs: inc.revenue.sales),
+    ("tax_rate", False, lambda inc,bs: inc.tax, lambda inc,bs: inc.ebt),
+    ("ppe_shr", True, lambda inc,bs: bs.ppe, lambda inc,bs: inc.revenue.sales),
+    ("other_asset_shr", True, lambda inc,bs: bs.other_asset, lambda inc,bs: inc.revenue.sales),
+    ("other_liability_shr", True, lambda inc,bs: bs.other_liability.other_liability +
+     bs.other_liability.provision_for_retirement_benefit + bs.other_liability.deferred_taxes,
+     lambda inc,bs: inc.revenue.sales),
+    ("other_liability_item_shr", True, lambda inc,bs: bs.other_liability.other_liability,
+     lambda inc,bs: inc.revenue.sales),
+    ("retirement_benefit_shr", True, lambda inc,bs: bs.other_liability.provision_for_retirement_benefit,
+     lambda inc,bs: inc.revenue.sales),
+    ("deferred_taxes_shr", True, lambda inc,bs: bs.other_liability.deferred_taxes, lambda inc,bs: inc.revenue.sales),
+    ("dio", True, lambda inc,bs: bs.inventory, lambda inc,bs: inc.cogs.cogs),
+    ("dso", True, lambda inc,bs: bs.trade_receivable, lambda inc,bs: inc.revenue.sales),
+    ("dpo", True, lambda inc,bs: bs.trade_payable, lambda inc,bs: inc.cogs.cogs),
+)
+DAYS = ("dio", "dso", "dpo")
+OTHER_LIABILITY_ITEMS = ("other_liability_item_shr", "retirement_benefit_shr", "deferred_taxes_shr")
+
+# Sets of actuals whose statistics driver_stats() keeps, least recently used first out
+STATS_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class DriverStats:
+    '''
+    Historical statistics of one set of actuals: the period-by-period observations of every driver (history) and the
+    point estimates the avg. growth forecast uses (point). Instances are shared through the driver_stats() memo, so
+    the arrays are read-only.
+    '''
+    history: Dict[str,np.ndarray]
+    point: Dict[str,float]
+
+    @property
+    def drivers(self) -> Dict[str,float]:
+        '''
+        Point estimates of the projection drivers (see DRIVERS)
+        '''
+        return {k: self.point[k] for k in DRIVERS}
+
+
+def _compute_stats(inc: IncomeStatement, bs: Optional[BalanceSheet], f: int) -> DriverStats:
+    rows = [r for r in RATIOS if bs is not None or not r[1]]
+    num: np.ndarray = np.vstack([np.asarray(r[2](inc,bs),dtype=float) for r in rows])
+    den: np.ndarray = np.vstack([np.asarray(r[3](inc,bs),dtype=float) for r in rows])
+    days: np.ndarray = np.array([r[0] in DAYS for r in rows])
+    ratio: np.ndarray = num/den
+    ratio[days] *= f
+    # days outstanding are averaged with np.mean (not nanmean) in bs_forecast_avg_growth()
+    mean: np.ndarray = np.where(days,np.mean(ratio,axis=-1),np.nanmean(ratio,axis=-1))
+    sales: np.ndarray = np.asarray(inc.revenue.sales,dtype=float)
+    growth: np.ndarray = sales[1:]/sales[:-1] - 1
+    ratio.setflags(write=False)
+    growth.setflags(write=False)
+    history: Dict[str,np.ndarray] = {"growth": growth, **{r[0]: ratio[i] for i,r in enumerate(rows)}}
+    point: Dict[str,float] = {"growth": float(np.nanmean(growth)), **{r[0]: float(mean[i]) for i,r in enumerate(rows)}}
+    if bs is not None:
+        # The items are forecast one by one, so the projection's total share is the sum of their means
+        point["other_liability_shr"] = sum(point[k] for k in OTHER_LIABILITY_ITEMS)
+    return DriverStats(history=history,point=point)
+
+
+_stats_cache: "OrderedDict[Tuple[str,Optional[str],int],DriverStats]" = OrderedDict()
+_stats_lock: Lock = Lock()
+
+
+def driver_stats(inc: IncomeStatement, bs: Optional[BalanceSheet] = None, f: int = 360) -> DriverStats:
+    '''
+    Driver statistics of a set of actuals, computed in one pass over all ratios and memoised on the content of the
+    statements, so that repeated forecasts, scenarios and simulations of the same actuals share them
+    :param inc: income statement (actuals)
+    :param bs: balance sheet (actuals) over the same dates; None gives the income statement drivers only
+    :param f: days in the period
+    '''
+    key: Tuple[str,Optional[str],int] = (inc.fingerprint(), None if bs is None else bs.fingerprint(), f)
+    with _stats_lock:
+        stats: Optional[DriverStats] = _stats_cache.get(key)
+        if stats is not None:
+            _stats_cache.move_to_end(key)
+            return stats
+    stats = _compute_stats(inc,bs,f)
+    with _stats_lock:
+        _stats_cache[key] = stats
+        while len(_stats_cache) > STATS_CACHE_SIZE:
+            _stats_cache.popitem(last=False)
+    return stats
+
+
+def clear_driver_stats() -> None:
+    '''
+    Empty the driver_stats() memo
+    '''
+    with _stats_lock:
+        _stats_cache.clear()
+
+
+def driver_history(inc: IncomeStatement, bs: BalanceSheet, f: int = 360) -> Dict[str,np.ndarray]:
+    '''
+    Period-by-period observations of each forecast driver over the actuals, i.e. the values that
+    is_forecast_avg_growth() and bs_forecast_avg_growth() average into point estimates.
+    :param inc: income statement (actuals)
+    :param bs: balance sheet (actuals)
+    :param f: days in the period
+    :return: one (read-only) array of observations per driver
+    '''
+    history: Dict[str,np.ndarray] = driver_stats(inc,bs,f).history
+    return {k: history[k] for k in DRIVERS}
+
+
+def point_drivers(history: Dict[str,np.ndarray]) -> Dict[str,float]:
+    '''
+    Collapse driver observations into the point estimates used by the avg. growth forecast
+    '''
+    # days outstanding are averaged with np.mean (not nanmean) in bs_forecast_avg_growth()
+    return {k: float(np.mean(v)) if k in DAYS else float(np.nanmean(v)) for k,v in history.items()}
+
+
+def anchors(inc: IncomeStatement, bs: BalanceSheet) -> Dict[str,float]:
+    '''
+    Last actual value of every line item the projection rolls forward from
+    '''
+    last: pd.Timestamp = inc.revenue.sales.index.max()
+    return {
+        "sales": inc.revenue.sales[last],
+        "other_revenue": inc.revenue.other_revenue[last],
+        "int_expense": inc.int_expense[last],
+        "financial_liability": bs.financial_liability.total[last],
+        "ppe": bs.ppe[last],
+        "inventory": bs.inventory[last],
+        "trade_receivable": bs.trade_receivable[last],
+        "trade_payable": bs.trade_payable[last],
+        "other_asset": bs.other_asset[last],
+        "other_liability": bs.other_liability.total[last],
+        "cash": bs.cash[last],
+    }
+
+
+def _movement(level: np.ndarray, start: np.ndarray) -> np.ndarray:
+    '''
+    Period-on-period change of forecasted levels, the first period being measured against the last actual
+    '''
+    start = np.broadcast_to(start,level.shape[:-1]+(1,))
+    return np.diff(np.concatenate([start,level],axis=-1),axis=-1)
+
+
+# Formulas of the forecast -> cash flow chain as (inputs, function) per line item, listed in evaluation order. Inputs are
+# drivers, anchors prefixed with "last_" (with a trailing period axis of length 1), "t" (1..n) and "f" (days).
+NODES: Dict[str,Tuple[Tuple[str,...],Callable]] = {
+    # Income statement
+    "sales": (("last_sales","growth","t"), lambda s,g,t: s * np.power(1+g,t)),
+    "tot_revenue": (("sales","last_other_revenue"), lambda s,o: s + o),
+    "cogs": (("sales","cogs_shr"), lambda s,x: s * x),
+    "gross_margin": (("tot_revenue","cogs"), lambda r,c: r + c),
+    "opex": (("sales","opex_shr"), lambda s,x: s * x),
+    "ebitda": (("gross_margin","opex"), lambda m,o: m + o),
+    "d_and_a": (("sales","d_and_a_shr"), lambda s,x: s * x),
+    "ebit": (("ebitda","d_and_a"), lambda e,d: e + d),
+    "ebt": (("ebit","last_int_expense"), lambda e,i: e + i),
+    "tax": (("ebt","tax_rate"), lambda e,r: r * e),
+    "net_income": (("ebt","tax"), lambda e,t: e + t),
+    # Balance sheet (working capital and other items as shares/days of the forecasted revenue & cogs)
+    "ppe": (("sales","ppe_shr"), lambda s,x: s * x),
+    "inventory": (("cogs","dio","f"), lambda c,d,f: c * d / f),
+    "trade_receivable": (("sales","dso","f"), lambda s,d,f: s * d / f),
+    "trade_payable": (("cogs","dpo","f"), lambda c,d,f: c * d / f),
+    "other_asset": (("sales","other_asset_shr"), lambda s,x: s * x),
+    "other_liability": (("sales","other_liability_shr"), lambda s,x: s * x),
+    # Cash flow statement; intangible and financial assets are held flat so other investments are nil
+    "operating_tax": (("ebit","tax_rate"), lambda e,r: r * e),
+    "nopat": (("ebit","operating_tax"), lambda e,t: e + t),
+    "gross_cf": (("nopat","d_and_a"), lambda n,d: n - d),
+    "investment_in_working_capital": (
+        ("inventory","last_inventory","trade_receivable","last_trade_receivable","trade_payable","last_trade_payable"),
+        lambda i,i0,r,r0,p,p0: -_movement(i,i0) - _movement(r,r0) + _movement(p,p0)),
+    "investment_in_other_asset_and_liability": (
+        ("other_asset","last_other_asset","other_liability","last_other_liability"),
+        lambda a,a0,l,l0: -_movement(a,a0) + _movement(l,l0)),
+    "capex_movement": (("ppe","last_ppe","d_and_a"), lambda p,p0,d: -_movement(p,p0) + d),
+    "ufcf": (("gross_cf","investment_in_working_capital","investment_in_other_asset_and_liability","capex_movement"),
+             lambda g,w,o,c: g + w + o + c),
+}
+
+
+def chain_inputs(anchor: Dict[str,np.ndarray], drivers: Dict[str,np.ndarray], n: int,
+                 f: int = 360) -> Dict[str,np.ndarray]:
+    '''
+    Arrange anchors and drivers as the inputs referenced by NODES, adding a trailing period axis
+    '''
+    inputs: Dict[str,np.ndarray] = {f"last_{k}": np.asarray(v)[...,np.newaxis] for k,v in anchor.items()}
+    inputs.update({k: np.asarray(v)[...,np.newaxis] for k,v in drivers.items()})
+    inputs.update({"t": np.arange(1,n+1), "f": f})
+    return inputs
+
+
+def project(anchor: Dict[str,np.ndarray], drivers: Dict[str,np.ndarray], n: int,
+            f: int = 360) -> Dict[str,np.ndarray]:
+    '''
+    Project income, balance sheet and unlevered cash flows for n periods as batched arrays
+    :param anchor: last actual values (see anchors())
+    :param drivers: driver values, each broadcastable against the other inputs (see DRIVERS)
+    :param n: number of forecast periods
+    :param f: days in the period
+    :return: forecasted line items of shape (..., n)
+    '''
+    env: Dict[str,np.ndarray] = chain_inputs(anchor,drivers,n,f)
+    for name,(deps,fn) in NODES.items():
+        env[name] = fn(*[env[d] for d in deps])
+    return {name: env[name] for name in NODES}
@@ -0,0 +1,306 @@
+"""
+PURPOSE: Pluggable forecast methodologies. A plan maps every input line item to a rule (constant growth, share of a
+driver, days outstanding, trend, hold flat, ...) and is compiled once into vectorised steps: all items that share a
+rule type and a dependency level are fitted and projected together, for any number of companies/scenarios stacked on
+the leading axes. DEFAULT_PLAN reproduces is_forecast_avg_growth() and bs_forecast_avg_growth().
+"""
+
+from finModel.statements.income import IncomeStatement
+from finModel.statements.balance import BalanceSheet
+from finModel.statements.compact import CompactIncomeStatement, CompactBalanceSheet
+from finModel.utils.transform import trend_forecast
+from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional, Union
+import numpy as np
+
+
+# Line items a plan works on: the rows of the compact income statement followed by those of the compact balance sheet
+ITEMS: Tuple[str,...] = CompactIncomeStatement.ROWS + CompactBalanceSheet.ROWS
+INPUTS: Tuple[str,...] = CompactIncomeStatement.INPUTS + CompactBalanceSheet.INPUTS
+TOTALS: List[Tuple[str,Dict[str,float]]] = CompactIncomeStatement.TOTALS + CompactBalanceSheet.TOTALS
+POS: Dict[str,int] = {name: i for i,name in enumerate(ITEMS)}
+
+
+@dataclass(frozen=True)
+class ConstGrowth:
+    '''
+    Last actual grown at a constant rate; the average historical growth of the item unless rate is given
+    '''
+    rate: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class HoldFlat:
+    '''
+    Last actual carried forward
+    '''
+
+
+@dataclass(frozen=True)
+class Constant:
+    '''
+    Fixed value in every forecast period
+    '''
+    value: float = 0.0
+
+
+@dataclass(frozen=True)
+class ShareOf:
+    '''
+    Average historical share of basis (the item itself by default) in driver, applied to the forecasted driver
+    '''
+    driver: str
+    basis: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class DaysOutstanding:
+    '''
+    Average historical days outstanding of the item against driver, applied to the forecasted driver
+    '''
+    driver: str
+    f: int = 360
+
+
+@dataclass(frozen=True)
+class Trend:
+    '''
+    Least-squares trend of the item's history over the period number (see trend_forecast())
+    '''
+    method: str = "linear"
+    phi: float = 0.9
+
+
+@dataclass(frozen=True)
+class Accumulate:
+    '''
+    Last actual of start plus the cumulated forecast of flow (e.g. equity rolled forward with net income)
+    '''
+    start: str
+    flow: str
+
+
+Rule = Union[ConstGrowth,HoldFlat,Constant,ShareOf,DaysOutstanding,Trend,Accumulate]
+
+# Rule types by name, for plans written in configuration files
+RULES: Dict[str,type] = {"growth": ConstGrowth, "flat": HoldFlat, "constant": Constant, "share": ShareOf,
+                         "days": DaysOutstanding, "trend": Trend, "accumulate": Accumulate}
+
+DEFAULT_RULES: Dict[str,Rule] = {
+    # Income statement
+    "sales": ConstGrowth(),
+    "other_revenue": HoldFlat(),
+    "raw_material": Constant(),
+    "direct_cost": ShareOf("sales",basis="cogs"),
+    "cost_for_services": ShareOf("sales",basis="opex"),
+    "lease_cost": Constant(),
+    "other_opex": Constant(),
+    "d_and_a": ShareOf("sales"),
+    "int_expense": HoldFlat(),
+    "extraordinary_income": Constant(),
+    "tax": ShareOf("ebt"),
+    # Balance sheet
+    "intangible_asset": HoldFlat(),
+    "ppe": ShareOf("sales"),
+    "financial_asset": HoldFlat(),
+    "inventory": DaysOutstanding("cogs"),
+    "trade_receivable": DaysOutstanding("sales"),
+    "other_asset": ShareOf("sales"),
+    "trade_payable": DaysOutstanding("cogs"),
+    "bank_borrowing": HoldFlat(),
+    "other_financial_liability": HoldFlat(),
+    "other_liability": ShareOf("sales"),
+    "deferred_taxes": ShareOf("sales"),
+    "provision_for_retirement_benefit": ShareOf("sales"),
+    "share_capital": Constant(),
+    "reserve": Constant(),
+    "retained_earning": Constant(),
+    "net_annual_profit": Accumulate("total_equity","net_income"),
+}
+
+
+def _deps(rule: Rule) -> Tuple[str,...]:
+    if isinstance(rule,(ShareOf,DaysOutstanding)):
+        return (rule.driver,)
+    if isinstance(rule,Accumulate):
+        return (rule.flow,)
+    return ()
+
+
+@dataclass(frozen=True)
+class _Step:
+    '''
+    One vectorised operation: the same rule type applied to several items at once (kind None: subtotals)
+    '''
+    kind: Optional[type]
+    items: Tuple[str,...]
+    target: np.ndarray
+    source: np.ndarray = None
+    basis: np.ndarray = None
+    rules: Tuple[Rule,...] = ()
+    matrix: np.ndarray = None
+
+
+def history(inc: Union[IncomeStatement,CompactIncomeStatement],
+            bs: Union[BalanceSheet,CompactBalanceSheet]) -> np.ndarray:
+    '''
+    Stack the actuals of a company into the (ITEMS x periods) layout used by plans
+    '''
+    ci = inc if isinstance(inc,CompactIncomeStatement) else CompactIncomeStatement.from_statement(inc)
+    cb = bs if isinstance(bs,CompactBalanceSheet) else CompactBalanceSheet.from_statement(bs)
+    return np.vstack([ci.values,cb.values])
+
+
+class ForecastPlan:
+    '''
+    Compiled forecast methodology.
+
+        plan = ForecastPlan({**DEFAULT_RULES, "sales": Trend("log")})
+        params = plan.fit(hist)                 # hist: (..., len(ITEMS), periods of actuals)
+        fcst = plan.project(hist, 5, params)    # (..., len(ITEMS), 5)
+
+    Parameters are one array per item (e.g. the growth rate or share) and can be overridden before projecting; their
+    leading axes broadcast against those of the history, which is how scenarios are added.
+    '''
+
+    def __init__(self, rules: Dict[str,Rule] = None):
+        '''
+        :param rules: rule for each input line item; items left out keep their DEFAULT_RULES rule
+        '''
+        self.rules: Dict[str,Rule] = {**DEFAULT_RULES, **(rules or {})}
+        unknown: List[str] = [k for k in self.rules if k not in INPUTS]
+        if unknown:
+            raise KeyError(f"Not input line items: {unknown}")
+        self.steps: List[_Step] = self._compile()
+
+    def _compile(self) -> List[_Step]:
+        '''
+        Order items by dependency level and group them by rule type within each level
+        '''
+        deps: Dict[str,Tuple[str,...]] = {k: _deps(r) for k,r in self.rules.items()}
+        deps.update({name: tuple(parts) for name,parts in TOTALS})
+        level: Dict[str,int] = {}
+
+        def resolve(name: str, seen: Tuple[str,...] = ()) -> int:
+            if name in seen:
+                raise ValueError(f"Circular forecast rules: {' -> '.join(seen + (name,))}")
+            if name not in level:
+                level[name] = 1 + max([resolve(d,seen + (name,)) for d in deps[name]],default=-1)
+            return level[name]
+
+        for name in deps:
+            resolve(name)
+        steps: List[_Step] = []
+        totals: Dict[str,Dict[str,float]] = dict(TOTALS)
+        for lvl in sorted(set(level.values())):
+            names: List[str] = [n for n in ITEMS if level.get(n) == lvl]
+            # Trend items are also split by method/damping so that each step is a single trend_forecast() call
+            groups: Dict[Tuple,List[str]] = {}
+            for n in names:
+                if n in self.rules:
+                    rule: Rule = self.rules[n]
+                    groups.setdefault((type(rule),rule if isinstance(rule,Trend) else None),[]).append(n)
+            for (kind,_),members in groups.items():
+                items: Tuple[str,...] = tuple(members)
+                rules: Tuple[Rule,...] = tuple(self.rules[n] for n in items)
+                source = basis = None
+                if kind in (ShareOf,DaysOutstanding):
+                    source = np.array([POS[r.driver] for r in rules])
+                    basis = np.array([POS[getattr(r,"basis",None) or n] for n,r in zip(items,rules)])
+                elif kind is Accumulate:
+                    source = np.array([POS[r.flow] for r in rules])
+                    basis = np.array([POS[r.start] for r in rules])
+                steps.append(_Step(kind,items,np.array([POS[n] for n in items]),source,basis,rules))
+            subtotals: List[str] = [n for n in names if n in totals]
+            if subtotals:
+                # Coefficients over the components only; items not yet projected (NaN) must stay out of the product
+                parts: List[str] = sorted({p for n in subtotals for p in totals[n]},key=POS.get)
+                matrix: np.ndarray = np.array([[totals[n].get(p,0.0) for p in parts] for n in subtotals])
+                steps.append(_Step(None,tuple(subtotals),np.array([POS[n] for n in subtotals]),
+                                   source=np.array([POS[p] for p in parts]),matrix=matrix))
+        return steps
+
+    def fit(self, hist: np.ndarray) -> Dict[str,np.ndarray]:
+        '''
+        Estimate the parameter of every rule from the actuals, all items of a step at once
+        :param hist: actuals of shape (..., len(ITEMS), periods)
+        :return: parameter per item with the leading shape of hist
+        '''
+        params: Dict[str,np.ndarray] = {}
+        with np.errstate(divide="ignore",invalid="ignore"):
+            for step in self.steps:
+                if step.kind is ConstGrowth:
+                    x: np.ndarray = hist[...,step.target,:]
+                    fitted = np.nanmean(x[...,1:]/x[...,:-1]-1,axis=-1)
+                    fixed = np.array([np.nan if r.rate is None else r.rate for r in step.rules])
+                    value = np.where(np.isnan(fixed),fitted,fixed)
+                elif step.kind is HoldFlat:
+                    value = np.zeros(hist.shape[:-2]+(len(step.items),))
+                elif step.kind is Constant:
+                    value = np.broadcast_to(np.array([r.value for r in step.rules]),
+                                            hist.shape[:-2]+(len(step.items),))
+                elif step.kind is ShareOf:
+                    value = np.nanmean(hist[...,step.basis,:]/hist[...,step.source,:],axis=-1)
+                elif step.kind is DaysOutstanding:
+                    f: np.ndarray = np.array([r.f for r in step.rules])[:,np.newaxis]
+                    value = np.mean(f*hist[...,step.basis,:]/hist[...,step.source,:],axis=-1)
+                else:
+                    continue
+                params.update({name: value[...,i] for i,name in enumerate(step.items)})
+        return params
+
+    def project(self, hist: np.ndarray, n: int, params: Dict[str,np.ndarray] = None) -> np.ndarray:
+        '''
+        Project every line item for n periods
+        :param hist: actuals of shape (..., len(ITEMS), periods)
+        :param n: number of forecast periods
+        :param params: rule parameters (see fit()); fitted from hist when not given
+        :return: forecasts of shape (..., len(ITEMS), n); leading axes broadcast between hist and params
+        '''
+        params = self.fit(hist) if params is None else params
+        lead: Tuple[int,...] = np.broadcast_shapes(hist.shape[:-2],*[np.shape(v) for v in params.values()])
+        out: np.ndarray = np.full(lead+(len(ITEMS),n),np.nan)
+        t: np.ndarray = np.arange(1,n+1)
+        last: np.ndarray = hist[...,-1:]
+        for step in self.steps:
+            # Parameters of the items of a step may carry different scenario axes
+            p = np.stack(np.broadcast_arrays(*[np.asarray(params[k],dtype=float) for k in step.items]),
+                         axis=-1)[...,np.newaxis] \
+                if step.kind in (ConstGrowth,HoldFlat,Constant,ShareOf,DaysOutstanding) else None
+            if step.kind in (ConstGrowth,HoldFlat):
+                value = last[...,step.target,:] * np.power(1+p,t)
+            elif step.kind is Constant:
+                value = np.broadcast_to(p,p.shape[:-1]+(n,))
+            elif step.kind is ShareOf:
+                value = out[...,step.source,:] * p
+            elif step.kind is DaysOutstanding:
+                value = out[...,step.source,:] * p / np.array([r.f for r in step.rules])[:,np.newaxis]
+            elif step.kind is Trend:
+                h: int = hist.shape[-1]
+                value = trend_forecast(hist[...,step.target,:],np.arange(1,h+1),np.arange(h+1,h+n+1),
+                                       step.rules[0].method,step.rules[0].phi)
+            elif step.kind is Accumulate:
+                value = last[...,step.basis,:] + np.cumsum(out[...,step.source,:],axis=-1)
+            else:
+                value = np.einsum("kj,...jt->...kt",step.matrix,out[...,step.source,:])
+            out[...,step.target,:] = value
+        with np.errstate(divide="ignore",invalid="ignore"):
+            out[...,POS["tax_rate"],:] = out[...,POS["tax"],:] / out[...,POS["ebt"],:]
+        return out
+
+    def forecast(self, inc: Union[IncomeStatement,CompactIncomeStatement],
+                 bs: Union[BalanceSheet,CompactBalanceSheet], f_date: List[str]) -> Tuple[IncomeStatement,BalanceSheet]:
+        '''
+        Forecast a single company and return the forecasted statements
+        :param inc: income statement (actuals)
+        :param bs: balance sheet (actuals)
+        :param f_date: dates to be forecasted
+        '''
+        out: np.ndarray = self.project(history(inc,bs),len(f_date))
+        ni: int = len(CompactIncomeStatement.ROWS)
+        f_inc = CompactIncomeStatement(out[CompactIncomeStatement._input_idx],f_date)
+        f_bs = CompactBalanceSheet(out[ni + CompactBalanceSheet._input_idx],f_date)
+        return f_inc.to_statement(), f_bs.to_statement()
+
+
+DEFAULT_PLAN: ForecastPlan = ForecastPlan()
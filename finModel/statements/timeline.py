@@ -0,0 +1,146 @@
+"""
+PURPOSE: Shared date-axis handling for the statement dataclasses. A statement is extended once to the full
+actual + forecast timeline; forecasts and newly reported actuals are then written into it in place.
+"""
+
+from dataclasses import fields
+from functools import cached_property, lru_cache
+from typing import Iterator, Tuple, Union, List, TypeVar
+import pandas as pd
+import numpy as np
+import itertools
+import hashlib
+
+
+T = TypeVar("T", bound="Timeline")
+
+# Process-wide, so that a version stamp is never reused by another statement
+_STAMPS = itertools.count()
+
+
+@lru_cache(maxsize=None)
+def _derived(cls: type) -> Tuple[str, ...]:
+    '''
+    Names of the lazily computed (cached_property) subtotals of a statement class
+    '''
+    return tuple(name for klass in cls.__mro__ for name, val in vars(klass).items() if isinstance(val, cached_property))
+
+
+class Timeline:
+    '''
+    Mixin for statement dataclasses whose fields are pd.Series over one shared date index or nested statements.
+    Subtotals are cached properties: only the line items are reindexed, taken or written, and the subtotals are computed
+    from them on first access.
+    '''
+
+    def _items(self) -> Iterator[Tuple[str, Union[pd.Series,"Timeline"]]]:
+        for f in fields(self):
+            yield f.name, getattr(self, f.name)
+
+    def dates(self) -> pd.DatetimeIndex:
+        '''
+        Date index shared by the line items
+        '''
+        for _, val in self._items():
+            return val.dates() if isinstance(val, Timeline) else pd.DatetimeIndex(val.index)
+
+    def fingerprint(self) -> str:
+        '''
+        Content hash of the dates and line items; changes whenever a line item does
+        '''
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.dates().asi8.tobytes())
+        self._digest(digest)
+        return digest.hexdigest()
+
+    def version(self) -> Tuple[int, ...]:
+        '''
+        Version stamps of the statement and its nested statements; a stamp is renewed whenever the subtotals are reset,
+        i.e. on every write(). Unlike fingerprint() this does not read the line items, but it does not see line items
+        changed in place without write().
+        '''
+        stamp: int = self.__dict__.get("_stamp")
+        if stamp is None:
+            stamp = self.__dict__["_stamp"] = next(_STAMPS)
+        return (stamp,) + tuple(s for _, val in self._items() if isinstance(val, Timeline) for s in val.version())
+
+    def __getstate__(self) -> dict:
+        # Stamps are only unique within a process
+        state: dict = self.__dict__.copy()
+        state.pop("_stamp", None)
+        return state
+
+    def _digest(self, digest) -> None:
+        for _, val in self._items():
+            if isinstance(val, Timeline):
+                val._digest(digest)
+            else:
+                digest.update(np.ascontiguousarray(val.values, dtype=float).tobytes())
+
+    def _reindexed(self: T, index: pd.DatetimeIndex) -> T:
+        out: T = object.__new__(type(self))
+        for name, val in self._items():
+            setattr(out, name, val._reindexed(index) if isinstance(val, Timeline) else val.reindex(index))
+        return out
+
+    def _taken(self: T, pos: np.ndarray) -> T:
+        out: T = object.__new__(type(self))
+        for name, val in self._items():
+            setattr(out, name, val._taken(pos) if isinstance(val, Timeline) else val.iloc[pos])
+        return out
+
+    def _write_at(self, pos: np.ndarray, other: "Timeline") -> None:
+        for name, val in self._items():
+            src = getattr(other, name)
+            if isinstance(val, Timeline):
+                val._write_at(pos, src)
+            else:
+                val.iloc[pos] = np.asarray(src, dtype=float)
+        self.reset()
+
+    def reset(self) -> None:
+        '''
+        Drop the memoised subtotals (including overridden ones) so that they are recomputed from the line items
+        '''
+        for name in _derived(type(self)):
+            self.__dict__.pop(name, None)
+        self.__dict__["_stamp"] = next(_STAMPS)
+
+    def extend(self: T, dates: Union[List[str], np.ndarray, pd.DatetimeIndex]) -> T:
+        '''
+        Copy of the statement over the union of its own dates and the given ones; the new periods hold NaN until written
+        :param dates: dates to add (e.g. the forecast dates)
+        :return: statement over the full timeline
+        '''
+        # Unnamed, as the concatenation of actuals and (unnamed) forecasts always was
+        index: pd.DatetimeIndex = self.dates().union(pd.DatetimeIndex(dates)).rename(None)
+        return self._reindexed(index)
+
+    def select(self: T, dates: Union[List[str], np.ndarray, pd.DatetimeIndex]) -> T:
+        '''
+        Copy of the statement restricted to the given dates
+        '''
+        return self._taken(self._positions(dates))
+
+    def write(self, other: "Timeline") -> None:
+        '''
+        Write the line items of other into the matching periods of this statement, in place; the subtotals are reset. The cost is
+        proportional to the number of periods written, not to the length of the timeline.
+        :param other: statement of the same type whose dates are all part of this statement's timeline
+        '''
+        self._write_at(self._positions(other.dates()), other)
+
+    def attach(self: T, other: T) -> T:
+        '''
+        Join the periods of another statement (e.g. the forecasts) after the current ones
+        '''
+        out: T = self.extend(other.dates())
+        out.write(other)
+        return out
+
+    def _positions(self, dates: Union[List[str], np.ndarray, pd.DatetimeIndex]) -> np.ndarray:
+        wanted: pd.DatetimeIndex = pd.DatetimeIndex(dates)
+        pos: np.ndarray = self.dates().get_indexer(wanted)
+        if (pos < 0).any():
+            raise KeyError(f"Dates not on the statement's timeline: {list(wanted[pos < 0].date)}")
+        return pos
@@ -3,40 +3,66 @@ Houses all the assumption functions and transformations we are going to use for
 various financial statements.
 '''
 
-import statsmodels.formula.api as smf
-from typing import List, Hashable
+from typing import List, Hashable, Union, Tuple
 import pandas as pd
 import numpy as np
 
 
-def add_movement(on:pd.Series,movement:pd.Series) -> pd.Series:
+# Level inputs are either a single series indexed on dates or a 2-D block of rows (companies/paths) x periods, the
+# periods running along the last axis. Rates and shares are scalars or one value per row.
+Levels = Union[pd.Series,pd.DataFrame,np.ndarray]
+
+
+def _per_row(x) -> np.ndarray:
+    '''
+    Lift a scalar or one-value-per-row rate so that it broadcasts along the period axis
+    '''
+    return np.asarray(x,dtype=float)[...,np.newaxis]
+
+
+def _wrap(values: np.ndarray, like: Levels, f_dates: np.ndarray, name: Hashable = None) -> Levels:
+    '''
+    Return forecasts in the container type of the input: series/data-frame over f_dates or a plain array
+    '''
+    if isinstance(like,pd.Series):
+        return pd.Series(values,index=np.array(f_dates,dtype='datetime64'),name=name)
+    if isinstance(like,pd.DataFrame):
+        return pd.DataFrame(values,index=like.index,columns=np.array(f_dates,dtype='datetime64'))
+    return values
+
+
+def add_movement(on:Levels,movement:Levels) -> Levels:
     '''
     Add the current year movement to beginning-of-the-period position and get back the new positions
-    :param on: series that contains the beginning position
-    :param movement: movements of each period
+    :param on: series that contains the beginning position (or rows x periods, the last period being the start)
+    :param movement: movements of each period (or rows x forecast periods)
     :return: closing position
     '''
-    last_date_actuals: np.datetime64 = on.index.max()
-    start_pos: float = on[last_date_actuals]
-    ser_with_start: pd.Series = pd.Series(start_pos).append(movement[movement.index > last_date_actuals])
-    return ser_with_start.cumsum()[1:]
+    if isinstance(on,pd.Series):
+        last_date_actuals: np.datetime64 = on.index.max()
+        return on[last_date_actuals] + movement[movement.index > last_date_actuals].cumsum()
+    return np.asarray(on,dtype=float)[...,-1:] + np.cumsum(np.asarray(movement,dtype=float),axis=-1)
 
 
-def days_outstanding(num:pd.Series,den:pd.Series,f:int=360) -> np.ndarray:
+def days_outstanding(num:Levels,den:Levels,f:int=360) -> np.ndarray:
     '''
     Generate the DSO/DIO/DPO metrics as an annualised %
     :param num: trade receivable/payables or inventory
     :param den: revenues
     :param f: days in the period
     '''
-    return np.array([f*(num[idx]/den[idx]) for idx in num.index],dtype=float)
+    if isinstance(num,pd.Series):
+        return f*(num.values/pd.Series(den).reindex(num.index).values).astype(float)
+    return f*np.asarray(num,dtype=float)/np.asarray(den,dtype=float)
 
 
-def mean_g(ser: pd.Series) -> np.float:
+def mean_g(ser: Levels) -> Union[float,np.ndarray]:
     '''
-    Calculate average of period-on-period growth rates when provided with level values.
+    Calculate average of period-on-period growth rates when provided with level values (one average per row for 2-D
+    inputs).
     '''
-    mean = np.nanmean((ser/ser.shift(1))-1)
+    values: np.ndarray = np.asarray(ser,dtype=float)
+    mean = np.nanmean(values[...,1:]/values[...,:-1]-1,axis=-1)
     return mean
 
 
@@ -51,52 +77,94 @@ def const_pandas_series(name: Hashable, f_dates: np.ndarray, const:np.ndarray=np
     return pd.Series(np.repeat(const,len(f_dates)),index=np.array(f_dates,dtype="datetime64"),name=str(name))
 
 
-def const_growth(ser: pd.Series, g: float, f_dates: np.ndarray) -> pd.Series:
+def const_growth(ser: Levels, g: Union[float,np.ndarray], f_dates: np.ndarray) -> Levels:
     '''
     Project the most recent value of the series based on a constant growth rate
-    :param ser: series to project
-    :param g: growth-rate to use
+    :param ser: series to project (or rows x periods, the last period being the most recent)
+    :param g: growth-rate to use (scalar or one per row)
     :param f_dates: dates to forecast upon
     :return: forecasted values
     '''
-    factor: List[float] = [np.power(1+g,1+idx) for idx in np.arange(0,len(f_dates))]
-    recent_val: float = ser[np.max(ser.index)]
-    forecast: pd.Series = pd.Series(data=[recent_val*f for f in factor],
-                                    index=np.array(f_dates,dtype='datetime64'),
-                                    name=ser.name)
-    return forecast
+    factor: np.ndarray = np.power(1+_per_row(g),np.arange(1,len(f_dates)+1))
+    if isinstance(ser,pd.Series):
+        recent_val: float = ser[np.max(ser.index)]
+        return _wrap(recent_val*factor,ser,f_dates,ser.name)
+    return _wrap(np.asarray(ser,dtype=float)[...,-1:]*factor,ser,f_dates)
 
 
-def const_share(fcast: pd.Series, shr: np.ndarray, f_dates: np.ndarray) -> pd.Series:
+def const_share(fcast: Levels, shr: Union[float,np.ndarray], f_dates: np.ndarray) -> Levels:
     '''
     Project a series based on a constant share of a already forecasted series
-    :param fcast: forecasted series
-    :param g: percentage-share
+    :param fcast: forecasted series (or rows x forecast periods)
+    :param shr: percentage-share (scalar or one per row)
     :param f_dates: dates to forecast upon
     :return: forecasted shares
     '''
-    forecast_shr: pd.Series = pd.Series(data=[f*shr for f in fcast],
-                                    index=np.array(f_dates,dtype='datetime64'),
-                                    name=fcast.name)
-    return forecast_shr
+    if isinstance(fcast,pd.Series):
+        return _wrap(fcast.values*np.asarray(shr,dtype=float),fcast,f_dates,fcast.name)
+    return _wrap(np.asarray(fcast,dtype=float)*_per_row(shr),fcast,f_dates)
 
 
-def linear_trend(ser: pd.Series, f_dates: np.ndarray) -> pd.Series:
+def trend_forecast(y: np.ndarray, x: np.ndarray, x_new: np.ndarray, method: str = "linear",
+                   phi: float = 0.9) -> np.ndarray:
+    '''
+    Closed-form least-squares trend for every row of y at once; missing observations are left out of each row's fit
+    :param y: history of shape (..., periods), e.g. (companies, line items, periods)
+    :param x: regressor of the history (e.g. days), broadcastable against y
+    :param x_new: regressor of the periods to forecast, shape (..., forecast periods) broadcastable against y
+    :param method: 'linear'; 'log' for a log-linear fit of the magnitude (the sign of the most recent observation is
+                   kept); 'damped' for a linear trend whose increments decay by phi per forecast period
+    :param phi: damping factor of the 'damped' method
+    :return: forecasts of shape (..., forecast periods)
+    '''
+    y = np.asarray(y,dtype=float)
+    x = np.broadcast_to(np.asarray(x,dtype=float),y.shape)
+    x_new = np.asarray(x_new,dtype=float)
+    if method == "log":
+        with np.errstate(divide="ignore"):
+            target: np.ndarray = np.log(np.abs(y))
+    elif method in ("linear","damped"):
+        target = y
+    else:
+        raise ValueError(f"Unknown trend method: {method}")
+
+    w: np.ndarray = np.isfinite(target)
+    t0: np.ndarray = np.where(w,target,0.0)
+    n: np.ndarray = w.sum(axis=-1,keepdims=True)
+    with np.errstate(invalid="ignore",divide="ignore"):
+        x_bar: np.ndarray = (w*x).sum(axis=-1,keepdims=True)/n
+        y_bar: np.ndarray = t0.sum(axis=-1,keepdims=True)/n
+        slope: np.ndarray = (w*(x-x_bar)*(t0-y_bar)).sum(axis=-1,keepdims=True) / \
+                            (w*(x-x_bar)**2).sum(axis=-1,keepdims=True)
+    intercept: np.ndarray = y_bar - slope*x_bar
+
+    if method == "damped":
+        x_last: np.ndarray = np.max(np.where(w,x,-np.inf),axis=-1,keepdims=True)
+        # Rows of the history and of x_new are broadcast against each other before the increments are taken
+        rows: Tuple[int,...] = np.broadcast_shapes(y.shape[:-1],x_new.shape[:-1])
+        steps: np.ndarray = np.diff(np.concatenate([np.broadcast_to(x_last,rows+(1,)),
+                                                    np.broadcast_to(x_new,rows+x_new.shape[-1:])],axis=-1),axis=-1)
+        damping: np.ndarray = np.power(phi,np.arange(1,steps.shape[-1]+1))
+        return intercept + slope*x_last + slope*np.cumsum(damping*steps,axis=-1)
+    fitted: np.ndarray = intercept + slope*x_new
+    if method == "log":
+        last_sign: np.ndarray = np.sign(np.take_along_axis(y,(w.shape[-1]-1-np.argmax(w[...,::-1],axis=-1))[...,None],
+                                                           axis=-1))
+        return last_sign*np.exp(fitted)
+    return fitted
+
+
+def linear_trend(ser: pd.Series, f_dates: np.ndarray, method: str = "linear", phi: float = 0.9) -> pd.Series:
     '''
-    Generate linear model forecasts of the series using OLS linear regression based on historical values provided
+    Generate trend forecasts of the series using OLS regression on days elapsed, based on historical values provided
     :param ser: series to fit model upon
     :param f_dates: dates to forecast upon
+    :param method: 'linear', 'log' or 'damped' (see trend_forecast())
+    :param phi: damping factor of the 'damped' method
     :return: forecasted values
     '''
-    train_df: pd.DataFrame = pd.DataFrame(ser)
-    min_date: np.datetime64 = train_df.index.min()
-    train_df['days'] = (train_df.index - min_date).days + 1
-    test_df: pd.DataFrame = pd.DataFrame({
-        ser.name: np.repeat(0.0,len(f_dates)),
-        'days': [(np.datetime64(date)-min_date).days + 1 for date in f_dates]
-    },index=np.array(f_dates,dtype="datetime64"))
-    model = smf.ols(f"{ser.name} ~ days",train_df).fit()
-    test_df[ser.name] = model.predict(test_df)
-    forecast: pd.Series = test_df[ser.name]
-
-    return forecast
\ No newline at end of file
+    min_date: np.datetime64 = ser.index.min()
+    days: np.ndarray = np.asarray((pd.DatetimeIndex(ser.index) - min_date).days + 1,dtype=float)
+    f_days: np.ndarray = np.asarray((pd.DatetimeIndex(f_dates) - min_date).days + 1,dtype=float)
+    forecast: np.ndarray = trend_forecast(ser.values,days,f_days,method,phi)
+    return pd.Series(forecast,index=np.array(f_dates,dtype="datetime64"),name=ser.name)
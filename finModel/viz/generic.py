@@ -1,7 +1,10 @@
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple, List
+from itertools import repeat
+from typing import Dict, Optional, Tuple, List, Mapping, Iterable
 import pandas as pd
 import numpy as np
+import os
+import re
 
 
 Colors: Dict[str,str] = {"cobalt blue": "#0047AB",
@@ -23,6 +26,23 @@ class ChartLabels:
     y2lab: Optional[str] = None
 
 
+def accounting_format(df:pd.DataFrame,pct_rows:List[str]) -> pd.DataFrame:
+    '''
+    Format a numeric table as strings in one pass over its values: accounting format (or % for pct_rows), zeros and
+    missing values as blanks and negative numbers in brackets
+    '''
+    values: np.ndarray = df.to_numpy(dtype=float)
+    pct: np.ndarray = np.broadcast_to(df.index.isin(pct_rows)[:,np.newaxis],values.shape).ravel()
+    magnitude: np.ndarray = np.abs(values).ravel()
+    text: np.ndarray = np.empty(values.size,dtype=object)
+    text[pct] = list(map('{:.2%}'.format,magnitude[pct]))
+    text[~pct] = list(map('{:,.0f}'.format,magnitude[~pct]))
+    text = text.reshape(values.shape)
+    text = np.where(values < 0,"(" + text + ")",text)
+    text = np.where((values == 0) | np.isnan(values),"",text)
+    return pd.DataFrame(text,index=df.index,columns=df.columns)
+
+
 def style_table(df:pd.DataFrame,bold_rows:List[str],pct_rows:List[str]) -> pd.DataFrame.style:
     '''
     This function will format the report tables using the below rules:
@@ -34,49 +54,92 @@ def style_table(df:pd.DataFrame,bold_rows:List[str],pct_rows:List[str]) -> pd.Da
     * All negative numbers in brackets
     * Black bold row totals
     '''
-    formatted = df.copy(deep=True)
-
-    # Apply accounting and percentage format
-    for r in df.index.tolist():
-        if r in pct_rows:
-            formatted.loc[r] = df.loc[r].apply('{:.2%}'.format)
-        else:
-            formatted.loc[r] = df.loc[r].apply('{:,.0f}'.format)
-
-    for r in df.index.tolist():
-        for c in df.columns:
-            # Treat zeroes/missing values as blank and negative no.s in ()
-            if df.loc[r,c]==0. or df.loc[r,c].astype(str)=="nan":
-                formatted.loc[r,c] = ""
-            # All negative numbers in brackets
-            if df.loc[r,c]<0:
-                formatted.loc[r,c] = f"({formatted.loc[r,c][1:]})"
-
-    # Black bold row totals
-    index_bold_row = pd.IndexSlice[[True if val in bold_rows else False for val in df.index],:]
-    formatted = formatted.reset_index().style.applymap(lambda x: "font-weight: bold", subset=index_bold_row)
-
-    # White background with gray share for forecast period
-    formatted = formatted.set_properties(**{'background-color': 'white'}).hide_index()
-    formatted = formatted.set_properties(**{'background-color': 'lightgray'},subset=formatted.columns.str.endswith("F"))
-    formatted = formatted.hide_index()
+    formatted: pd.DataFrame = accounting_format(df,pct_rows).reset_index()
+
+    # Black bold row totals and white background with gray shade for forecast period, set in a single styling pass
+    bold: np.ndarray = np.where(df.index.isin(bold_rows),"font-weight: bold; ","").astype(object)
+    gray: np.ndarray = np.where(formatted.columns.str.endswith("F"),"; background-color: lightgray","").astype(object)
+    css: pd.DataFrame = pd.DataFrame(bold[:,np.newaxis] + "background-color: white" + gray[np.newaxis,:],
+                                     index=formatted.index,columns=formatted.columns)
+    formatted = formatted.style.apply(lambda _: css,axis=None).hide_index()
 
     return formatted
 
 
+def statement_table(data:pd.DataFrame,f_date:np.ndarray) -> pd.DataFrame:
+    '''
+    Arrange a statement (dates x components) as components x periods labelled by year and A(ctual)/F(orecast)
+    '''
+    dates: pd.DatetimeIndex = pd.DatetimeIndex(data.index)
+    out: pd.DataFrame = data.T.copy()
+    out.columns = pd.Index(dates.year.astype(str) + np.where(dates.isin(f_date),"F","A"),name="index")
+    out.index.name = "component"
+    return out.sort_index(axis=1)
+
+
 def style_statement(data:pd.DataFrame,f_date:np.ndarray,bold_rows:List[str],
                     pct_rows:List[str]=["None"]) -> pd.DataFrame.style:
     '''
     Wrapper function to make the financial statements ready to be formatted using style_table()
     '''
-
-    order: pd.DataFrame = pd.DataFrame({'component': data.columns.values})
-    data['year'] = pd.DatetimeIndex(data.index).year
-    data['period_label'] = ['F' if date in f_date else 'A' for date in data.index]
-    data['index'] = [f"{round(data.year[idx],0)}{data.period_label[idx]}" for idx in data.index]
-    melted_data: pd.DataFrame = data.melt(id_vars=['year','period_label','index'],var_name='component')
-    pivoted_data: pd.DataFrame = melted_data.pivot(index='component',columns='index',values='value')
-    out: pd.DataFrame = pd.merge(left=order,right=pivoted_data,how="left",on="component").set_index("component")
-    formatted: pd.DataFrame.style = style_table(out,bold_rows,pct_rows)
+    formatted: pd.DataFrame.style = style_table(statement_table(data,f_date),bold_rows,pct_rows)
 
     return formatted
+
+
+def company_dir(comp:str) -> str:
+    '''
+    File or folder name of a company's exports: characters other than letters, digits, '.', '-' and '_' become '_' and
+    leading dots are dropped, so that no company name points outside out_dir
+    '''
+    slug: str = re.sub(r"[^\w.-]","_",str(comp)).lstrip(".")
+    if not slug:
+        raise ValueError(f"Company name {comp!r} gives no folder name")
+    return slug
+
+
+def check_company_dirs(companies:Iterable[str]) -> None:
+    '''
+    Raise a ValueError when company names map to the same company_dir(), as their exports would overwrite each other
+    '''
+    folders: Dict[str,List[str]] = {}
+    for comp in companies:
+        folders.setdefault(company_dir(comp),[]).append(comp)
+    clashes: List[List[str]] = [comps for comps in folders.values() if len(comps) > 1]
+    if clashes:
+        raise ValueError(f"Company names that share an export name: {clashes}")
+
+
+def _render_html(item:Tuple[str,pd.DataFrame],f_date:np.ndarray,bold_rows:List[str],pct_rows:List[str],
+                 out_dir:Optional[str]) -> Tuple[str,str]:
+    name, data = item
+    html: str = style_statement(data,f_date,bold_rows,pct_rows).to_html()
+    if out_dir is not None:
+        with open(os.path.join(out_dir,f"{company_dir(name)}.html"),"w") as f:
+            f.write(html)
+    return name, html
+
+
+def render_statements(statements:Mapping[str,pd.DataFrame],f_date:np.ndarray,bold_rows:List[str],
+                      pct_rows:List[str]=["None"],out_dir:Optional[str]=None,workers:int=1,
+                      chunk_size:int=20) -> Dict[str,str]:
+    '''
+    Render the statement tables of many companies (e.g. inc.to_pandas_df() per company) to HTML
+    :param statements: statement data-frames keyed by company
+    :param f_date: forecast dates
+    :param bold_rows: rows shown in bold
+    :param pct_rows: rows formatted as %
+    :param out_dir: also write each table to out_dir/<company>.html, the file named by company_dir()
+    :param workers: number of processes (1 renders in the current process)
+    :param chunk_size: tables sent to a worker at a time
+    :return: HTML keyed by company
+    '''
+    if out_dir is not None:
+        check_company_dirs(statements)
+        os.makedirs(out_dir,exist_ok=True)
+    args = (repeat(f_date),repeat(bold_rows),repeat(pct_rows),repeat(out_dir))
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return dict(pool.map(_render_html,statements.items(),*args,chunksize=chunk_size))
+    return dict(map(_render_html,statements.items(),*args))
@@ -1,12 +1,18 @@
-from finModel.viz.generic import ChartLabels, Colors
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-from typing import Tuple, List
+from finModel.viz.generic import ChartLabels, Colors, company_dir, check_company_dirs
+from itertools import repeat
+from typing import Tuple, List, Dict, Callable, Mapping, Iterable, Any, TYPE_CHECKING
 import pandas as pd
 import numpy as np
+import os
 
+# plotly is only imported by the functions that draw or export, so that importing the package stays cheap
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
-def plot_ebitda_revenue_ratio(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
+
+def plot_ebitda_revenue_ratio(data:pd.DataFrame,chart_ttl:str) -> "go.Figure":
+    from plotly.subplots import make_subplots
+    import plotly.graph_objects as go
     # assign labels to be used
     l_lbl: ChartLabels = ChartLabels(x="year",xlab="",y="Revenues",ylab="USD in thousands",
                                      grp="type",ttl="A: Revenues from sales and services")
@@ -27,7 +33,8 @@ def plot_ebitda_revenue_ratio(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
     return fig
 
 
-def plot_unlevered_cashflows(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
+def plot_unlevered_cashflows(data:pd.DataFrame,chart_ttl:str) -> "go.Figure":
+    import plotly.graph_objects as go
     lbl: ChartLabels = ChartLabels(x="year",xlab="",y="UFCF",y2="PV of UFCF",ylab="USD in thousands")
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=data[lbl.x], y=data[lbl.y2], fill='tozeroy', mode='none',hovertemplate='%{y:,.0f}<br>%{x}',
@@ -40,7 +47,8 @@ def plot_unlevered_cashflows(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
     return fig
 
 
-def plot_ebitda_component(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
+def plot_ebitda_component(data:pd.DataFrame,chart_ttl:str) -> "go.Figure":
+    import plotly.graph_objects as go
     fig = go.Figure()
     y_list: List[str] = ["Delta revenues","Delta COGS","Delta OPEX"]
     lbl: List[ChartLabels] = [ChartLabels(x="year",xlab="",y=y,ylab="USD in thousands") for y in y_list]
@@ -56,7 +64,9 @@ def plot_ebitda_component(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
     return fig
 
 
-def plot_days_component(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
+def plot_days_component(data:pd.DataFrame,chart_ttl:str) -> "go.Figure":
+    from plotly.subplots import make_subplots
+    import plotly.graph_objects as go
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     y_list: List[str] = ["DSO","DIO","DPO"]
     lbl: List[ChartLabels] = [ChartLabels(x="year",xlab="",y=y,y2="Working capital",ylab="days",y2lab="USD in thousands") for y in y_list]
@@ -73,7 +83,8 @@ def plot_days_component(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
     return fig
 
 
-def plot_wc_component(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
+def plot_wc_component(data:pd.DataFrame,chart_ttl:str) -> "go.Figure":
+    import plotly.graph_objects as go
     fig = go.Figure()
     y_list: List[str] = ["Trade receivables","Inventory","Trade payables"]
     lbl: List[ChartLabels] = [ChartLabels(x="year",xlab="",y=y,y2="Working capital",ylab="USD in thousands") for y in y_list]
@@ -89,7 +100,8 @@ def plot_wc_component(data:pd.DataFrame,chart_ttl:str) -> go.Figure:
     return fig
 
 
-def plot_enterprise_vals(data:pd.DataFrame,lbl:ChartLabels) -> go.Figure:
+def plot_enterprise_vals(data:pd.DataFrame,lbl:ChartLabels) -> "go.Figure":
+    import plotly.graph_objects as go
     x=np.array([f"Simulation {i+1}" for i in data.index])
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=x, y=data[lbl.y], fill='tozeroy', mode='none',hovertemplate='%{y:,.0f}',
@@ -100,4 +112,99 @@ def plot_enterprise_vals(data:pd.DataFrame,lbl:ChartLabels) -> go.Figure:
     fig.update_xaxes(title_text="",visible=False)
     fig.update_layout(height=500,width=1000,title=lbl.ttl,template='simple_white',plot_bgcolor='#F9F9FA',
                       hovermode='x unified')
-    return fig
\ No newline at end of file
+    return fig
+
+
+class FigureTemplate:
+    '''
+    A chart laid out once: the builder is run on sample data and the resulting figure is kept as a plain spec. Per company
+    only the data arrays and the title are swapped in, skipping trace construction, validation and layout updates. The
+    traces of the builders are named after the column they plot against the x column.
+    '''
+
+    def __init__(self, build: Callable[[pd.DataFrame,str],"go.Figure"], sample: pd.DataFrame, x: str = "year"):
+        spec: Dict[str,Any] = build(sample,"").to_dict()
+        self.x = x
+        self.traces: List[Dict[str,Any]] = spec["data"]
+        self.layout: Dict[str,Any] = spec["layout"]
+
+    def fill(self, data: pd.DataFrame, title: str) -> Dict[str,Any]:
+        '''
+        Figure spec of the chart for data (pass to plotly.io with validate=False)
+        '''
+        x: np.ndarray = data[self.x].values
+        return {"data": [{**trace, "x": x, "y": data[trace["name"]].values} for trace in self.traces],
+                "layout": {**self.layout, "title": {**self.layout.get("title",{}), "text": title}}}
+
+
+# Company charts as (builder, FinRatio dataset, title)
+CHARTS: Dict[str,Tuple[Callable[[pd.DataFrame,str],"go.Figure"],str,str]] = {
+    "ebitda_revenue_ratio": (plot_ebitda_revenue_ratio,"ebitda_rev_ratio",
+                             "EBITDA (% of revenue) and Revenue from sales and services"),
+    "unlevered_cashflows": (plot_unlevered_cashflows,"ufcf_trend",
+                            "Unlevered free cash flows evolution across forecast periods"),
+    "ebitda_component": (plot_ebitda_component,"ebitda_components","Breaking up EBITDA into it's major components"),
+    "days_component": (plot_days_component,"working_capital","Working capital development (days outstanding)"),
+    "wc_component": (plot_wc_component,"working_capital","Working capital development (value accumulated)"),
+}
+
+
+# Page of an exported chart; plotly.js is written once per batch next to the company folders
+PAGE = '<html>\n<head><meta charset="utf-8" /></head>\n<body>\n<script src="../plotly.min.js"></script>\n{}\n</body>\n</html>'
+
+
+def _export_charts(item: Tuple[str,Dict[str,pd.DataFrame]], templates: Dict[str,FigureTemplate], out_dir: str,
+                   fmt: str) -> List[str]:
+    import plotly.io as pio
+    comp, datasets = item
+    folder: str = os.path.join(out_dir,company_dir(comp))
+    os.makedirs(folder,exist_ok=True)
+    paths: List[str] = []
+    for name, template in templates.items():
+        spec: Dict[str,Any] = template.fill(datasets[CHARTS[name][1]],f"{comp}: {CHARTS[name][2]}")
+        path: str = os.path.join(folder,f"{name}.{fmt}")
+        if fmt == "html":
+            with open(path,"w") as f:
+                f.write(PAGE.format(pio.to_html(spec,include_plotlyjs=False,full_html=False,validate=False)))
+        else:
+            pio.write_image(spec,path,format=fmt,validate=False)
+        paths.append(path)
+    return paths
+
+
+def render_charts(ratios: Mapping[str,Any], out_dir: str, fmt: str = "html", charts: Iterable[str] = tuple(CHARTS),
+                  workers: int = 1, chunk_size: int = 50) -> List[str]:
+    '''
+    Export the company charts of many companies. The figure templates are built once from the first company; each
+    company then only swaps its data arrays into them.
+    :param ratios: FinRatio (or any object with the datasets named in CHARTS) keyed by company
+    :param out_dir: charts are written to out_dir/<company>/<chart>.<fmt>, the folder named by company_dir() (HTML
+                    pages load out_dir/plotly.min.js)
+    :param fmt: 'html' or a static image format ('png', 'svg', 'pdf', ...; requires kaleido)
+    :param charts: charts to export (keys of CHARTS)
+    :param workers: number of processes (1 exports in the current process)
+    :param chunk_size: companies sent to a worker at a time
+    :return: paths written
+    '''
+    charts = list(charts)
+    check_company_dirs(ratios)
+    # Only the datasets are shipped to the workers, not the statements behind them
+    datasets: Dict[str,Dict[str,pd.DataFrame]] = {
+        comp: {CHARTS[c][1]: getattr(ratio,CHARTS[c][1]) for c in charts} for comp, ratio in ratios.items()}
+    if not datasets:
+        return []
+    sample: Dict[str,pd.DataFrame] = next(iter(datasets.values()))
+    templates: Dict[str,FigureTemplate] = {c: FigureTemplate(CHARTS[c][0],sample[CHARTS[c][1]]) for c in charts}
+    if fmt == "html":
+        from plotly.offline import get_plotlyjs
+        os.makedirs(out_dir,exist_ok=True)
+        with open(os.path.join(out_dir,"plotly.min.js"),"w") as f:
+            f.write(get_plotlyjs())
+    args = (repeat(templates),repeat(out_dir),repeat(fmt))
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(_export_charts,datasets.items(),*args,chunksize=chunk_size))
+    else:
+        done = list(map(_export_charts,datasets.items(),*args))
+    return [path for paths in done for path in paths]
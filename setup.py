@@ -1,8 +1,10 @@
-from setuptools import setup
+from setuptools import setup, find_packages
 
 setup(
     name = 'finmodel',
     version='0.1.0',
     description='generate three-statement models and perform DCF valuation',
     url="https://github.com/subhadri/financial_model.git",
-)
\ No newline at end of file
+    packages=find_packages(include=["finModel","finModel.*"]),
+    entry_points={"console_scripts": ["finmodel = finModel.cli:main"]},
+)
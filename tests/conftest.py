@@ -0,0 +1,50 @@
+import os
+import sys
+import pytest
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,ROOT)
+sys.path.insert(0,os.path.join(ROOT,"code","cheesco"))
+
+from extract import source_income, source_balance
+from finModel.statements.main import FinancialStatement
+
+WORKBOOK: str = os.path.join(ROOT,"data","cheesco-source-data-2016-2018.xlsx")
+A_DATE = ["2016-12-31","2017-12-31","2018-12-31"]
+F_DATE = ["2019-12-31","2020-12-31","2021-12-31","2022-12-31","2023-12-31"]
+
+
+@pytest.fixture(scope="session")
+def actuals():
+    '''
+    Income statement and balance sheet of the bundled workbook (parsed without the on-disk cache)
+    '''
+    return source_income(WORKBOOK,A_DATE,cache_dir=None), source_balance(WORKBOOK,A_DATE,cache_dir=None)
+
+
+@pytest.fixture
+def statement(actuals):
+    inc, bs = actuals
+    return FinancialStatement("Cheese",A_DATE,F_DATE,inc,bs)
+
+
+def long_rows(inc, bs, companies) -> "pd.DataFrame":
+    '''
+    Long-format rows (company, date, statement, component, value) of the given actuals, company k scaled by 1 + k/10
+    '''
+    import pandas as pd
+    from finModel.statements.compact import CompactIncomeStatement, CompactBalanceSheet
+    from finModel.statements.ingest import INCOME_COMPONENTS, BALANCE_COMPONENTS, COLUMNS
+    statements = [("income",CompactIncomeStatement.from_statement(inc),INCOME_COMPONENTS),
+                  ("balance",CompactBalanceSheet.from_statement(bs),BALANCE_COMPONENTS)]
+    frames = [pd.DataFrame({"company": comp,"date": compact.dates().strftime("%Y-%m-%d"),"statement": stmt,
+                            "component": label,"value": compact.row(row).values * (1 + k / 10)})
+              for k, comp in enumerate(companies) for stmt, compact, components in statements
+              for label, row in components.items()]
+    return pd.concat(frames,ignore_index=True)[COLUMNS]
+
+
+def assert_same_statements(x: FinancialStatement, y: FinancialStatement, rtol: float = 1e-9) -> None:
+    import pandas as pd
+    for left, right in [(x.income,y.income),(x.balance,y.balance),(x.cash,y.cash)]:
+        pd.testing.assert_frame_equal(left.to_pandas_df(),right.to_pandas_df(),check_exact=False,rtol=rtol)
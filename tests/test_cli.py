@@ -0,0 +1,69 @@
+import json
+import os
+import pandas as pd
+import pytest
+
+from conftest import A_DATE, F_DATE, long_rows
+from finModel.analysis.batch import BatchValuation
+from finModel.cli import main, next_part
+from finModel.statements.ingest import iter_companies
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def source(actuals, tmp_path):
+    path = str(tmp_path / "long.csv")
+    rows = long_rows(*actuals,["A","B","C","D"])
+    # D reports no balance sheet, so its valuation is not finite
+    rows[(rows.company != "D") | (rows.statement == "income")].to_csv(path,index=False)
+    return path
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = str(tmp_path / "valuation.json")
+    with open(path,"w") as f:
+        json.dump({"wacc": 0.1,"lt_growth": 0.02,"forecast_dates": F_DATE,"actual_dates": A_DATE},f)
+    return path
+
+
+def results(out_dir: str) -> pd.DataFrame:
+    return pd.read_parquet(os.path.join(out_dir,"results")).sort_values(["company","metric"],ignore_index=True)
+
+
+def test_run_writes_parts_and_failures(source, config, tmp_path):
+    out = str(tmp_path / "out")
+    assert main([source,out,"--config",config,"--chunk-size","2"]) == 1
+    assert sorted(os.listdir(os.path.join(out,"results"))) == ["part-00000.parquet","part-00001.parquet"]
+    assert list(pd.read_parquet(os.path.join(out,"failures.parquet"))["company"]) == ["D"]
+
+    batch = BatchValuation(iter_companies(source),A_DATE,F_DATE,0.1,0.02)
+    expected = batch.to_pandas_df().sort_values(["company","metric"],ignore_index=True)
+    pd.testing.assert_frame_equal(results(out),expected,check_dtype=False)
+
+
+def test_resume_values_only_the_missing_companies(source, config, tmp_path, capsys):
+    out = str(tmp_path / "out")
+    main([source,out,"--config",config,"--chunk-size","2"])
+    full = results(out)
+    os.remove(os.path.join(out,"results","part-00001.parquet"))
+    with pytest.raises(SystemExit):
+        main([source,out,"--config",config])
+    with pytest.raises(SystemExit):
+        main([source,out,"--config",config,"--wacc","0.12","--resume"])
+    capsys.readouterr()
+
+    assert main([source,out,"--config",config,"--resume"]) == 1
+    assert "valued 1 companies (2 from earlier runs)" in capsys.readouterr().out
+    assert next_part(os.path.join(out,"results")) == 2
+    pd.testing.assert_frame_equal(results(out),full)
+
+
+def test_store_skips_unchanged_companies(source, config, tmp_path, capsys):
+    store = str(tmp_path / "results.db")
+    main([source,str(tmp_path / "first"),"--config",config,"--store",store])
+    capsys.readouterr()
+    main([source,str(tmp_path / "second"),"--config",config,"--store",store])
+    assert "3 unchanged and read from the store" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(results(str(tmp_path / "second")),results(str(tmp_path / "first")))
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pickle
+
+from finModel.statements.compact import CompactIncomeStatement, CompactBalanceSheet
+
+
+def test_same_report_as_the_dataclasses(actuals):
+    inc, bs = actuals
+    for full, compact in [(inc,CompactIncomeStatement.from_statement(inc)),(bs,CompactBalanceSheet.from_statement(bs))]:
+        pd.testing.assert_frame_equal(compact.to_pandas_df(),full.to_pandas_df(),check_exact=False,rtol=1e-12,
+                                      check_names=False,check_freq=False)
+        pd.testing.assert_frame_equal(compact.to_statement().to_pandas_df(),full.to_pandas_df(),check_names=False,
+                                      check_freq=False)
+
+
+def test_rows_are_views_of_the_block(actuals):
+    ci = CompactIncomeStatement.from_statement(actuals[0])
+    assert np.shares_memory(ci.revenue.sales.values,ci.values)
+    assert np.shares_memory(ci.to_pandas_df().values,ci.values)
+    ebitda: np.ndarray = ci.ebitda.values.copy()
+    ci.values[ci._pos["sales"],0] += 100.0
+    ci.compute(slice(0,1))
+    np.testing.assert_allclose(ci.ebitda.values,ebitda + [100.0,0.0,0.0])
+
+
+def test_balance_sheet_totals(actuals):
+    cb = CompactBalanceSheet.from_statement(actuals[1])
+    np.testing.assert_allclose(cb.total_asset.values,actuals[1].total_asset.values)
+    np.testing.assert_allclose(cb.other_liability.total.values,actuals[1].other_liability.total.values)
+    assert cb.dates().equals(actuals[1].dates())
+
+
+def test_pickle_round_trip(actuals):
+    cb = CompactBalanceSheet.from_statement(actuals[1])
+    pd.testing.assert_frame_equal(pickle.loads(pickle.dumps(cb)).to_pandas_df(),cb.to_pandas_df())
@@ -0,0 +1,63 @@
+from finModel.analysis.cost_of_capital import universe_wacc, load_market_table, cost_of_debt
+from finModel.analysis.dcf_valuation import DCFValuation, calc_cost_of_debt, calc_cost_of_equity, calc_wacc
+from finModel.statements.main import FinancialStatement
+from conftest import A_DATE, F_DATE
+import pandas as pd
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def universe(actuals):
+    inc, bs = actuals
+    return {comp: FinancialStatement(comp,A_DATE,F_DATE,inc,bs) for comp in ("A","B")}
+
+
+def test_cost_of_debt_is_positive(statement):
+    kd: pd.Series = calc_cost_of_debt(statement)
+    assert (kd > 0).all()
+    np.testing.assert_allclose(kd,cost_of_debt(statement.income.int_expense,statement.balance.financial_liability.total))
+    assert np.isnan(cost_of_debt(-10.0,0.0))
+
+
+def test_universe_wacc_matches_scalar(universe, tmp_path):
+    path = tmp_path/"market.csv"
+    pd.DataFrame({"company": ["A","B"], "beta": [0.8,1.3], "rf": [0.02,0.02], "market_return": [0.07,0.07]}) \
+        .to_csv(path,index=False)
+    out: pd.DataFrame = universe_wacc(universe,load_market_table(str(path)))
+    assert len(out) == 2 * len(F_DATE)
+    for comp, beta in (("A",0.8),("B",1.3)):
+        fin: FinancialStatement = universe[comp]
+        for date in pd.to_datetime(F_DATE):
+            kd: float = -fin.income.int_expense[date] / fin.balance.financial_liability.total[date]
+            ke: float = calc_cost_of_equity(0.02,beta,0.07)
+            expected: float = calc_wacc(fin.balance.financial_liability.total[date],
+                                        fin.balance.shareholder_equity.total_equity[date],
+                                        -fin.income.tax_rate[date],kd,ke)
+            assert out.loc[(comp,date),"wacc"] == pytest.approx(expected)
+
+
+def test_dated_market_table_carries_forward(universe, tmp_path):
+    path = tmp_path/"market.parquet"
+    pd.DataFrame({"company": ["A","A","B"], "date": ["2018-06-30","2021-06-30","2010-01-01"],
+                  "beta": [1.0,2.0,1.0], "rf": [0.02,0.02,0.02], "market_return": [0.07,0.07,0.07]}) \
+        .to_parquet(path,index=False)
+    ke: np.ndarray = universe_wacc(universe,load_market_table(str(path)),as_array=True)["ke"]
+    np.testing.assert_allclose(ke[0],[0.07,0.07,0.12,0.12,0.12])
+    np.testing.assert_allclose(ke[1],0.07)
+
+
+def test_per_period_wacc_discounts_cumulatively(statement):
+    path: np.ndarray = np.array([0.07,0.075,0.08,0.085,0.09])
+    dcf = DCFValuation(path,0.02,statement)
+    np.testing.assert_allclose(dcf.discount,1/np.cumprod(1+path))
+    assert dcf.wacc == 0.09
+    flat = DCFValuation(np.full(len(F_DATE),0.08),0.02,statement)
+    assert flat.ent_val == pytest.approx(DCFValuation(0.08,0.02,statement).ent_val)
+
+
+def test_wacc_series_must_cover_forecast_dates(statement):
+    wacc = pd.Series(0.08,index=[str(d)[:10] for d in statement.forecast_dates])
+    assert DCFValuation(wacc,0.02,statement).ent_val == pytest.approx(DCFValuation(0.08,0.02,statement).ent_val)
+    with pytest.raises(ValueError):
+        DCFValuation(wacc.iloc[:-1],0.02,statement)
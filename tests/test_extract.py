@@ -0,0 +1,70 @@
+import os
+import pandas as pd
+import pytest
+
+import extract
+from conftest import A_DATE, WORKBOOK
+
+
+@pytest.fixture
+def parse():
+    calls = []
+
+    def parse() -> pd.DataFrame:
+        calls.append(1)
+        return pd.DataFrame({"Sales": [1.0,2.0]},index=pd.DatetimeIndex(["2017-12-31","2018-12-31"],name="date"))
+    parse.calls = calls
+    return parse
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source.xlsx"
+    path.write_bytes(b"version 1")
+    return str(path)
+
+
+def test_hit_equals_parse(tmp_path, source, parse):
+    pytest.importorskip("pyarrow")
+    first = extract.cached_frame(source,"P&L",parse,str(tmp_path / "cache"))
+    second = extract.cached_frame(source,"P&L",parse,str(tmp_path / "cache"))
+    assert len(parse.calls) == 1
+    pd.testing.assert_frame_equal(first,second,check_freq=False)
+
+
+def test_key_covers_file_parser_and_extract(tmp_path, source, parse, monkeypatch):
+    pytest.importorskip("pyarrow")
+    cache = str(tmp_path / "cache")
+    extract.cached_frame(source,"P&L",parse,cache)
+    extract.cached_frame(source,"BS",parse,cache)
+    monkeypatch.setattr(extract,"PARSER_VERSION",extract.PARSER_VERSION + 1)
+    extract.cached_frame(source,"P&L",parse,cache)
+    with open(source,"wb") as fh:
+        fh.write(b"version 2")
+    extract.cached_frame(source,"P&L",parse,cache)
+    assert len(parse.calls) == 4
+    assert len(os.listdir(cache)) == 4
+
+
+def test_no_cache_dir_writes_nothing(tmp_path, source, parse, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    extract.cached_frame(source,"P&L",parse,None)
+    extract.cached_frame(source,"P&L",parse,None)
+    assert len(parse.calls) == 2
+    assert os.listdir(tmp_path) == ["source.xlsx"]
+
+
+@pytest.mark.skipif("FINMODEL_CACHE_DIR" in os.environ,reason="cache turned on by the environment")
+def test_cache_is_off_by_default():
+    assert extract.CACHE_DIR is None
+    assert extract.source_income.__defaults__ == (None,) and extract.source_balance.__defaults__ == (None,)
+
+
+def test_cached_workbook_gives_the_same_statements(tmp_path, actuals):
+    pytest.importorskip("pyarrow")
+    for _ in range(2):
+        inc = extract.source_income(WORKBOOK,A_DATE,cache_dir=str(tmp_path))
+        bs = extract.source_balance(WORKBOOK,A_DATE,cache_dir=str(tmp_path))
+        pd.testing.assert_frame_equal(inc.to_pandas_df(),actuals[0].to_pandas_df(),check_freq=False)
+        pd.testing.assert_frame_equal(bs.to_pandas_df(),actuals[1].to_pandas_df(),check_freq=False)
+    assert len(os.listdir(tmp_path)) == 2
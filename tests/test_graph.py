@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from conftest import F_DATE
+from finModel.analysis.dcf_valuation import DCFValuation
+from finModel.analysis.graph import ModelGraph
+
+
+@pytest.fixture
+def graph(actuals):
+    return ModelGraph.from_statements(*actuals,F_DATE,wacc=0.1,lt_growth=0.02)
+
+
+def test_equity_matches_the_dcf(graph, statement):
+    assert float(np.squeeze(graph["equity"])) == pytest.approx(DCFValuation(0.1,0.02,statement).equity,rel=1e-9)
+
+
+def test_set_drops_only_downstream_nodes(graph, statement):
+    graph["equity"]
+    dropped = graph.set(g=0.03)
+    assert dropped == {"cont_val","pv_cont_val","ent_val","equity"}
+    assert "pv_ufcf" in graph._cache
+    assert float(np.squeeze(graph["equity"])) == pytest.approx(DCFValuation(0.1,0.03,statement).equity,rel=1e-9)
+
+
+def test_nodes_are_evaluated_once():
+    calls = []
+    nodes = {"b": (("a",), lambda a: calls.append("b") or a + 1),
+             "c": (("b","x"), lambda b,x: calls.append("c") or b * x)}
+    graph = ModelGraph({"a": 1.0, "x": 2.0},nodes)
+    assert graph["c"] == 4.0 and graph["c"] == 4.0
+    assert graph.set(x=3.0) == {"c"}
+    assert graph["c"] == 6.0
+    assert calls == ["b","c","c"]
+
+
+def test_unknown_input_raises(graph):
+    with pytest.raises(KeyError):
+        graph.set(sales_growth_typo=0.1)
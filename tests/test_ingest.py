@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import A_DATE, F_DATE, long_rows
+from finModel.analysis.batch import BatchValuation
+from finModel.statements.compact import CompactIncomeStatement, CompactBalanceSheet
+from finModel.statements.ingest import iter_companies
+from finModel.statements.main import FinancialStatement
+
+COMPANIES = ["A","B","C","D"]
+
+
+@pytest.fixture
+def source(actuals, tmp_path):
+    path = str(tmp_path / "long.csv")
+    long_rows(*actuals,COMPANIES).to_csv(path,index=False)
+    return path
+
+
+def test_statements_of_each_company(actuals, source):
+    inc, bs = actuals
+    out = list(iter_companies(source,chunksize=7))
+    assert [comp for comp,_,_ in out] == COMPANIES
+    for k, (_, c_inc, c_bs) in enumerate(out):
+        np.testing.assert_allclose(c_inc.revenue.sales.values,inc.revenue.sales.values * (1 + k / 10))
+        np.testing.assert_allclose(c_bs.total_asset.values,bs.total_asset.values * (1 + k / 10))
+
+
+@pytest.mark.parametrize("compact",[False,True])
+def test_chunk_size_does_not_matter(source, compact):
+    whole = list(iter_companies(source,compact=compact))
+    for chunksize in [1,7,50]:
+        chunked = list(iter_companies(source,chunksize=chunksize,compact=compact))
+        assert [comp for comp,_,_ in chunked] == COMPANIES
+        for (_, inc, bs), (_, c_inc, c_bs) in zip(whole,chunked):
+            pd.testing.assert_frame_equal(inc.to_pandas_df(),c_inc.to_pandas_df())
+            pd.testing.assert_frame_equal(bs.to_pandas_df(),c_bs.to_pandas_df())
+
+
+@pytest.mark.parametrize("chunksize",[5,100_000])
+def test_non_contiguous_company_raises(actuals, tmp_path, chunksize):
+    rows = long_rows(*actuals,["A","B"])
+    path = str(tmp_path / "long.csv")
+    # A's balance sheet comes after B: detected within a chunk and right after B across chunks
+    pd.concat([rows[(rows.company == "A") & (rows.statement == "income")],rows[rows.company == "B"],
+               rows[(rows.company == "A") & (rows.statement == "balance")]]).to_csv(path,index=False)
+    with pytest.raises(ValueError,match="company A"):
+        list(iter_companies(path,chunksize=chunksize))
+
+
+def test_compact_company_is_valued(source):
+    companies = list(iter_companies(source,chunksize=7,compact=True))
+    assert all(isinstance(inc,CompactIncomeStatement) and isinstance(bs,CompactBalanceSheet) for _,inc,bs in companies)
+    comp, inc, bs = companies[1]
+    _, f_inc, f_bs = next(c for c in iter_companies(source) if c[0] == comp)
+    pd.testing.assert_frame_equal(FinancialStatement(comp,A_DATE,F_DATE,inc,bs).cash.to_pandas_df(),
+                                  FinancialStatement(comp,A_DATE,F_DATE,f_inc,f_bs).cash.to_pandas_df())
+
+    compact = BatchValuation(companies,A_DATE,F_DATE,0.1,0.02)
+    dataclass = BatchValuation(iter_companies(source),A_DATE,F_DATE,0.1,0.02)
+    assert compact.failures.empty
+    pd.testing.assert_frame_equal(compact.to_pandas_df(wide=True),dataclass.to_pandas_df(wide=True))
@@ -0,0 +1,38 @@
+from finModel.analysis.monte_carlo import MonteCarloValuation, fit_drivers
+from finModel.analysis.dcf_valuation import DCFValuation
+from finModel.statements.projection import DRIVERS
+from conftest import F_DATE
+import numpy as np
+import pytest
+
+
+def test_results_depend_on_seed_only(actuals):
+    inc, bs = actuals
+    ref: np.ndarray = MonteCarloValuation(0.08,0.02,inc,bs,F_DATE,n_paths=12_345,seed=3).ent_val
+    for chunk_size in (1_000,5_000,12_345):
+        np.testing.assert_array_equal(MonteCarloValuation(0.08,0.02,inc,bs,F_DATE,n_paths=12_345,seed=3,
+                                                          chunk_size=chunk_size).ent_val,ref)
+    np.testing.assert_array_equal(MonteCarloValuation(0.08,0.02,inc,bs,F_DATE,n_paths=12_345,seed=3,workers=2,
+                                                      chunk_size=4_000).ent_val,ref)
+    # The first paths of a longer run are those of a shorter one
+    np.testing.assert_array_equal(MonteCarloValuation(0.08,0.02,inc,bs,F_DATE,n_paths=500,seed=3).ent_val,ref[:500])
+    assert not np.array_equal(MonteCarloValuation(0.08,0.02,inc,bs,F_DATE,n_paths=500,seed=4).ent_val,ref[:500])
+
+
+def test_without_dispersion_every_path_is_the_point_forecast(actuals, statement):
+    inc, bs = actuals
+    mc = MonteCarloValuation(0.08,0.02,inc,bs,F_DATE,n_paths=100,seed=0,vol_scale=0.0)
+    dcf = DCFValuation(0.08,0.02,statement)
+    np.testing.assert_allclose(mc.ent_val,dcf.ent_val,rtol=1e-9)
+    np.testing.assert_allclose(mc.equity,dcf.equity,rtol=1e-9)
+
+
+def test_drivers_and_quantiles(actuals):
+    inc, bs = actuals
+    dist = fit_drivers(inc,bs)
+    assert list(dist.index) == list(DRIVERS) and (dist["std"] >= 0).all()
+    mc = MonteCarloValuation(0.08,0.02,inc,bs,F_DATE,n_paths=20_000,seed=1)
+    q = mc.quantiles((0.1,0.5,0.9))
+    assert list(q.index) == [0.1,0.5,0.9]
+    assert q["Enterprise value"].is_monotonic_increasing
+    assert q.loc[0.5,"Enterprise value"] == pytest.approx(np.nanmedian(mc.ent_val))
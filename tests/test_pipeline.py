@@ -0,0 +1,62 @@
+import threading
+import pandas as pd
+import pytest
+
+from conftest import A_DATE, F_DATE, long_rows
+from finModel.analysis.dcf_valuation import DCFValuation
+from finModel.analysis.pipeline import buffered, CsvSink, ParquetSink, StreamingValuation, RESULT_COLUMNS
+from finModel.statements.ingest import iter_companies
+from finModel.statements.main import FinancialStatement
+
+
+def test_buffered_keeps_order():
+    assert list(buffered(range(100),maxsize=3)) == list(range(100))
+
+
+def test_buffered_raises_upstream_errors():
+    def items():
+        yield 1
+        raise KeyError("upstream")
+
+    out = buffered(items())
+    assert next(out) == 1
+    with pytest.raises(KeyError,match="upstream"):
+        next(out)
+
+
+def test_closing_stops_the_producer():
+    closed = threading.Event()
+
+    def items():
+        try:
+            for i in range(10_000):
+                yield i
+        finally:
+            closed.set()
+
+    out = buffered(buffered(items(),maxsize=2),maxsize=2,timeout=0.01)
+    assert next(out) == 0
+    out.close()
+    assert closed.wait(5)
+
+
+@pytest.mark.parametrize("sink,read",[(CsvSink,pd.read_csv),(ParquetSink,pd.read_parquet)])
+def test_streaming_valuation(actuals, tmp_path, sink, read):
+    if sink is ParquetSink:
+        pytest.importorskip("pyarrow")
+    source = str(tmp_path / "long.csv")
+    long_rows(*actuals,["A","B","C"]).to_csv(source,index=False)
+    companies = list(iter_companies(source))
+    path = str(tmp_path / "out")
+    run = StreamingValuation(companies[:2] + [("bad",None,None)] + companies[2:],A_DATE,F_DATE,0.1,0.02,sink(path),
+                             queue_size=1,flush_every=2)
+    assert run.written == 3
+    assert [(comp,stage) for comp,stage,_ in run.failures] == [("bad","forecast")]
+
+    out = read(path)
+    assert list(out.columns) == RESULT_COLUMNS
+    assert list(out["company"].unique()) == ["A","B","C"]
+    equity = out[(out.section == "dcf") & (out.metric == "Equity value")].set_index("company")["value"]
+    for comp, inc, bs in companies:
+        dcf = DCFValuation(0.1,0.02,FinancialStatement(comp,A_DATE,F_DATE,inc,bs))
+        assert equity[comp] == pytest.approx(dcf.equity,rel=1e-9)
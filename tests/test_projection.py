@@ -0,0 +1,53 @@
+from finModel.statements.forecast import is_forecast_avg_growth, bs_forecast_avg_growth
+from finModel.statements.projection import driver_stats, clear_driver_stats, driver_history, OTHER_LIABILITY_ITEMS, \
+    DRIVERS
+from conftest import A_DATE, F_DATE
+import pandas as pd
+import numpy as np
+import pytest
+
+
+def test_driver_stats_match_history(actuals):
+    inc, bs = actuals
+    clear_driver_stats()
+    stats = driver_stats(inc,bs)
+    sales: np.ndarray = inc.revenue.sales.values
+    assert stats.point["growth"] == pytest.approx(np.nanmean(sales[1:]/sales[:-1] - 1))
+    assert stats.point["cogs_shr"] == pytest.approx(np.nanmean(inc.cogs.cogs.values/sales))
+    assert stats.point["tax_rate"] == pytest.approx(np.nanmean(inc.tax.values/inc.ebt.values))
+    assert stats.point["dso"] == pytest.approx(np.mean(bs.trade_receivable.values/sales*360))
+    assert stats.point["other_liability_shr"] == pytest.approx(sum(stats.point[k] for k in OTHER_LIABILITY_ITEMS))
+    assert set(stats.drivers) == set(DRIVERS)
+    with pytest.raises(ValueError):
+        stats.history["cogs_shr"][0] = 0.0
+
+
+def test_driver_stats_are_memoised(actuals):
+    inc, bs = actuals
+    clear_driver_stats()
+    stats = driver_stats(inc,bs)
+    assert driver_stats(inc,bs) is stats
+    assert driver_stats(inc.select(A_DATE),bs.select(A_DATE)) is stats
+    changed = inc.select(A_DATE)
+    changed.revenue.sales.iloc[-1] *= 1.1
+    assert driver_stats(changed,bs).point["growth"] != stats.point["growth"]
+    clear_driver_stats()
+    assert driver_stats(inc,bs) is not stats and driver_stats(inc,bs).point == stats.point
+
+
+def test_forecast_with_shared_stats(actuals):
+    inc, bs = actuals
+    f_date: np.ndarray = pd.to_datetime(F_DATE).values
+    stats = driver_stats(inc,bs)
+    clear_driver_stats()
+    f_inc = is_forecast_avg_growth(inc,f_date)
+    pd.testing.assert_frame_equal(is_forecast_avg_growth(inc,f_date,stats=stats).to_pandas_df(),f_inc.to_pandas_df())
+    pd.testing.assert_frame_equal(bs_forecast_avg_growth(bs,inc,f_inc,f_date,stats).to_pandas_df(),
+                                  bs_forecast_avg_growth(bs,inc,f_inc,f_date).to_pandas_df())
+
+
+def test_driver_history_is_a_view_of_the_stats(actuals):
+    inc, bs = actuals
+    history = driver_history(inc,bs)
+    assert set(history) == set(DRIVERS)
+    assert history["cogs_shr"] is driver_stats(inc,bs).history["cogs_shr"]
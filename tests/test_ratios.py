@@ -0,0 +1,85 @@
+from finModel.analysis.dcf_valuation import DCFValuation
+from finModel.analysis.ratios import FinRatio, ratio_table, RatioLibrary, RATIOS, RATIO_INPUTS, screening_ratios
+from finModel.statements.main import FinancialStatement
+from conftest import A_DATE, F_DATE
+import pandas as pd
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def dcf(statement):
+    return DCFValuation(0.08,0.02,statement)
+
+
+def test_ebitda_revenue_ratio_unchanged(dcf):
+    fin: FinancialStatement = dcf.statement
+    out: pd.DataFrame = FinRatio(dcf).ebitda_rev_ratio
+    np.testing.assert_allclose(out["EBITDA%"],(fin.income.ebitda/fin.income.revenue.sales).values)
+    assert list(out["year"]) == [d.year for d in fin.income.dates()]
+    assert list(out["year-q"]) == [f"{d.year}Q{d.quarter}" for d in fin.income.dates()]
+    assert list(out["type"]) == ["Actual"]*len(A_DATE) + ["Forecast"]*len(F_DATE)
+
+
+def test_ufcf_trend_unchanged(dcf):
+    out: pd.DataFrame = FinRatio(dcf).ufcf_trend
+    ufcf: np.ndarray = dcf.statement.cash.ufcf[dcf.statement.forecast_dates].values
+    discount: np.ndarray = np.array([1/np.power(1+dcf.wacc,t) for t in range(1,len(F_DATE)+1)])
+    np.testing.assert_allclose(out["PV of UFCF"],ufcf*discount,rtol=1e-12)
+    assert list(out["year"]) == [d[:4] for d in F_DATE]
+
+
+def test_working_capital_unchanged(dcf):
+    fin: FinancialStatement = dcf.statement
+    out: pd.DataFrame = FinRatio(dcf).working_capital
+    sales, cogs = fin.income.revenue.sales, fin.income.cogs.cogs
+    np.testing.assert_allclose(out["DSO"],(fin.balance.trade_receivable/sales*360).values)
+    np.testing.assert_allclose(out["DIO"],-(fin.balance.inventory/cogs*360).values)
+    np.testing.assert_allclose(out["DPO"],-(fin.balance.trade_payable/cogs*360).values)
+    np.testing.assert_allclose(out["Working capital"],(fin.balance.trade_receivable + fin.balance.inventory -
+                                                       fin.balance.trade_payable).values)
+
+
+def test_ratio_table_matches_fin_ratio(dcf):
+    table: pd.DataFrame = ratio_table({"A": dcf, "B": dcf})
+    ratio = FinRatio(dcf)
+    for comp in ("A","B"):
+        rows = table[(table["company"] == comp) & (table["metric"] == "EBITDA%")]
+        np.testing.assert_allclose(rows["value"],ratio.ebitda_rev_ratio["EBITDA%"])
+        rows = table[(table["company"] == comp) & (table["metric"] == "Delta COGS")]
+        np.testing.assert_allclose(rows["value"],ratio.ebitda_components["Delta COGS"])
+
+
+def test_ratio_library_cache(actuals, statement):
+    inc, bs = actuals
+    other = FinancialStatement("Other",A_DATE,F_DATE,inc,bs)
+    lib = RatioLibrary()
+    first: pd.DataFrame = lib.compute({"A": statement, "B": other})
+    assert list(first.columns) == ["type"] + list(RATIOS) and lib.misses == 2
+    x = {name: get(statement).values for name, get in RATIO_INPUTS.items()}
+    np.testing.assert_allclose(first.loc["A"]["ROE"],screening_ratios(x)["ROE"])
+    pd.testing.assert_frame_equal(lib.compute({"A": statement, "B": other}),first)
+    assert lib.hits == 2
+    new = inc.select(A_DATE[-1:])
+    new.revenue.sales.iloc[0] *= 1.1
+    other.update_actuals(new,bs.select(A_DATE[-1:]))
+    second: pd.DataFrame = lib.compute({"A": statement, "B": other})
+    assert lib.hits == 3 and lib.misses == 3
+    pd.testing.assert_frame_equal(second.loc[["A"]],first.loc[["A"]])
+    assert not np.allclose(second.loc["B"]["ROIC"],first.loc["B"]["ROIC"])
+
+
+def test_ratio_names_follow_screening_ratios():
+    assert RATIOS == tuple(screening_ratios({name: np.ones(1) for name in RATIO_INPUTS}))
+
+
+def test_version_changes_on_write(statement):
+    version = statement.income.version()
+    assert statement.income.version() == version
+    new = statement.income.select(statement.forecast_dates[:1])
+    statement.income.write(new)
+    assert statement.income.version() != version
+    # A write into a nested statement changes the version of its parent too
+    version = statement.income.version()
+    statement.income.revenue.write(new.revenue)
+    assert statement.income.version() != version
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import F_DATE
+from finModel.analysis.dcf_valuation import DCFValuation
+from finModel.analysis.graph import ModelGraph
+from finModel.analysis.scenario import ScenarioAnalysis
+
+
+@pytest.fixture
+def scenarios():
+    return pd.DataFrame({"wacc": [np.nan,0.12,np.nan], "g": [np.nan,0.01,np.nan], "growth": [np.nan,np.nan,0.05],
+                         "dso": [np.nan,np.nan,40.0]},index=["base","rates","sales"])
+
+
+def test_base_and_rate_scenarios_match_the_dcf(actuals, statement, scenarios):
+    out = ScenarioAnalysis(scenarios,*actuals,F_DATE,wacc=0.1,lt_growth=0.02).to_pandas_df()
+    assert list(out.index) == ["base","rates","sales"]
+    for name, wacc, g in [("base",0.1,0.02),("rates",0.12,0.01)]:
+        dcf = DCFValuation(wacc,g,statement)
+        assert out.loc[name,"Enterprise value"] == pytest.approx(dcf.ent_val,rel=1e-9)
+        assert out.loc[name,"Equity value"] == pytest.approx(dcf.equity,rel=1e-9)
+
+
+def test_driver_scenario_matches_the_model_graph(actuals, scenarios):
+    out = ScenarioAnalysis(scenarios,*actuals,F_DATE,wacc=0.1,lt_growth=0.02).to_pandas_df()
+    graph = ModelGraph.from_statements(*actuals,F_DATE,wacc=0.1,lt_growth=0.02)
+    graph.set(growth=0.05,dso=40.0)
+    assert out.loc["sales","Equity value"] == pytest.approx(float(np.squeeze(graph["equity"])),rel=1e-9)
+
+
+def test_unknown_driver_raises(actuals):
+    with pytest.raises(KeyError,match="Unknown scenario drivers"):
+        ScenarioAnalysis(pd.DataFrame({"grwth": [0.1]}),*actuals,F_DATE,wacc=0.1,lt_growth=0.02)
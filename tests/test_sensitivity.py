@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from conftest import F_DATE
+from finModel.analysis.dcf_valuation import value_cashflows, cumulative_discount_factors
+from finModel.analysis.sensitivity import rate_greeks, driver_greeks
+from finModel.statements.projection import DRIVERS, driver_stats, anchors, project
+
+N = len(F_DATE)
+PATH = np.array([0.09,0.095,0.1,0.105,0.11])
+
+
+@pytest.fixture
+def model(actuals):
+    return anchors(*actuals), driver_stats(*actuals).drivers
+
+
+def ev_path(ufcf: np.ndarray, path: np.ndarray, g: float) -> float:
+    discount: np.ndarray = cumulative_discount_factors(path)
+    return float(np.sum(ufcf*discount) + ufcf[-1] * (1+g) / (path[-1]-g) * discount[-1])
+
+
+def test_rate_greeks_match_finite_differences(model):
+    ufcf: np.ndarray = project(*model,N)["ufcf"]
+    greeks = rate_greeks(ufcf,0.1,0.02)
+    h = 1e-6
+    ev = lambda w,g: float(value_cashflows(ufcf,w,g,0.0,0.0)["ent_val"])
+    assert greeks["dEV/dWACC"] == pytest.approx((ev(0.1+h,0.02) - ev(0.1-h,0.02)) / (2*h),rel=1e-6)
+    assert greeks["dEV/dg"] == pytest.approx((ev(0.1,0.02+h) - ev(0.1,0.02-h)) / (2*h),rel=1e-6)
+
+
+def test_rate_greeks_along_a_wacc_path(model):
+    ufcf: np.ndarray = project(*model,N)["ufcf"]
+    flat = rate_greeks(ufcf,0.1,0.02)
+    for key, val in rate_greeks(ufcf,np.full(N,0.1),0.02,per_period=True).items():
+        assert val == pytest.approx(flat[key],rel=1e-12)
+    h = 1e-6
+    greeks = rate_greeks(ufcf,PATH,0.02,per_period=True)
+    assert greeks["dEV/dWACC"] == pytest.approx((ev_path(ufcf,PATH+h,0.02) - ev_path(ufcf,PATH-h,0.02)) / (2*h),rel=1e-6)
+
+
+@pytest.mark.parametrize("per_period",[False,True])
+def test_driver_greeks_match_finite_differences(model, per_period):
+    anchor, drivers = model
+    wacc = PATH if per_period else 0.1
+    greeks = driver_greeks(anchor,drivers,N,wacc,0.02,per_period=per_period)
+    assert set(greeks) == set(DRIVERS)
+
+    def ev(name: str, shift: float) -> float:
+        ufcf: np.ndarray = project(anchor,{**drivers, name: drivers[name] + shift},N)["ufcf"]
+        return ev_path(ufcf,PATH if per_period else np.full(N,0.1),0.02)
+
+    for name in DRIVERS:
+        h: float = 1e-6 * max(1.0,abs(drivers[name]))
+        assert greeks[name] == pytest.approx((ev(name,h) - ev(name,-h)) / (2*h),rel=1e-5,abs=1e-6)
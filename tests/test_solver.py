@@ -0,0 +1,46 @@
+from finModel.analysis.dcf_valuation import DCFValuation, value_cashflows
+from finModel.analysis.solver import implied_wacc, implied_growth
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("wacc,g",[(0.08,0.02),(0.12,0.0),(0.06,0.04)])
+def test_implied_wacc_round_trip(statement, wacc, g):
+    dcf = DCFValuation(wacc,g,statement)
+    for target in ({"ev": dcf.ent_val},{"equity": dcf.equity}):
+        sol = dcf.implied_wacc(**target)
+        assert bool(sol.converged)
+        assert float(sol.value) == pytest.approx(wacc,abs=1e-8)
+
+
+@pytest.mark.parametrize("wacc,g",[(0.08,0.02),(0.12,0.0),(0.06,0.04)])
+def test_implied_growth_round_trip(statement, wacc, g):
+    dcf = DCFValuation(wacc,g,statement)
+    for target in ({"ev": dcf.ent_val},{"equity": dcf.equity}):
+        sol = dcf.implied_growth(**target)
+        assert bool(sol.converged)
+        assert float(sol.value) == pytest.approx(g,abs=1e-10)
+
+
+def test_implied_growth_round_trip_per_period_wacc(statement):
+    path: np.ndarray = np.linspace(0.07,0.09,len(statement.forecast_dates))
+    dcf = DCFValuation(path,0.02,statement)
+    assert float(dcf.implied_growth(ev=dcf.ent_val).value) == pytest.approx(0.02,abs=1e-10)
+
+
+def test_batched_round_trip():
+    rng = np.random.default_rng(0)
+    ufcf: np.ndarray = rng.uniform(50,150,(200,5))
+    wacc: np.ndarray = rng.uniform(0.05,0.15,200)
+    g: np.ndarray = rng.uniform(0.0,0.03,200)
+    ev: np.ndarray = value_cashflows(ufcf,wacc,g,0.0,0.0)["ent_val"]
+    sol = implied_wacc(ufcf,ev,g)
+    assert sol.converged.all()
+    np.testing.assert_allclose(sol.value,wacc,atol=1e-8)
+    np.testing.assert_allclose(implied_growth(ufcf,ev,wacc).value,g,atol=1e-10)
+
+
+def test_unreachable_target_is_not_converged():
+    ufcf: np.ndarray = np.full((1,5),100.0)
+    sol = implied_wacc(ufcf,-1.0,0.02)
+    assert not sol.converged[0] and np.isnan(sol.value[0])
@@ -0,0 +1,82 @@
+from finModel.statements.main import FinancialStatement
+from conftest import A_DATE, F_DATE, assert_same_statements
+import pandas as pd
+import pytest
+
+
+def test_timeline_is_allocated_once(statement):
+    dates: pd.DatetimeIndex = statement.income.dates()
+    assert list(dates) == list(pd.to_datetime(A_DATE + F_DATE)) and dates.name is None
+    assert statement.balance.dates().equals(dates)
+    assert not statement.income.revenue.sales[statement.forecast_dates].isna().any()
+
+
+def test_update_actuals_rolls_forward(actuals, statement):
+    inc, bs = actuals
+    statement.update_actuals(inc.select(A_DATE[-1:]),bs.select(A_DATE[-1:]))
+    assert_same_statements(statement,FinancialStatement("Cheese",A_DATE,F_DATE,inc,bs))
+    with pytest.raises(ValueError):
+        statement.update_actuals(inc.select(A_DATE[-1:]),bs.select(A_DATE[-1:]),f_date=A_DATE[-1:])
+
+
+def redate(statement, dates):
+    for _, val in statement._items():
+        if isinstance(val,pd.Series):
+            val.index = pd.DatetimeIndex(dates)
+        else:
+            redate(val,dates)
+    statement.reset()
+    return statement
+
+
+def test_update_actuals_with_new_period(actuals, statement):
+    inc, bs = actuals
+    # The last actual reported again as 2019: the 2019 forecast is replaced and 2020-2023 are forecast from it
+    new_inc = redate(inc.select(A_DATE[-1:]),["2019-12-31"])
+    new_bs = redate(bs.select(A_DATE[-1:]),["2019-12-31"])
+    statement.update_actuals(new_inc,new_bs)
+    assert list(statement.actual_dates) == list(pd.to_datetime(A_DATE + ["2019-12-31"]).values)
+    assert list(statement.forecast_dates) == list(pd.to_datetime(F_DATE[1:]).values)
+    assert statement.income.revenue.sales["2019-12-31"] == inc.revenue.sales[A_DATE[-1]]
+    assert not statement.cash.ufcf[statement.forecast_dates].isna().any()
+
+
+def test_update_actuals_past_the_horizon(actuals, statement):
+    inc, bs = actuals
+    new_inc = redate(inc.select(A_DATE[-1:]),["2024-12-31"])
+    new_bs = redate(bs.select(A_DATE[-1:]),["2024-12-31"])
+    with pytest.raises(ValueError):
+        statement.update_actuals(new_inc,new_bs)
+    statement.update_actuals(new_inc,new_bs,f_date=["2025-12-31","2026-12-31"])
+    assert len(statement.income.dates()) == len(A_DATE) + 3
+
+
+def test_subtotals_are_lazy(statement):
+    assert "ufcf" not in statement.cash.__dict__
+    inc = statement.income
+    ebitda: pd.Series = inc.ebitda
+    assert "ebitda" in inc.__dict__ and inc.ebitda is ebitda
+    expected: pd.Series = inc.revenue.sales + inc.revenue.other_revenue + inc.cogs.raw_material + \
+        inc.cogs.direct_cost + inc.opex.cost_for_services + inc.opex.lease_cost + inc.opex.other
+    pd.testing.assert_series_equal(ebitda,expected,check_names=False)
+    bs = statement.balance
+    pd.testing.assert_series_equal(bs.total_liability_and_equity,bs.trade_payable + bs.other_liability.total +
+                                   bs.financial_liability.total + bs.shareholder_equity.total_equity,check_names=False)
+
+
+def test_write_resets_subtotals(statement):
+    before: pd.Series = statement.income.ebitda.copy()
+    new = statement.income.select(statement.forecast_dates[:1])
+    new.revenue.sales.iloc[0] += 100.0
+    statement.income.write(new)
+    diff: pd.Series = statement.income.ebitda - before
+    assert diff[statement.forecast_dates[0]] == pytest.approx(100.0)
+    assert (diff.drop(statement.forecast_dates[0]) == 0).all()
+
+
+def test_override_until_reset(statement):
+    inc = statement.income
+    inc.tax_rate = inc.tax_rate * 0 + 0.3
+    assert (inc.tax_rate == 0.3).all()
+    inc.reset()
+    pd.testing.assert_series_equal(inc.tax_rate,inc.tax/inc.ebt)
@@ -0,0 +1,59 @@
+from finModel.analysis.store import ResultStore, input_key
+from finModel.analysis.batch import BatchValuation
+from conftest import A_DATE, F_DATE
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultStore(str(tmp_path/"results.db")) as store:
+        yield store
+
+
+def test_input_key(actuals):
+    inc, bs = actuals
+    key: str = input_key("Cheese",inc,bs,A_DATE,F_DATE,0.08,0.02)
+    assert input_key("Cheese",inc.select(A_DATE),bs.select(A_DATE),A_DATE,F_DATE,0.08,0.02) == key
+    assert input_key("Cheese",inc,bs,A_DATE,F_DATE,0.09,0.02) != key
+    assert input_key("Other",inc,bs,A_DATE,F_DATE,0.08,0.02) != key
+    assert input_key("Cheese",inc,bs,A_DATE,F_DATE[:-1],0.08,0.02) != key
+    changed = inc.select(A_DATE)
+    changed.tax.iloc[0] += 1.0
+    assert input_key("Cheese",changed,bs,A_DATE,F_DATE,0.08,0.02) != key
+
+
+def test_store_round_trip(actuals, store, tmp_path):
+    inc, bs = actuals
+    computed = store.value("Cheese",inc,bs,A_DATE,F_DATE,0.08,0.02)
+    assert store.misses == 1 and len(store) == 1
+    stored = store.value("Cheese",inc,bs,A_DATE,F_DATE,0.08,0.02)
+    assert store.hits == 1
+    pd.testing.assert_frame_equal(stored.valuation,computed.valuation)
+    pd.testing.assert_frame_equal(stored.statement.cash.to_pandas_df(),computed.statement.cash.to_pandas_df())
+    store.close()
+    with ResultStore(str(tmp_path/"results.db")) as reopened:
+        assert reopened.get(input_key("Cheese",inc,bs,A_DATE,F_DATE,0.08,0.02)) is not None
+
+
+def test_batch_reads_unchanged_companies(actuals, store):
+    inc, bs = actuals
+    companies = [("A",inc,bs),("B",inc,bs)]
+    first = BatchValuation(companies,A_DATE,F_DATE,0.08,0.02,store=store)
+    assert store.hits == 0 and len(store) == 2
+    second = BatchValuation(companies,A_DATE,F_DATE,{"A": 0.08, "B": 0.09},0.02,store=store)
+    assert store.hits == 1 and len(store) == 3
+    assert list(second.to_pandas_df()["company"].unique()) == ["A","B"]
+    pd.testing.assert_frame_equal(second.to_pandas_df().query("company == 'A'"),
+                                  first.to_pandas_df().query("company == 'A'"))
+
+
+def test_eviction(actuals, store):
+    inc, bs = actuals
+    for wacc in (0.07,0.08,0.09):
+        store.value("Cheese",inc,bs,A_DATE,F_DATE,wacc,0.02)
+    store.get(input_key("Cheese",inc,bs,A_DATE,F_DATE,0.07,0.02))
+    assert store.evict(max_entries=2) == 1
+    assert store.get(input_key("Cheese",inc,bs,A_DATE,F_DATE,0.07,0.02)) is not None
+    assert store.get(input_key("Cheese",inc,bs,A_DATE,F_DATE,0.08,0.02)) is None
+    assert store.evict(max_age=-1) == 2 and len(store) == 0
@@ -0,0 +1,56 @@
+from finModel.statements.main import FinancialStatement
+from finModel.statements.strategy import ForecastPlan, DEFAULT_PLAN, Trend, POS, history
+from finModel.utils.transform import trend_forecast
+from conftest import A_DATE, F_DATE, assert_same_statements
+import numpy as np
+import pytest
+
+
+TREND_ITEMS = ("sales","cost_for_services")
+
+
+def test_default_plan_equals_avg_growth(actuals):
+    inc, bs = actuals
+    assert_same_statements(FinancialStatement("Cheese",A_DATE,F_DATE,inc,bs,plan=DEFAULT_PLAN),
+                           FinancialStatement("Cheese",A_DATE,F_DATE,inc,bs))
+
+
+def test_default_plan_batched_equals_single(actuals):
+    hist: np.ndarray = history(*actuals)
+    batch: np.ndarray = DEFAULT_PLAN.project(np.stack([hist,2*hist]),len(F_DATE))
+    single: np.ndarray = DEFAULT_PLAN.project(hist,len(F_DATE))
+    np.testing.assert_allclose(batch[0],single,equal_nan=True)
+    np.testing.assert_allclose(batch[1,POS["sales"]],2*single[POS["sales"]])
+
+
+def test_trend_and_plan_are_exclusive(actuals):
+    inc, bs = actuals
+    with pytest.raises(ValueError):
+        FinancialStatement("Cheese",A_DATE,F_DATE,inc,bs,trend="linear",plan=DEFAULT_PLAN)
+
+
+@pytest.mark.parametrize("method",["linear","log","damped"])
+def test_trend_plan_single(actuals, method):
+    inc, bs = actuals
+    plan = ForecastPlan({name: Trend(method) for name in TREND_ITEMS})
+    fin = FinancialStatement("Cheese",A_DATE,F_DATE,inc,bs,plan=plan)
+    h, n = len(A_DATE), len(F_DATE)
+    expected: np.ndarray = trend_forecast(inc.revenue.sales.values,np.arange(1,h+1),np.arange(h+1,h+n+1),method)
+    np.testing.assert_allclose(fin.income.revenue.sales[fin.forecast_dates].values,expected)
+    assert np.isfinite(fin.cash.ufcf[fin.forecast_dates]).all()
+
+
+@pytest.mark.parametrize("method",["linear","log","damped"])
+def test_trend_plan_batched(actuals, method):
+    plan = ForecastPlan({name: Trend(method,phi=0.8) for name in TREND_ITEMS})
+    hist: np.ndarray = history(*actuals)
+    single: np.ndarray = plan.project(hist,len(F_DATE))
+    batch: np.ndarray = plan.project(np.stack([hist,hist,hist]),len(F_DATE))
+    assert batch.shape == (3,) + single.shape
+    for out in batch:
+        np.testing.assert_allclose(out,single,equal_nan=True)
+    # Scenario axis on the parameters only
+    params = plan.fit(hist)
+    params["ppe"] = np.array([params["ppe"],2*params["ppe"]])
+    scen: np.ndarray = plan.project(hist,len(F_DATE),params)
+    np.testing.assert_allclose(scen[:,POS["sales"]],np.broadcast_to(single[POS["sales"]],(2,len(F_DATE))))
@@ -0,0 +1,39 @@
+from finModel.utils.transform import trend_forecast
+import numpy as np
+import pytest
+
+
+X = np.arange(1,6,dtype=float)
+X_NEW = np.arange(6,9,dtype=float)
+HISTORY = np.array([[10.0,12.0,13.5,15.0,18.0],[-4.0,-5.0,-5.5,-7.0,-8.0],[3.0,np.nan,4.0,4.5,5.5]])
+
+
+def test_linear_matches_polyfit():
+    slope, intercept = np.polyfit(X,HISTORY[0],1)
+    np.testing.assert_allclose(trend_forecast(HISTORY[0],X,X_NEW,"linear"),intercept + slope*X_NEW)
+
+
+def test_log_matches_polyfit():
+    slope, intercept = np.polyfit(X,np.log(np.abs(HISTORY[1])),1)
+    np.testing.assert_allclose(trend_forecast(HISTORY[1],X,X_NEW,"log"),-np.exp(intercept + slope*X_NEW))
+
+
+def test_damped_single_series():
+    slope, intercept = np.polyfit(X,HISTORY[0],1)
+    expected: np.ndarray = intercept + slope*X[-1] + slope*np.cumsum(0.8**np.arange(1,4))
+    np.testing.assert_allclose(trend_forecast(HISTORY[0],X,X_NEW,"damped",phi=0.8),expected)
+
+
+@pytest.mark.parametrize("method",["linear","log","damped"])
+def test_batched_equals_rows(method):
+    rows: np.ndarray = np.vstack([trend_forecast(y,X,X_NEW,method) for y in HISTORY])
+    np.testing.assert_allclose(trend_forecast(HISTORY,X,X_NEW,method),rows)
+    # x_new given per row as well as shared
+    np.testing.assert_allclose(trend_forecast(HISTORY,X,np.broadcast_to(X_NEW,(3,3)),method),rows)
+
+
+def test_damped_batched_over_several_axes():
+    y: np.ndarray = np.stack([HISTORY[:2],2*HISTORY[:2]])
+    out: np.ndarray = trend_forecast(y,X,X_NEW,"damped")
+    assert out.shape == (2,2,3)
+    np.testing.assert_allclose(out[1],2*out[0])
@@ -0,0 +1,26 @@
+from finModel.analysis.dcf_valuation import DCFValuation
+import pytest
+
+
+WACC = [0.06,0.07,0.08,0.09]
+GROWTH = [0.0,0.01,0.02,0.03]
+
+
+def test_grid_equals_loop(statement):
+    grid = DCFValuation(0.08,0.02,statement).simulate_enterprise_val(WACC,GROWTH,as_array=True)
+    for i, w in enumerate(WACC):
+        for j, g in enumerate(GROWTH):
+            dcf = DCFValuation(w,g,statement)
+            assert grid["Enterprise Value"][i,j] == pytest.approx(dcf.ent_val,rel=1e-12)
+            assert grid["PV of Cash flows"][i,j] == pytest.approx(dcf.pv_ufcf,rel=1e-12)
+            assert grid["PV of Continuing value"][i,j] == pytest.approx(dcf.pv_cont_val,rel=1e-12)
+            assert grid["CFs in Forecast period"][i,j] == pytest.approx(dcf.pv_ufcf_shr,rel=1e-12)
+
+
+def test_grid_frame_layout(statement):
+    frame = DCFValuation(0.08,0.02,statement).simulate_enterprise_val(WACC,GROWTH)
+    assert len(frame) == len(WACC) * len(GROWTH)
+    assert list(frame.columns) == ["WACC","Long-term growth","Enterprise Value","CFs in Forecast period",
+                                   "Continuing Value"]
+    row = frame[(frame["WACC"] == 0.07) & (frame["Long-term growth"] == 0.03)].iloc[0]
+    assert row["Enterprise Value"] == pytest.approx(DCFValuation(0.07,0.03,statement).ent_val,rel=1e-12)
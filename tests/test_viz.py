@@ -0,0 +1,79 @@
+import os
+import re
+import numpy as np
+import pytest
+
+from finModel.analysis.dcf_valuation import DCFValuation
+from finModel.analysis.ratios import FinRatio
+from finModel.viz.generic import company_dir, render_statements, style_statement
+
+
+def _table(html: str) -> str:
+    # Styler gives every rendered table a random id
+    return re.sub(r"T_[0-9a-f]{5}","T",html)
+
+
+def test_company_dir_stays_inside_out_dir():
+    assert company_dir("Cheese Co. S.p.A.") == "Cheese_Co._S.p.A."
+    assert company_dir("../../etc/passwd") == "_.._etc_passwd"
+    with pytest.raises(ValueError):
+        company_dir("..")
+
+
+def test_render_statements_writes_one_file_per_company(statement, tmp_path):
+    data = statement.income.to_pandas_df()
+    tables = {"A/B": data, "../C": data * 2}
+    out = render_statements(tables,statement.forecast_dates,["Total revenues"],out_dir=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["A_B.html","_C.html"]
+    with open(tmp_path / "A_B.html") as f:
+        assert f.read() == out["A/B"]
+    assert _table(out["A/B"]) == _table(style_statement(data,statement.forecast_dates,["Total revenues"]).to_html())
+    pooled = render_statements(tables,statement.forecast_dates,["Total revenues"],workers=2,chunk_size=1)
+    assert {comp: _table(html) for comp,html in pooled.items()} == {comp: _table(html) for comp,html in out.items()}
+
+
+def test_render_statements_rejects_clashing_names(statement, tmp_path):
+    data = statement.income.to_pandas_df()
+    with pytest.raises(ValueError,match="share an export name"):
+        render_statements({"A/B": data, "A B": data},statement.forecast_dates,[],out_dir=str(tmp_path))
+    assert not os.listdir(tmp_path)
+
+
+@pytest.fixture
+def ratios(statement):
+    return FinRatio(DCFValuation(0.1,0.02,statement))
+
+
+def test_render_charts_writes_a_folder_per_company(ratios, tmp_path):
+    pytest.importorskip("plotly")
+    from finModel.viz.plots import CHARTS, render_charts
+    paths = render_charts({"A B": ratios, "../C": ratios},str(tmp_path),charts=["ebitda_revenue_ratio","wc_component"])
+    assert sorted(os.listdir(tmp_path)) == ["A_B","_C","plotly.min.js"]
+    assert sorted(os.path.relpath(p,tmp_path) for p in paths) == [
+        os.path.join("A_B","ebitda_revenue_ratio.html"),os.path.join("A_B","wc_component.html"),
+        os.path.join("_C","ebitda_revenue_ratio.html"),os.path.join("_C","wc_component.html")]
+    with open(tmp_path / "A_B" / "wc_component.html") as f:
+        page = f.read()
+    assert '<script src="../plotly.min.js"></script>' in page
+    assert f"A B: {CHARTS['wc_component'][2]}" in page
+
+
+def test_template_fill_matches_a_fresh_figure(ratios, statement):
+    pytest.importorskip("plotly")
+    from finModel.viz.plots import CHARTS, FigureTemplate
+    other = FinRatio(DCFValuation(0.12,0.01,statement))
+    for build, attr, _ in CHARTS.values():
+        filled = FigureTemplate(build,getattr(ratios,attr)).fill(getattr(other,attr),"title")
+        fresh = build(getattr(other,attr),"title")
+        assert len(filled["data"]) == len(fresh.data)
+        for left, right in zip(filled["data"],fresh.data):
+            for axis in ("x","y"):
+                assert list(np.asarray(left[axis])) == list(np.asarray(right[axis]))
+
+
+def test_render_charts_rejects_clashing_names(ratios, tmp_path):
+    pytest.importorskip("plotly")
+    from finModel.viz.plots import render_charts
+    with pytest.raises(ValueError,match="share an export name"):
+        render_charts({"A/B": ratios, "A B": ratios},str(tmp_path))
+    assert not os.listdir(tmp_path)